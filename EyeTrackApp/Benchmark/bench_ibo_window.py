@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.append("../")
+from eye import EyeId  # noqa
+from intensity_based_openness import IntensityBasedOpeness  # noqa
+from utils.region_sums import window_area, window_bounds  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+frame_num = 3000
+warmup_frames = 1000  # IBO needs to see the eye open and closed before its output means anything
+roi_sizes = [240, 480]
+pupil_radius = 10  # what HSF reports for the synthetic pupil
+window_scales = [0, 1.5, 2.5, 4]  # ibo_window_radius_scale values to compare, 0 = whole ROI
+loop_num = 2000
+##############################
+
+
+def make_sequence(size, seed=0):
+    """
+    Synthetic eye: the pupil wanders and the lid blinks now and then, while a light leak in the
+    corner of the ROI flickers. Returns the frames, pupil positions and the true openness.
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size]
+    scale = size / 240
+    eye_r = 60 * scale
+    centre = size / 2
+    leak = (xx < size / 4) & (yy > size * 3 / 4)
+
+    frames, positions, openness = [], [], []
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    blink_at = set(rng.choice(np.arange(warmup_frames // 2, frame_num), frame_num // 60, replace=False))
+    blink = 0
+    for i in range(frame_num):
+        px = centre + 30 * scale * np.sin(i / 47 + phase[0])
+        py = centre + 15 * scale * np.sin(i / 71 + phase[1])
+        if i in blink_at or (i < warmup_frames and i % 200 == 0):
+            blink = 12
+        open_ = 1.0 - np.sin(np.pi * blink / 12) if blink else 1.0
+        blink = max(blink - 1, 0)
+
+        frame = np.full((size, size), 170.0)
+        frame[(xx - centre) ** 2 + ((yy - centre) * 2) ** 2 < eye_r**2] = 200  # sclera
+        frame[(xx - px) ** 2 + (yy - py) ** 2 < (25 * scale) ** 2] = 110  # iris
+        frame[(xx - px) ** 2 + (yy - py) ** 2 < (pupil_radius * scale) ** 2] = 30
+        # the upper lid comes down to cover (1 - open_) of the eye opening
+        lid = centre - eye_r / 2 + (1 - open_) * eye_r
+        frame[yy < lid] = 160
+        frame[leak] += 60 * (1 + np.sin(i / 5 + phase[2]))
+        frame += rng.normal(0, 4, frame.shape)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+        positions.append((px, py))
+        openness.append(open_)
+    return frames, positions, np.array(openness)
+
+
+def run_ibo(frames, positions, window_radius):
+    ibo = IntensityBasedOpeness(EyeId.LEFT)
+    ibo.change_roi({"rotation": 0, "x": 0, "y": 0})
+    out = [ibo.intense(x, y, frame, 400, 0, 4, True, window_radius) for frame, (x, y) in zip(frames, positions)]
+    ibo.clear_filter()
+    return np.array(out, dtype=np.float64)
+
+
+def accuracy(frames, positions, truth, size):
+    print(f"openness accuracy, ROI {size}x{size}, after {warmup_frames} warm up frames")
+    for scale in window_scales:
+        window_radius = int(round(scale * pupil_radius * size / 240))
+        estimate = run_ibo(frames, positions, window_radius)[warmup_frames:]
+        expected = truth[warmup_frames:]
+        mae = np.abs(estimate - expected).mean()
+        corr = np.corrcoef(estimate, expected)[0, 1]
+        name = "whole ROI" if scale == 0 else f"window scale {scale} (radius {window_radius})"
+        print(f"  {name:<34} MAE {mae:.3f}  correlation {corr:.3f}")
+
+
+def timing(frames, positions, size):
+    print(f"measurement cost per frame, ROI {size}x{size}")
+    frame, (x, y) = frames[0], positions[0]
+    radius = int(round(2.5 * pupil_radius * size / 240))
+    x0, y0, x1, y1 = bounds = window_bounds(frame.shape, x, y, radius)
+
+    def integral_window():
+        integral = cv2.integral(frame)
+        return (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]) / window_area(bounds)
+
+    cases = [
+        ("frame.sum() (old)", lambda: frame.sum()),
+        ("crop sum", lambda: frame[y0:y1, x0:x1].sum() / window_area(bounds)),
+        ("cv2.integral + 1 window", integral_window),
+    ]
+    for name, fn in cases:
+        elapsed = min(timeit.repeat(fn, number=loop_num, repeat=3))
+        print(f"  {name:<34} {format_time(elapsed / loop_num):>10}")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        # IBO keeps its map next to the working directory
+        os.chdir(tmp)
+        for size in roi_sizes:
+            frames, positions, truth = make_sequence(size)
+            accuracy(frames, positions, truth, size)
+            timing(frames, positions, size)
@@ -0,0 +1,42 @@
+import sys
+import timeit
+
+import cv2
+import numpy as np
+
+sys.path.append("../")
+from leap import gray_to_input_tensor, input_size  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+frame_shape = (240, 240)  # size of the cropped gray eye frame handed to LEAP
+loop_num = 2000
+##############################
+
+
+def rgb_preprocess(gray_frame):
+    """What LEAP used to do, a gray -> RGB -> luma round trip with fresh float arrays every frame."""
+    img = cv2.cvtColor(gray_frame.copy(), cv2.COLOR_GRAY2RGB)
+    frame = cv2.resize(img, (input_size, input_size))
+    img_np = np.array(frame, dtype=np.float32) / 255.0
+    gray_img = 0.299 * img_np[:, :, 0] + 0.587 * img_np[:, :, 1] + 0.114 * img_np[:, :, 2]
+    return np.expand_dims(np.expand_dims(gray_img, axis=0), axis=0)
+
+
+def bench(name, fn, number):
+    fn()
+    timings = [timeit.timeit(fn, number=number // 10) / (number // 10) for _ in range(10)]
+    print(f"{name:<36} {format_time(np.median(timings)):>10} per frame")
+    return np.median(timings)
+
+
+if __name__ == "__main__":
+    gray_frame = np.random.randint(0, 256, frame_shape, dtype=np.uint8)
+    tensor = np.empty((1, 1, input_size, input_size), dtype=np.float32)
+    resized = np.empty((input_size, input_size), dtype=np.uint8)
+    new_tensor = gray_to_input_tensor(gray_frame, tensor, resized)
+    print(f"max difference: {np.abs(rgb_preprocess(gray_frame) - new_tensor).max():.2e}")
+    old = bench("gray -> RGB -> luma", lambda: rgb_preprocess(gray_frame), loop_num)
+    new = bench("gray into preallocated buffers", lambda: gray_to_input_tensor(gray_frame, tensor, resized), loop_num)
+    print(f"{'saving':<36} {format_time(old - new):>10} per frame ({old / new:.1f}x)")
@@ -0,0 +1,62 @@
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append("../")
+from one_euro_filter import OneEuroFilter, OneEuroFilterBank, ScalarOneEuroFilter  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+loop_num = 20000
+# (name, channels) as the call sites use them
+cases = [
+    ("lid / dilation", 1),
+    ("x, y", 2),
+    ("x, y, openness, dilation", 4),
+    ("DADDY keypoints (11 x 2)", 22),
+    ("DADDY keypoints, both eyes", 44),
+    ("many channels", 256),
+]
+frame_time = 1 / 120
+##############################
+
+
+def make_samples(channels):
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.normal(0, 0.01, (loop_num, channels)), axis=0)
+
+
+def run_old(samples):
+    f = OneEuroFilter(samples[0].copy(), min_cutoff=0.0004, beta=0.9)
+    for x in samples:
+        f(x)
+
+
+def run_bank(samples):
+    f = OneEuroFilterBank(samples[0], min_cutoff=0.0004, beta=0.9, t0=0.0)
+    out = np.empty_like(samples[0])
+    for i, x in enumerate(samples):
+        f(x, (i + 1) * frame_time, out)
+
+
+def run_scalar(samples):
+    f = ScalarOneEuroFilter(samples[0], min_cutoff=0.0004, beta=0.9, t0=0.0)
+    values = samples.tolist()
+    for i, x in enumerate(values):
+        f(x, (i + 1) * frame_time)
+
+
+def bench(name, fn, samples):
+    elapsed = min(timeit.repeat(lambda: fn(samples), number=1, repeat=3))
+    print(f"  {name:<34} {format_time(elapsed / loop_num):>10} per update")
+
+
+if __name__ == "__main__":
+    for name, channels in cases:
+        samples = make_samples(channels)
+        print(f"{name}: {channels} channel(s)")
+        bench("OneEuroFilter (old)", run_old, samples)
+        bench("OneEuroFilterBank", run_bank, samples)
+        bench("ScalarOneEuroFilter", run_scalar, samples)
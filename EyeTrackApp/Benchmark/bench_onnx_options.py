@@ -0,0 +1,70 @@
+import sys
+import shutil
+import timeit
+
+import numpy as np
+
+sys.path.append("../")
+import inference  # noqa
+from inference import InferenceOptions, create_session  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+model_path = "../Models/daddy230210.onnx"
+input_shape = (1, 1, 192, 192)
+loop_num = 200
+warmup_num = 10
+configurations = [
+    InferenceOptions(),
+    InferenceOptions(intra_op_threads=2),
+    InferenceOptions(intra_op_threads=0),
+    InferenceOptions(enable_mem_pattern=False),
+    InferenceOptions(enable_cpu_mem_arena=False),
+    InferenceOptions(parallel_execution=True, inter_op_threads=2),
+]
+##############################
+
+# keep the benchmark's cache away from the app's one
+inference.MODEL_CACHE_DIR = inference.Path("./ModelCacheBench")
+
+
+def time_startup(options):
+    start = timeit.default_timer()
+    session = create_session(model_path, options)
+    return session, timeit.default_timer() - start
+
+
+def time_inference(session):
+    frame = np.random.rand(*input_shape).astype(np.float32)
+    input_name = session.get_inputs()[0].name
+    for _ in range(warmup_num):
+        session.run(None, {input_name: frame})
+    timings = []
+    for _ in range(loop_num):
+        start = timeit.default_timer()
+        session.run(None, {input_name: frame})
+        timings.append(timeit.default_timer() - start)
+    return np.array(timings)
+
+
+if __name__ == "__main__":
+    results = []
+    for options in configurations:
+        shutil.rmtree(inference.MODEL_CACHE_DIR, ignore_errors=True)
+        options.cache_optimized_models = False
+        _, uncached = time_startup(options)
+        options.cache_optimized_models = True
+        _, cold = time_startup(options)  # optimizes and writes the cache
+        session, warm = time_startup(options)  # loads the cached graph
+        timings = time_inference(session)
+        results.append((options, uncached, cold, warm, timings))
+    shutil.rmtree(inference.MODEL_CACHE_DIR, ignore_errors=True)
+
+    print()
+    print(f"{'startup raw':>12} {'first run':>12} {'cached':>12} {'median':>12} {'p95':>12}  configuration")
+    for options, uncached, cold, warm, timings in results:
+        print(
+            f"{format_time(uncached):>12} {format_time(cold):>12} {format_time(warm):>12} "
+            f"{format_time(np.median(timings)):>12} {format_time(np.percentile(timings, 95)):>12}  {options}"
+        )
@@ -0,0 +1,57 @@
+import sys
+import timeit
+
+sys.path.append("../")
+from osc.OSCEncoder import OSCEncoder  # noqa
+from pythonosc.osc_bundle_builder import IMMEDIATELY, OscBundleBuilder  # noqa
+from pythonosc.osc_message_builder import OscMessageBuilder  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+loop_num = 50000
+# one dual eye v2 update
+messages = [
+    ("/avatar/parameters/v2/EyeLidLeft", 0.75),
+    ("/avatar/parameters/v2/EyeLeftX", 0.125),
+    ("/avatar/parameters/v2/EyeLeftY", -0.25),
+    ("/avatar/parameters/v2/EyeLidLeft", 0.75),
+    ("/avatar/parameters/v2/PupilDilation", 0.5),
+]
+vector = ("/tracking/eye/LeftRightVec", [0.1, -0.2, 1.0, 0.3, 0.4, 1.0])
+##############################
+
+
+def python_osc(address, value):
+    builder = OscMessageBuilder(address=address)
+    for val in value if isinstance(value, list) else [value]:
+        builder.add_arg(val)
+    return builder.build().dgram
+
+
+def python_osc_bundle():
+    bundle = OscBundleBuilder(IMMEDIATELY)
+    for address, value in messages:
+        builder = OscMessageBuilder(address=address)
+        builder.add_arg(value)
+        bundle.add_content(builder.build())
+    return bundle.build().dgram
+
+
+def bench(name, fn, number=loop_num):
+    elapsed = min(timeit.repeat(fn, number=number, repeat=3))
+    print(f"  {name:<12} {format_time(elapsed / number):>10}")
+
+
+if __name__ == "__main__":
+    encoder = OSCEncoder()
+    address, value = messages[1]
+    print("one float:")
+    bench("python-osc", lambda: python_osc(address, value))
+    bench("encoder", lambda: encoder.encode(address, value))
+    print("six float vector:")
+    bench("python-osc", lambda: python_osc(*vector))
+    bench("encoder", lambda: encoder.encode(*vector))
+    print(f"bundle of {len(messages)}:")
+    bench("python-osc", python_osc_bundle, loop_num // 5)
+    bench("encoder", lambda: encoder.encode_bundle(messages), loop_num // 5)
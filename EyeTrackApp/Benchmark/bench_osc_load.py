@@ -0,0 +1,203 @@
+"""
+Load test of the OSC output: a producer thread feeds both eyes into the mailbox at a fixed rate, the real
+OSCManager / OSCSender / VRChatOSCSender path sends to a UDP receiver on localhost, and the receiver
+measures what arrives. Every update carries its frame number in x (frame / 65536, exact in a float32), so
+latency is measured from the mailbox put of a frame to the first datagram carrying its x.
+
+Needs no GUI and no VRChat, the exit status is non-zero when a run receives nothing. Runs from any directory,
+an optional argument overrides the seconds per run (CI uses a short one):
+
+    python EyeTrackApp/Benchmark/bench_osc_load.py 0.5
+
+    throughput    OSC messages per second at the receiver, and distinct eye frames per second
+    cpu/msg       CPU time of the OSC loop thread per received message
+    latency       put to receive, percentiles over the frames that arrived
+    superseded    frames the mailbox replaced before the sender got to them
+    unpaired      frames binocular pairing dropped, never sent on their own
+    lost          frames the sender handled whose x never arrived
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import EyeTrackConfig  # noqa
+from eye import EyeId, EyeInfo, EyeInfoOrigin  # noqa
+from osc.osc import OSCManager  # noqa
+from osc.OSCMailbox import OSCMailbox  # noqa
+from osc.OSCMessage import OSCMessage, OSCMessageType  # noqa
+from pythonosc.osc_bundle import OscBundle  # noqa
+from pythonosc.osc_message import OscMessage  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+modes = ["v1", "v2", "native"]
+rates = [120, 1000, 0]  # updates per second per eye, 0 = as fast as the producer can go
+duration = 2.0  # seconds per run
+bundle = False  # send each update as one OSC bundle
+##############################
+
+FRAME_SCALE = 65536
+
+
+def x_addresses(config, mode):
+    """OSC address -> [(argument index, eye)] of the arguments that carry an eye's x."""
+    if mode == "v1":
+        return {config.osc_left_eye_x_address: [(0, EyeId.LEFT)], config.osc_right_eye_x_address: [(0, EyeId.RIGHT)]}
+    if mode == "v2":
+        return {
+            "/avatar/parameters/v2/EyeLeftX": [(0, EyeId.LEFT)],
+            "/avatar/parameters/v2/EyeRightX": [(0, EyeId.RIGHT)],
+        }
+    return {"/tracking/eye/LeftRightVec": [(0, EyeId.LEFT), (3, EyeId.RIGHT)]}
+
+
+def make_config(mode, port):
+    config = EyeTrackConfig()
+    config.eye_display_id = EyeId.BOTH
+    settings = config.settings
+    settings.gui_osc_address = "127.0.0.1"
+    settings.gui_osc_port = port
+    settings.gui_ROSC = False
+    settings.gui_use_module = False
+    settings.gui_vrc_native = mode == "native"
+    settings.gui_osc_vrcft_v1 = mode == "v1"
+    settings.gui_osc_vrcft_v2 = mode == "v2"
+    settings.gui_osc_bundle_native = settings.gui_osc_bundle_v1 = settings.gui_osc_bundle_v2 = bundle
+    settings.gui_osc_max_rate = 0
+    return config
+
+
+class Receiver(threading.Thread):
+    def __init__(self, addresses):
+        super().__init__(daemon=True)
+        self.addresses = addresses
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self.arrivals = {}  # (eye, frame) -> first arrival
+        self.messages = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                datagram = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            now = time.perf_counter()
+            if OscBundle.dgram_is_bundle(datagram):
+                messages = list(OscBundle(datagram))
+            else:
+                messages = [OscMessage(datagram)]
+            self.messages += len(messages)
+            for message in messages:
+                for index, eye in self.addresses.get(message.address, []):
+                    frame = round(message.params[index] * FRAME_SCALE)
+                    self.arrivals.setdefault((eye, frame), now)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        self.sock.close()
+
+
+def produce(mailbox, rate, puts):
+    frame = 0
+    interval = 1 / rate if rate else 0
+    start = time.perf_counter()
+    end = start + duration
+    while True:
+        now = time.perf_counter()
+        if now >= end:
+            return frame
+        frame += 1
+        x = frame / FRAME_SCALE
+        for eye in (EyeId.LEFT, EyeId.RIGHT):
+            eye_info = EyeInfo(EyeInfoOrigin.LEAP, x, 0.25, 0.5, 0.75, 0.1, timestamp=now)
+            puts[(eye, frame)] = time.perf_counter()
+            mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=(eye, eye_info)))
+        if interval:
+            sleep = start + frame * interval - time.perf_counter()
+            if sleep > 0:
+                time.sleep(sleep)
+
+
+async def loop_thread_time():
+    return time.thread_time()
+
+
+def run(mode, rate):
+    mailbox = OSCMailbox()
+    receiver = Receiver({})
+    config = make_config(mode, receiver.port)
+    receiver.addresses = x_addresses(config.settings, mode)
+    receiver.start()
+    manager = OSCManager(osc_message_in_queue=mailbox, config=config)
+    manager.setup_sender()
+    cpu_start = asyncio.run_coroutine_threadsafe(loop_thread_time(), manager.loop).result()
+
+    puts = {}
+    frames = produce(mailbox, rate, puts)
+    # let the last updates through
+    time.sleep(0.2)
+    cpu = asyncio.run_coroutine_threadsafe(loop_thread_time(), manager.loop).result() - cpu_start
+    pairing = manager.osc_sender.vrc_sender.pairing
+    manager.shutdown()
+    receiver.stop()
+
+    latencies = np.array([arrival - puts[key] for key, arrival in receiver.arrivals.items() if key in puts])
+    handled = mailbox.delivered - pairing.unpaired
+    return {
+        "frames": frames * 2,
+        "received": len(latencies),
+        "messages": receiver.messages,
+        "cpu": cpu,
+        "latencies": latencies,
+        "superseded": mailbox.superseded_total,
+        "unpaired": pairing.unpaired,
+        "lost": max(handled - len(latencies), 0),
+    }
+
+
+def report(mode, rate, result):
+    latencies = result["latencies"]
+    messages = max(result["messages"], 1)
+    print(f"{mode:<6} {f'{rate}/s' if rate else 'max':>7}:", end=" ")
+    print(
+        f"{result['messages'] / duration:8.0f} msg/s {result['received'] / duration:7.0f} frames/s"
+        f"  cpu/msg {format_time(result['cpu'] / messages):>8}",
+        end="",
+    )
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(
+            f"  latency p50 {format_time(p50):>8} p95 {format_time(p95):>8} p99 {format_time(p99):>8}"
+            f" max {format_time(latencies.max()):>8}",
+            end="",
+        )
+    print(
+        f"  frames {result['frames']} received {result['received']} superseded {result['superseded']}"
+        f" unpaired {result['unpaired']} lost {result['lost']}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        duration = float(sys.argv[1])
+    failed = False
+    for mode in modes:
+        for rate in rates:
+            result = run(mode, rate)
+            report(mode, rate, result)
+            failed |= result["received"] == 0
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,93 @@
+import os
+import socket
+import sys
+import time
+
+sys.path.append("../")
+from eye import EyeId, EyeInfo, EyeInfoOrigin  # noqa
+from osc.BinaryOutput import SharedMemoryReader, decode_record  # noqa
+from osc.OSCEncoder import OSCEncoder  # noqa
+from osc.OutputSinks import BinarySocketSink, SharedMemorySink  # noqa
+from pythonosc.osc_message import OscMessage  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+loop_num = 20000
+eye_info = EyeInfo(EyeInfoOrigin.LEAP, 0.125, -0.25, 0.5, 0.75, 1.5, timestamp=time.time())
+# what the v2 output sends for one eye
+messages = [
+    ("/avatar/parameters/v2/EyeLeftX", eye_info.x),
+    ("/avatar/parameters/v2/EyeLeftY", eye_info.y),
+    ("/avatar/parameters/v2/EyeLidLeft", eye_info.blink),
+    ("/avatar/parameters/v2/PupilDilation", eye_info.pupil_dilation),
+]
+##############################
+
+
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def osc_update(encoder, sender, sock):
+    # write the update, then read and parse it the way a local OSC consumer has to
+    address = sock.getsockname()
+    for message in messages:
+        sender.sendto(encoder.encode(*message), address)
+    values = {}
+    for _ in messages:
+        parsed = OscMessage(sock.recv(1024))
+        values[parsed.address] = parsed.params[0]
+    return values
+
+
+def binary_update(sink, sock):
+    sink.write(EyeId.LEFT, eye_info)
+    return decode_record(sock.recv(1024))
+
+
+def shm_update(sink, reader):
+    sink.write(EyeId.LEFT, eye_info)
+    return reader.read(EyeId.LEFT)
+
+
+def bench(name, fn):
+    for _ in range(loop_num // 10):
+        fn()
+    start = time.perf_counter()
+    for _ in range(loop_num):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<14} {format_time(elapsed / loop_num):>10}")
+
+
+if __name__ == "__main__":
+    print("write to read of one eye update:")
+    sock = receiver()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    encoder = OSCEncoder()
+    bench(f"osc ({len(messages)} msgs)", lambda: osc_update(encoder, sender, sock))
+
+    sink = BinarySocketSink(socket.AF_INET, sock.getsockname())
+    bench("binary udp", lambda: binary_update(sink, sock))
+    sink.close()
+    sock.close()
+
+    if hasattr(socket, "AF_UNIX"):
+        path = f"bench_output_sinks_{os.getpid()}.sock"
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sink = BinarySocketSink(socket.AF_UNIX, path)
+        bench("binary unix", lambda: binary_update(sink, sock))
+        sink.close()
+        sock.close()
+        os.remove(path)
+
+    name = f"bench_output_sinks_{os.getpid()}"
+    sink = SharedMemorySink(name)
+    reader = SharedMemoryReader(name)
+    bench("shared memory", lambda: shm_update(sink, reader))
+    reader.close()
+    sink.close()
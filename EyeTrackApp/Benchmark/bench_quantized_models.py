@@ -0,0 +1,103 @@
+import sys
+import math
+import timeit
+
+import numpy as np
+
+sys.path.append("../")
+from daddy import get_final_preds  # noqa
+from inference import (  # noqa
+    DADDY_MODEL_FILE,
+    LEAP_MODEL_FILE,
+    InferenceOptions,
+    create_session,
+    get_quantized_model_file,
+)
+from quantize_models import calibration_videos, daddy_input, leap_input, load_frames, models_dir  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+# Use other recordings than the calibration set to see how the quantized models generalise.
+eval_videos = calibration_videos
+eval_frames = 200
+warmup_num = 10
+##############################
+
+
+def daddy_landmarks(outputs, size):
+    pred, _ = get_final_preds(outputs[0].copy(), size)
+    landmarks = pred.reshape((-1, 2))
+    # raw eye aspect ratio, BEER without the running normalization
+    p15 = np.linalg.norm(landmarks[1] - landmarks[5])
+    p24 = np.linalg.norm(landmarks[2] - landmarks[4])
+    p03 = np.linalg.norm(landmarks[0] - landmarks[3])
+    return landmarks, (p15 + p24) / (2 * p03)
+
+
+def leap_landmarks(outputs, size):
+    landmarks = np.reshape(outputs, (-1, 2))
+    # lid distance as computed by LEAP_C.leap_run, before calibration
+    openness = (math.dist(landmarks[1], landmarks[3]) + math.dist(landmarks[2], landmarks[4])) / 2
+    return landmarks * size, openness
+
+
+models = [
+    (DADDY_MODEL_FILE, daddy_input, daddy_landmarks),
+    (LEAP_MODEL_FILE, leap_input, leap_landmarks),
+]
+
+
+def evaluate(model_path, frames, preprocess, postprocess):
+    session = create_session(str(model_path), InferenceOptions(cache_optimized_models=False))
+    input_name = session.get_inputs()[0].name
+    for frame in frames[:warmup_num]:
+        session.run(None, {input_name: preprocess(frame)})
+
+    timings, landmarks, openness = [], [], []
+    for frame in frames:
+        tensor = preprocess(frame)
+        start = timeit.default_timer()
+        outputs = session.run(None, {input_name: tensor})
+        timings.append(timeit.default_timer() - start)
+        frame_landmarks, frame_openness = postprocess(outputs, (frame.shape[1], frame.shape[0]))
+        landmarks.append(frame_landmarks)
+        openness.append(frame_openness)
+    return np.array(timings), np.array(landmarks), np.array(openness)
+
+
+if __name__ == "__main__":
+    frames = load_frames(eval_videos, eval_frames)
+    if not frames:
+        sys.exit("\033[91m[ERROR] The harness needs recorded eye frames, check eval_videos\033[0m")
+
+    print()
+    print(
+        f"{'model':<24} {'median':>10} {'p95':>10} {'speedup':>8} "
+        f"{'landmark err px (mean/max)':>27} {'openness err (mean/max)':>24}"
+    )
+    for model_file, preprocess, postprocess in models:
+        float_path = models_dir / model_file
+        quantized_path = get_quantized_model_file(float_path)
+        if not float_path.is_file() or not quantized_path.is_file():
+            print(f"\033[93m[WARN] {float_path.name} or its quantized variant is missing, skipping it\033[0m")
+            continue
+
+        float_timings, float_landmarks, float_openness = evaluate(float_path, frames, preprocess, postprocess)
+        timings, landmarks, openness = evaluate(quantized_path, frames, preprocess, postprocess)
+
+        landmark_error = np.linalg.norm(landmarks - float_landmarks, axis=-1)
+        # relative to the float model's openness range, so DADDY and LEAP numbers are comparable
+        openness_range = max(np.ptp(float_openness), 1e-6)
+        openness_error = np.abs(openness - float_openness) / openness_range
+
+        print(
+            f"{float_path.name:<24} {format_time(np.median(float_timings)):>10} "
+            f"{format_time(np.percentile(float_timings, 95)):>10} {1:>7.2f}x"
+        )
+        print(
+            f"{quantized_path.name:<24} {format_time(np.median(timings)):>10} "
+            f"{format_time(np.percentile(timings, 95)):>10} {np.median(float_timings) / np.median(timings):>7.2f}x"
+            f" {landmark_error.mean():>13.2f} / {landmark_error.max():<11.2f}"
+            f" {openness_error.mean() * 100:>10.1f}% / {openness_error.max() * 100:.1f}%"
+        )
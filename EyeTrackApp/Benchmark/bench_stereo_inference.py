@@ -0,0 +1,81 @@
+import sys
+import os
+import threading
+import timeit
+
+import numpy as np
+import psutil
+
+sys.path.append("../")
+from inference import StereoInferenceService, create_session  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+model_path = "../Models/daddy230210.onnx"
+input_shape = (1, 1, 192, 192)
+frames_per_eye = 300
+warmup_frames = 10
+##############################
+
+
+def rss():
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def run_eyes(run_fn):
+    """Drive two "eye" threads as fast as possible, return the wall time for all frames."""
+    frames = [np.random.rand(*input_shape).astype(np.float32) for _ in range(2)]
+    barrier = threading.Barrier(3)
+
+    def eye(eye_id):
+        for _ in range(warmup_frames):
+            run_fn(eye_id, frames[eye_id])
+        barrier.wait()
+        for _ in range(frames_per_eye):
+            run_fn(eye_id, frames[eye_id])
+        barrier.wait()
+
+    threads = [threading.Thread(target=eye, args=(eye_id,)) for eye_id in range(2)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = timeit.default_timer()
+    barrier.wait()
+    elapsed = timeit.default_timer() - start
+    for thread in threads:
+        thread.join()
+    return elapsed
+
+
+def report(name, elapsed, memory):
+    total = frames_per_eye * 2
+    print(
+        f"{name:<28} {total / elapsed:8.1f} frames/s  {format_time(elapsed / total):>10} per frame  "
+        f"session memory: {memory / 1024 / 1024:.1f} MiB"
+    )
+
+
+def bench_independent():
+    before = rss()
+    sessions = [create_session(model_path), create_session(model_path)]
+    memory = rss() - before
+    input_name = sessions[0].get_inputs()[0].name
+    elapsed = run_eyes(lambda eye_id, frame: sessions[eye_id].run(None, {input_name: frame}))
+    report("two independent sessions", elapsed, memory)
+
+
+def bench_stereo():
+    before = rss()
+    service = StereoInferenceService(create_session(model_path))
+    memory = rss() - before
+    elapsed = run_eyes(service.run)
+    report("shared stereo-batched", elapsed, memory)
+    print(f"{'':<28} {service.frames / service.batches:.2f} frames per session.run")
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    # stereo first, so the independent sessions can't reuse memory freed by it
+    bench_stereo()
+    bench_independent()
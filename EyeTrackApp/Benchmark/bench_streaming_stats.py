@@ -0,0 +1,86 @@
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append("../")
+from utils.streaming_stats import RollingMean, RollingQuantile  # noqa
+from utils.time_utils import format_time  # noqa
+
+##############################
+# These can be changed
+loop_num = 5000
+# (name, window, percentiles per frame), the window sizes the trackers use
+percentile_cases = [
+    ("BLINK", 300, [99, 1]),
+    ("IBO / pupil dilation", 400, [99]),
+    ("IBO, large filter", 2000, [99]),
+]
+mean_window = 30  # ibo_average_output_samples people run with
+##############################
+
+
+def make_samples():
+    # frame intensity sums, with some spikes like the filters are meant to catch
+    samples = np.random.normal(3e6, 2e5, loop_num)
+    samples[::97] *= 1.5
+    return samples
+
+
+def list_percentiles(samples, window, percentiles):
+    values = []
+    for sample in samples:
+        if len(values) < window:
+            values.append(sample)
+        else:
+            values.pop(0)
+            values.append(sample)
+        for q in percentiles:
+            np.percentile(values, q)
+
+
+def rolling_percentiles(samples, window, percentiles):
+    rolling = RollingQuantile(window)
+    for sample in samples:
+        rolling.append(sample)
+        for q in percentiles:
+            rolling.percentile(q)
+
+
+def list_mean(samples, window):
+    values = []
+    for sample in samples:
+        if len(values) < window:
+            values.append(sample)
+        else:
+            values.pop(0)
+            values.append(sample)
+            np.average(values)
+
+
+def rolling_mean(samples, window):
+    rolling = RollingMean(window)
+    for sample in samples:
+        rolling.append(sample)
+        if rolling.full:
+            rolling.mean()
+
+
+def bench(name, fn, *args):
+    elapsed = min(timeit.repeat(lambda: fn(*args), number=1, repeat=3))
+    print(f"  {name:<38} {format_time(elapsed / loop_num):>10} per frame")
+    return elapsed
+
+
+if __name__ == "__main__":
+    samples = make_samples()
+    for name, window, percentiles in percentile_cases:
+        print(f"{name}: window {window}, percentiles {percentiles}")
+        old = bench("list.pop(0) + np.percentile", list_percentiles, samples, window, percentiles)
+        new = bench("RollingQuantile", rolling_percentiles, samples, window, percentiles)
+        print(f"  {'speedup':<38} {old / new:>9.1f}x")
+
+    print(f"average output: window {mean_window}")
+    old = bench("list.pop(0) + np.average", list_mean, samples, mean_window)
+    new = bench("RollingMean", rolling_mean, samples, mean_window)
+    print(f"  {'speedup':<38} {old / new:>9.1f}x")
@@ -0,0 +1,67 @@
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append("../")
+from utils.calibration_3d import CalibrationProcessor  # noqa
+from utils.time_utils import format_time  # noqa
+from utils.vergence import eye_positions, vergence  # noqa
+
+##############################
+# These can be changed
+IPD = 0.058
+grid_size = 1000  # t values per ray the old grid search tried, it runs grid_size ** 2 line evaluations
+brute_force_grid = 200  # the full grid takes seconds per point, time a smaller one and scale it
+loop_num = 20000
+batch_size = 1000
+##############################
+
+
+def brute_force(left_dir, right_dir, t_values):
+    """The nested t1, t2 scan compute_convergence_point used to do."""
+    left_eye, right_eye = eye_positions(IPD)
+    min_distance = float("inf")
+    best_point = None
+    for t1 in t_values:
+        for t2 in t_values:
+            point1 = left_eye + t1 * left_dir
+            point2 = right_eye + t2 * right_dir
+            distance = np.linalg.norm(point1 - point2)
+            if distance < min_distance:
+                min_distance = distance
+                best_point = (point1 + point2) / 2
+    return best_point, min_distance
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    targets = rng.uniform([-0.5, -0.5, 0.3], [0.5, 0.5, 3.0], (batch_size, 3))
+    left_eye, right_eye = eye_positions(IPD)
+    left_dirs = targets - left_eye
+    right_dirs = targets - right_eye + rng.normal(0, 0.005, targets.shape)
+    left_dirs /= np.linalg.norm(left_dirs, axis=1, keepdims=True)
+    right_dirs /= np.linalg.norm(right_dirs, axis=1, keepdims=True)
+
+    t_values = np.linspace(-10, 10, brute_force_grid)
+    elapsed = timeit.timeit(lambda: brute_force(left_dirs[0], right_dirs[0], t_values), number=1)
+    print(f"grid search {brute_force_grid}x{brute_force_grid}: {format_time(elapsed)} per point")
+    print(f"grid search {grid_size}x{grid_size} (scaled): {format_time(elapsed * (grid_size / brute_force_grid) ** 2)}")
+
+    elapsed = timeit.timeit(lambda: vergence(left_dirs[0], right_dirs[0], IPD), number=loop_num)
+    print(f"closed form, one point: {format_time(elapsed / loop_num)}")
+
+    elapsed = timeit.timeit(lambda: vergence(left_dirs, right_dirs, IPD), number=loop_num // 100)
+    print(f"closed form, batch of {batch_size}: {format_time(elapsed / (loop_num // 100) / batch_size)} per point")
+
+    processor = CalibrationProcessor()
+    processor.receive_calibration_data(1, [(100 + 50 * x, 80 - 40 * y, 1) for x, y, _ in processor.gt_3d])
+    processor.receive_calibration_data(0, [(100 + 50 * x, 80 - 40 * y, 0) for x, y, _ in processor.gt_3d])
+    processor.update_point(1, 90, 75)
+    elapsed = timeit.timeit(lambda: processor.update_point(0, 110, 75), number=loop_num)
+    print(f"per frame update from eye points: {format_time(elapsed / loop_num)}")
+
+    best_point, min_distance = brute_force(left_dirs[0], right_dirs[0], np.linspace(-10, 10, brute_force_grid))
+    depth, ray_distance = vergence(left_dirs[0], right_dirs[0], IPD)
+    print(f"depth: grid {np.linalg.norm(best_point):.4f} closed form {depth:.4f}")
+    print(f"ray distance: grid {min_distance:.5f} closed form {ray_distance:.5f}")
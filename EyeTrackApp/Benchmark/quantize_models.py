@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnxruntime
+
+sys.path.append("../")
+from inference import DADDY_MODEL_FILE, LEAP_MODEL_FILE, get_quantized_model_file  # noqa
+from leap import gray_to_input_tensor, input_size as leap_size  # noqa
+
+# onnxruntime.quantization needs the `onnx` package, it is only required to build the models, not to run them.
+from onnxruntime.quantization import (  # noqa
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+
+##############################
+# These can be changed
+# Recorded eye videos (the same kind of file the app accepts as a camera address), both eyes welcome.
+calibration_videos = ["Pro_demo2.mp4"]
+calibration_frames = 300  # spread evenly over all videos
+static = True  # static uses the calibration set, dynamic only quantizes the weights
+per_channel = True
+models_dir = Path("../")
+##############################
+
+
+def daddy_input(gray_frame):
+    """Same preprocessing as DADDY_cls.single_run."""
+    frame_resize = cv2.resize(gray_frame, (192, 192))
+    return np.divide(frame_resize[np.newaxis, np.newaxis], 255, dtype=np.float32)
+
+
+def leap_input(gray_frame):
+    """Same preprocessing as LEAP_C.leap_run."""
+    return gray_to_input_tensor(gray_frame, np.empty((1, 1, leap_size, leap_size), dtype=np.float32))
+
+
+models = [
+    (DADDY_MODEL_FILE, daddy_input),
+    (LEAP_MODEL_FILE, leap_input),
+]
+
+
+def load_frames(video_paths, frame_num):
+    """Read `frame_num` gray frames spread evenly over the recordings."""
+    frames = []
+    per_video = max(1, frame_num // len(video_paths))
+    for video_path in video_paths:
+        cap = cv2.VideoCapture(str(video_path))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            print(f"\033[93m[WARN] Could not read {video_path}, skipping it\033[0m")
+            continue
+        for index in np.linspace(0, total - 1, min(per_video, total)).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        cap.release()
+    return frames
+
+
+class EyeFrameDataReader(CalibrationDataReader):
+    def __init__(self, input_name, frames, preprocess):
+        self.inputs = iter([{input_name: preprocess(frame)} for frame in frames])
+
+    def get_next(self):
+        return next(self.inputs, None)
+
+
+def quantize(model_path, preprocess, frames):
+    output_path = get_quantized_model_file(model_path)
+    if not static:
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8, per_channel=per_channel)
+        return output_path
+
+    input_name = onnxruntime.InferenceSession(str(model_path), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        model_path,
+        output_path,
+        EyeFrameDataReader(input_name, frames, preprocess),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    return output_path
+
+
+if __name__ == "__main__":
+    frames = load_frames(calibration_videos, calibration_frames) if static else []
+    if static and not frames:
+        sys.exit("\033[91m[ERROR] Static quantization needs calibration frames, check calibration_videos\033[0m")
+    print(f"\033[94m[INFO] Calibrating with {len(frames)} frames\033[0m")
+
+    for model_file, preprocess in models:
+        model_path = models_dir / model_file
+        if not model_path.is_file():
+            print(f"\033[93m[WARN] {model_path} not found, skipping it\033[0m")
+            continue
+        output_path = quantize(model_path, preprocess, frames)
+        print(
+            f"\033[92m[INFO] {model_path.name} ({model_path.stat().st_size / 1024:.0f} KiB) -> "
+            f"{output_path.name} ({output_path.stat().st_size / 1024:.0f} KiB)\033[0m"
+        )
@@ -27,52 +27,57 @@ LICENSE: Summer Software Distribution License 1.0
 ------------------------------------------------------------------------------------------------------
 """
 
-import numpy as np
+import cv2
 
+from utils.streaming_stats import RollingQuantile
 
-def BLINK(self):
 
-    if self.blink_clear == True:
-        self.max_ints = []
+class OpennessBlinkDetector:
+    """
+    Binary blink: the eye counts as closed while the frame is brighter than the darkest of the brightness peaks seen
+    after the warm up. Every frame costs the same no matter how long the session runs.
+    """
+
+    def __init__(self, filter_window=300, warmup_frames=300):
+        self.warmup_frames = warmup_frames  # TODO: test this number more (make it a setting??)
+        self.filter = RollingQuantile(filter_window)
+        self.reset()
+
+    def reset(self):
         self.max_int = 0
         self.frames = 0
+        # max_int only grows, so the peaks recorded after the warm up do too and the first one is their minimum
+        self.peak_count = 0
+        self.min_peak = None
 
-    intensity = np.sum(self.current_image_gray_clean)
+    @staticmethod
+    def measure(frame):
+        # cv2.sumElems is a SIMD pass, several times faster than np.sum and still exact
+        return sum(cv2.sumElems(frame))
 
-    if self.calibration_frame_counter == 300:
-        self.filterlist = []  # clear filter
-    if len(self.filterlist) < 300:
-        self.filterlist.append(intensity)
-    else:
-        self.filterlist.pop(0)
-        self.filterlist.append(intensity)
-    if (
-        intensity >= np.percentile(self.filterlist, 99)
-        or intensity <= np.percentile(self.filterlist, 1)
-        and len(self.max_ints) >= 1
-    ):  # filter abnormally high values
-        try:  # I don't want this here but I cant get python to stop crying when it's not
-            intensity = min(self.max_ints)
-        except:
-            pass
+    def update(self, intensity):
+        self.filter.append(intensity)
+        if (
+            intensity >= self.filter.percentile(99) or intensity <= self.filter.percentile(1) and self.peak_count >= 1
+        ):  # filter abnormally high values
+            if self.min_peak is not None:
+                intensity = self.min_peak
 
-    self.frames = self.frames + 1
-    if intensity > self.max_int:
-        self.max_int = intensity
-        if self.frames > 300:  # TODO: test this number more (make it a setting??)
-            self.max_ints.append(self.max_int)
-    if intensity < self.min_int:
-        self.min_int = intensity
+        self.frames = self.frames + 1
+        if intensity > self.max_int:
+            self.max_int = intensity
+            if self.frames > self.warmup_frames:
+                self.peak_count += 1
+                if self.min_peak is None:
+                    self.min_peak = self.max_int
 
-    if len(self.max_ints) > 1:
-        if intensity > min(self.max_ints):
-            blinkvalue = 0.0
-        else:
-            blinkvalue = 0.8
-    try:
-        return blinkvalue
-    except:
+        if self.peak_count > 1:
+            return 0.0 if intensity > self.min_peak else 0.8
         return 0.8
 
-
-# print(self.blinkvalue, self.max_int, self.min_int, self.frames, intensity)
+    def run(self, frame, calibration_frame_counter=None, clear=False):
+        if clear:
+            self.reset()
+        if calibration_frame_counter == 300:
+            self.filter.clear()  # clear filter
+        return self.update(self.measure(frame))
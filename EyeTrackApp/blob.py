@@ -35,7 +35,7 @@ def BLOB(self):
     # define circle
     _, larger_threshold = cv2.threshold(
         self.current_image_gray,
-        int(self.settings.gui_threshold),
+        int(self.snapshot.gui_threshold),
         255,
         cv2.THRESH_BINARY,
     )
@@ -62,8 +62,8 @@ def BLOB(self):
         # if our blob width/height are within boundaries, call that good.
 
         if (
-            not self.settings.gui_blob_minsize <= h <= self.settings.gui_blob_maxsize
-            or not self.settings.gui_blob_minsize <= w <= self.settings.gui_blob_maxsize
+            not self.snapshot.gui_blob_minsize <= h <= self.snapshot.gui_blob_maxsize
+            or not self.snapshot.gui_blob_minsize <= w <= self.snapshot.gui_blob_maxsize
         ):
             continue
 
@@ -0,0 +1,423 @@
+"""
+------------------------------------------------------------------------------------------------------
+
+                                               ,@@@@@@
+                                            @@@@@@@@@@@            @@@
+                                          @@@@@@@@@@@@      @@@@@@@@@@@
+                                        @@@@@@@@@@@@@   @@@@@@@@@@@@@@
+                                      @@@@@@@/         ,@@@@@@@@@@@@@
+                                         /@@@@@@@@@@@@@@@  @@@@@@@@
+                                    @@@@@@@@@@@@@@@@@@@@@@@@ @@@@@
+                                @@@@@@@@                @@@@@
+                              ,@@@                        @@@@&
+                                             @@@@@@.       @@@@
+                                   @@@     @@@@@@@@@/      @@@@@
+                                   ,@@@.     @@@@@@((@     @@@@(
+                                   //@@@        ,,  @@@@  @@@@@
+                                   @@@(                @@@@@@@
+                                   @@@  @          @@@@@@@@#
+                                       @@@@@@@@@@@@@@@@@
+                                      @@@@@@@@@@@@@(
+
+Copyright (c) 2025 EyeTrackVR <3
+LICENSE: Babble Software Distribution License 1.0
+------------------------------------------------------------------------------------------------------
+"""
+
+import os
+import time
+
+import numpy as np
+
+from eye import EyeId
+from utils.persistent_map import PersistentMap, read_legacy_png, read_map_file
+from utils.streaming_stats import RollingMean, RollingQuantile
+
+# HOW THIS WORKS:
+# IBO and pupil dilation both learn, for every pupil position, the smallest value seen there (most pupil / widest
+# pupil) and, globally, the largest one (closed eye / narrowest pupil). Their output is where the current value sits
+# between the two. Both learn on the same positions, so they share one map per eye with one channel each.
+
+INTENSITY = 0
+PUPIL_AREA = 1
+CHANNELS = (INTENSITY, PUPIL_AREA)
+
+# The last column of every channel holds [0] maxval, [1] rotation, [2] x, [3] y of the ROI the map was recorded with.
+META_ROWS = 4
+SAVE_INTERVAL = 11  # seconds between writes while the map keeps changing
+
+
+def csv2data(frameshape, filepath):
+    # For data checking
+    out = np.zeros(frameshape, dtype=np.uint32)
+    xy_list = []
+    val_list = []
+    with open(filepath, mode="r", encoding="utf-8") as in_f:
+        # Skip header.
+        _ = in_f.readline()
+        for s in in_f:
+            xyval = [int(val) for val in s.strip().split(",")]
+            xy_list.append((xyval[0], xyval[1]))
+            val_list.append(xyval[2])
+    xy_list = np.array(xy_list)
+    val_list = np.array(val_list)
+    out[xy_list[:, 1], xy_list[:, 0]] = val_list[:]
+    return out
+
+
+def data2csv(data_u32, filepath, name="value"):
+    # For data checking
+    nonzero_index = np.nonzero(data_u32)  # (row,col)
+    data_list = data_u32[nonzero_index].tolist()
+    datalines = ["{},{},{}\n".format(x, y, val) for y, x, val in zip(*nonzero_index, data_list)]
+    with open(filepath, "w", encoding="utf-8") as out_f:
+        out_f.write(f"x,y,{name}\n")
+        out_f.writelines(datalines)
+    return
+
+
+def pool_legacy_map(legacy, frameshape, cell_size):
+    """
+    The values of a per-value map of an older version (per pixel, or a grid of some cell size, with the meta in its last
+    column) pooled into `cell_size` cells of `frameshape`: the smallest seen value of each cell, the same as learning
+    on the coarse cell would have kept. None if the map was not recorded for `frameshape`.
+    """
+    height, width = frameshape
+    legacy_rows, legacy_cols = legacy.shape[0], legacy.shape[1] - 1
+    for legacy_cell in range(1, max(height, width) + 1):
+        if -(-width // legacy_cell) == legacy_cols and max(-(-height // legacy_cell), META_ROWS) == legacy_rows:
+            break
+    else:
+        return None
+    # back to one value per pixel
+    values = legacy[:, :legacy_cols].repeat(legacy_cell, axis=0).repeat(legacy_cell, axis=1)[:height, :width]
+    rows, cols = -(-height // cell_size), -(-width // cell_size)
+    padded = np.zeros((rows * cell_size, cols * cell_size), dtype=np.uint32)
+    padded[:height, :width] = values
+    # 0 is unseen, it must not win the minimum
+    padded[padded == 0] = np.iinfo(np.uint32).max
+    pooled = padded.reshape(rows, cell_size, cols, cell_size).min(axis=(1, 3))
+    pooled[pooled == np.iinfo(np.uint32).max] = 0
+    return pooled
+
+
+class PositionMap:
+    """
+    Calibration values keyed by the pupil position, quantized to `cell_size` px cells, `channels` values per cell.
+
+    Neighbouring pixels carry nearly the same information, so a coarse grid is a fraction of the size of
+    a per-pixel map and fills up much faster. The channels of a cell sit next to each other, so one lookup
+    reads all of them. 0 marks a value that was never seen, `population` counts the others per channel so
+    "is there any data" does not need a scan of the map.
+    """
+
+    def __init__(self, store: PersistentMap, cell_size=1, channels=1):
+        self.store = store
+        self.cell_size = max(1, int(cell_size))
+        self.channels = channels
+        self.data = None
+        self.rows = 0
+        self.cols = 0
+        self.population = [0] * channels
+
+    def grid_shape(self, frameshape):
+        return -(-frameshape[0] // self.cell_size), -(-frameshape[1] // self.cell_size)
+
+    def storage_shape(self, frameshape):
+        rows, cols = self.grid_shape(frameshape)
+        # stored as a 2D map, the channels of a cell side by side
+        return max(rows, META_ROWS), (cols + 1) * self.channels
+
+    def matches(self, frameshape, cell_size):
+        return (
+            self.data is not None
+            and self.cell_size == max(1, int(cell_size))
+            and (self.rows, self.cols) == self.grid_shape(frameshape)
+        )
+
+    def open(self, frameshape):
+        """Map the stored data for `frameshape`, False if there is none that fits."""
+        self.data = None
+        data = self.store.open(self.storage_shape(frameshape))
+        if data is None:
+            return False
+        self._attach(data, frameshape)
+        self.count()
+        return True
+
+    def reset(self, frameshape):
+        self.data = None  # release the old mapping before the file is recreated
+        self._attach(self.store.create(self.storage_shape(frameshape)), frameshape)
+        self.population = [0] * self.channels
+
+    def _attach(self, data, frameshape):
+        self.rows, self.cols = self.grid_shape(frameshape)
+        self.data = data.reshape(data.shape[0], -1, self.channels)
+
+    def count(self):
+        self.population = [int(np.count_nonzero(self.grid[..., channel])) for channel in range(self.channels)]
+
+    def clear(self, channel):
+        self.grid[..., channel] = 0
+        self.population[channel] = 0
+
+    def delete(self):
+        self.data = None
+        self.population = [0] * self.channels
+        self.store.delete()
+
+    def save(self):
+        self.store.flush_async()
+
+    @property
+    def grid(self):
+        return self.data[: self.rows, : self.cols]
+
+    @property
+    def meta(self):
+        return self.data[:META_ROWS, -1]
+
+    def cell(self, x, y):
+        return min(int(y) // self.cell_size, self.rows - 1), min(int(x) // self.cell_size, self.cols - 1)
+
+    def get(self, cell, channel=0):
+        return self.data[cell][channel]
+
+    def set(self, cell, value, channel=0):
+        values = self.data[cell]
+        if values[channel] == 0:
+            if value:
+                self.population[channel] += 1
+        elif not value:
+            self.population[channel] -= 1
+        values[channel] = value
+
+    def neighbour_mean(self, cell, channel=0):
+        """Mean of the seen cells around `cell`, 0 if none of them was seen yet."""
+        row, col = cell
+        window = self.grid[max(row - 1, 0) : row + 2, max(col - 1, 0) : col + 2, channel]
+        total = float(window.sum(dtype=np.float64))
+        count = int(np.count_nonzero(window))
+        own = self.data[cell][channel]
+        if own != 0:
+            # leave the cell itself out
+            total -= float(own)
+            count -= 1
+        return total / count if count else 0.0
+
+
+class CalibrationChannel:
+    """The learning for one value (intensity, pupil area) on the shared map, its output is 0-1."""
+
+    def __init__(self, calibration, index, name):
+        self.calibration = calibration
+        self.index = index
+        self.name = name
+        self.maxval = 0
+        self.prev_val = 0.5
+        self.filter_window = RollingQuantile(400)
+        self.average_window = RollingMean(1)
+
+    def clear(self):
+        self.filter_window.clear()
+        self.average_window.clear()
+        self.maxval = 0
+        self.calibration.clear(self.index)
+
+    def update(self, x, y, frameshape, value, filterSamples, outputSamples, cellSize=1, interpolateUnseen=False):
+        # x,y = 0~(frameshape[1 or 0]-1)
+        calibration = self.calibration
+        calibration.check(frameshape, cellSize)
+        position_map = calibration.map
+        int_x, int_y = int(x), int(y)
+        if int_x < 0 or int_y < 0:
+            return self.prev_val
+
+        self.filter_window.resize(filterSamples)
+        self.filter_window.append(value)
+        if value >= self.filter_window.percentile(99):  # filter abnormally high values
+            value = self.maxval
+
+        # out of the frame the value is learned on the edge cell, but not compared against it
+        oob = int_x >= frameshape[1] or int_y >= frameshape[0]
+        cell = position_map.cell(int_x, int_y)
+        channel = self.index
+        if not oob and position_map.population[channel] > 0:
+            data_val = position_map.get(cell, channel)
+        else:
+            data_val = 0
+
+        newval_flg = False
+        # max pupil per cord
+        if data_val == 0:
+            # The value of the specified coordinates has not yet been recorded.
+            neighbour_val = position_map.neighbour_mean(cell, channel) if interpolateUnseen else 0
+            if neighbour_val > 0:
+                # Start from what the cells around it learned instead of from scratch.
+                position_map.set(cell, min(value, int(neighbour_val)), channel)
+            else:
+                position_map.set(cell, value, channel)
+                newval_flg = True
+        elif value < data_val:  # if current value is less (more pupil), save that
+            position_map.set(cell, value, channel)
+        else:
+            # if current value is not less use this, this is an agressive adjust, test
+            position_map.set(cell, max(data_val + 5000, 1), channel)
+
+        # min pupil global
+        if self.maxval == 0:  # that value is not yet saved
+            self.maxval = value
+        elif value > self.maxval:  # if current value is more (less pupil), save that
+            self.maxval = value - 5
+        else:
+            # continuously adjust the closed value, will be set when user blink, used to allow eyes to close when lighting changes
+            self.maxval = max(self.maxval - 5, 1)
+
+        if newval_flg:
+            # Do the same thing as in the original version.
+            out = self.prev_val
+        else:
+            maxp = float(position_map.get(cell, channel))
+            minp = float(self.maxval)
+            if not np.isfinite(value) or not np.isfinite(maxp) or not np.isfinite(minp) or minp == maxp:
+                out = 0.5
+            else:
+                # for whatever reason when input and maxp are too close it outputs high
+                out = 1 - (value - maxp) / (minp - maxp)
+
+            if outputSamples > 0:
+                self.average_window.resize(outputSamples)
+                self.average_window.append(out)
+                if self.average_window.full:
+                    out = self.average_window.mean()
+
+            out = float(np.clip(out, 0.0, 1.0))
+
+        calibration.changed()
+        self.prev_val = out
+        return out
+
+
+class EyeCalibration:
+    """
+    The calibration map of one eye with one channel per learned value, loaded, checked and saved once for all of them.
+    IBO and pupil dilation are thin configurations on top of it.
+    """
+
+    def __init__(self, eye_id, cell_size=1):
+        # todo: It is necessary to consider whether the filename can be changed in the configuration file, etc.
+        side = "LEFT" if eye_id in [EyeId.LEFT] else "RIGHT"
+        self.map = PositionMap(PersistentMap(f"CALIBRATION_{side}.map"), cell_size, len(CHANNELS))
+        # maps of older versions, one per channel, newest format first. They are carried over when a new map is made.
+        self.legacy_files = {
+            INTENSITY: [f"IBO_{side}.map", f"IBO_{side}.png"],
+            PUPIL_AREA: [f"EBPD_{side}.map", f"EBPD_{side}.png"],
+        }
+        self.channels = [
+            CalibrationChannel(self, INTENSITY, "intensity"),
+            CalibrationChannel(self, PUPIL_AREA, "dilation"),
+        ]
+        # self.img_roi = self.now_roi == {"rotation": 0, "x": 0, "y": 0}
+        self.img_roi = np.zeros(3, dtype=np.int32)
+        self.now_roi = np.zeros(3, dtype=np.int32)
+        self.lct = None
+
+    def channel(self, index):
+        return self.channels[index]
+
+    def change_roi(self, roiinfo: dict):
+        self.now_roi[:] = [v for v in roiinfo.values()]
+
+    def check(self, frameshape, cell_size=1):
+        # 0 in data is used as the initial value.
+        self.load(frameshape, cell_size)
+        if self.lct is None:
+            self.lct = time.time()
+
+    def load(self, frameshape, cell_size=1):
+        position_map = self.map
+        req_newdata = False
+        if position_map.data is None or position_map.cell_size != max(1, int(cell_size)):
+            position_map.cell_size = max(1, int(cell_size))
+            print(f"\033[92m[INFO] Loaded calibration data: {position_map.store.path}\033[0m")
+            try:
+                if not position_map.open(frameshape):
+                    req_newdata = True
+                else:
+                    self.img_roi[:] = position_map.meta[1:4, 0]
+                    if not np.array_equal(self.img_roi, self.now_roi):
+                        # If the ROI recorded in the map file differs from the current ROI
+                        req_newdata = True
+                    else:
+                        for channel in self.channels:
+                            channel.maxval = position_map.meta[0, channel.index]
+            except Exception as e:
+                print("[ERROR] File read error: {} ({})".format(position_map.store.path, e))
+                req_newdata = True
+        elif not position_map.matches(frameshape, cell_size) or not np.array_equal(self.img_roi, self.now_roi):
+            # If the ROI recorded in the map file differs from the current ROI
+            # todo: Using the previous and current frame sizes and centre positions from the original, etc., the data can be ported to some extent, but there may be many areas where code changes are required.
+            print("[INFO] \033[94mFrame size changed.\033[0m")
+            req_newdata = True
+        if req_newdata:
+            print("\033[94m[INFO] Initialise calibration data.\033[0m")
+            position_map.reset(frameshape)
+            for channel in self.channels:
+                channel.maxval = 0
+            self.img_roi = self.now_roi.copy()
+            self.migrate_legacy_files(frameshape)
+        # data2csv(position_map.grid[..., INTENSITY], "a.csv", "intensity")
+
+    def changed(self):
+        if (time.time() - self.lct) > SAVE_INTERVAL:  # only write every few seconds to save disk usage
+            self.save()
+            self.lct = time.time()
+
+    def save(self):
+        if self.map.data is None:
+            return
+        meta = self.map.meta
+        for channel in self.channels:
+            meta[0, channel.index] = channel.maxval
+        meta[1:4] = self.now_roi[:, np.newaxis]
+        # The map is already updated in place, writing it to disk happens on the flusher thread.
+        self.map.save()
+
+    def clear(self, index):
+        """Forget what one channel learned, the others keep theirs."""
+        if self.map.data is not None:
+            self.map.clear(index)
+            self.save()
+
+    def migrate_legacy_files(self, frameshape):
+        """
+        Carry what the per-value maps of older versions learned into their channels of the new map. Files that were
+        recorded for another frame size or ROI are left alone, they may fit again later.
+        """
+        migrated = False
+        for index, paths in self.legacy_files.items():
+            paths = [path for path in paths if os.path.isfile(path)]
+            if not paths:
+                continue
+            path = paths[0]
+            try:
+                legacy = read_map_file(path) if path.endswith(".map") else read_legacy_png(path)
+            except Exception as e:
+                print("[ERROR] File read error: {} ({})".format(path, e))
+                continue
+            pooled = pool_legacy_map(legacy, frameshape, self.map.cell_size) if legacy.shape[0] >= META_ROWS else None
+            if pooled is None or not np.array_equal(legacy[1:4, -1].astype(np.int32), self.now_roi):
+                print(f"\033[93m[WARN] {path} was recorded for another frame size or ROI, not migrated.\033[0m")
+                continue
+            self.map.grid[..., index] = pooled
+            self.channels[index].maxval = legacy[0, -1]
+            migrated = True
+            print(f"\033[94m[INFO] Migrated {path} to {self.map.store.path}\033[0m")
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"\033[93m[WARN] Could not remove {path}: {e}\033[0m")
+        if migrated:
+            self.map.count()
+            self.save()
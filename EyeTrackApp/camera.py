@@ -229,7 +229,7 @@ class Camera:
 
 
             if should_push:
-                self.push_image_to_queue(image, frame_number, self.fps)
+                self.push_image_to_queue(image, frame_number, self.fps, current_frame_time)
         except:
             print(
                 f"{Fore.YELLOW}[WARN] Capture source problem, assuming camera disconnected, waiting for reconnect.{Fore.RESET}"
@@ -294,7 +294,7 @@ class Camera:
                     self.bps = image.nbytes * self.fps
                     self.frame_number = self.frame_number + 1
                     if should_push:
-                        self.push_image_to_queue(image, self.frame_number, self.fps)
+                        self.push_image_to_queue(image, self.frame_number, self.fps, current_frame_time)
         except Exception:
             print(
                 f"{Fore.YELLOW}[WARN] Serial capture source problem, assuming camera disconnected, waiting for reconnect.{Fore.RESET}"
@@ -329,7 +329,7 @@ class Camera:
             print(f"{Fore.CYAN}[INFO] Failed to connect on {port}{Fore.RESET}")
             self.camera_status = CameraState.DISCONNECTED
 
-    def push_image_to_queue(self, image, frame_number, fps):
+    def push_image_to_queue(self, image, frame_number, fps, capture_time):
         # If there's backpressure, just yell. We really shouldn't have this unless we start getting
         # some sort of capture event conflict though.
         qsize = self.camera_output_outgoing.qsize()
@@ -337,5 +337,6 @@ class Camera:
             print(
                 f"{Fore.YELLOW}[WARN] CAPTURE QUEUE BACKPRESSURE OF {qsize}. CHECK FOR CRASH OR TIMING ISSUES IN ALGORITHM.{Fore.RESET}"
             )
-        self.camera_output_outgoing.put((image, frame_number, fps))
+        # the capture time lets the filters follow the camera timing rather than the processing timing
+        self.camera_output_outgoing.put((image, frame_number, fps, capture_time))
         self.capture_event.clear()
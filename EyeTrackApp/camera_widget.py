@@ -25,7 +25,8 @@ LICENSE: Babble Software Distribution License 1.0
 """
 
 import PySimpleGUI as sg
-from config import EyeTrackConfig
+from config import EyeTrackConfig, SettingsPublisher
+from osc.OSCMailbox import OSCMailbox
 from collections import deque
 from threading import Event, Thread
 import math
@@ -45,7 +46,13 @@ Y = 1
 
 
 class CameraWidget:
-    def __init__(self, widget_id: EyeId, main_config: EyeTrackConfig, osc_queue: Queue):
+    def __init__(
+        self,
+        widget_id: EyeId,
+        main_config: EyeTrackConfig,
+        osc_queue: OSCMailbox,
+        settings_publisher: SettingsPublisher = None,
+    ):
         self.gui_camera_addr = f"-CAMERAADDR{widget_id}-"
         self.gui_rotation_slider = f"-ROTATIONSLIDER{widget_id}-"
         self.gui_rotation_ui_padding = f"-ROTATIONUIPADDING{widget_id}-"
@@ -101,6 +108,7 @@ class CameraWidget:
             self.image_queue,
             self.eye_id,
             self.osc_queue,
+            settings_publisher,
         )
 
         self.camera_status_queue = Queue()
@@ -348,6 +356,14 @@ class CameraWidget:
             self.stop()
             self.start()
 
+        # the neural network sessions are built with the inference settings, so they need to be recreated
+        if any(key.startswith("onnx_") for key in keys):
+            was_started = self.started()
+            self.stop()
+            self.ransac.reset_inference()
+            if was_started:
+                self.start()
+
     def recenter_eyes(self):
         self.settings.gui_recenter_eyes = True
 
@@ -24,19 +24,119 @@ LICENSE: Babble Software Distribution License 1.0
 ------------------------------------------------------------------------------------------------------
 """
 
+import atexit
 import json
 import os.path
-import shutil
+import threading
 
 from colorama import Fore
 from pydantic import BaseModel
-from typing import Any, Union, List
+from typing import Any, Union, List, Optional
 import os
 
 from eye import EyeId
 
 CONFIG_FILE_NAME: str = "eyetrack_settings.json"
 BACKUP_CONFIG_FILE_NAME: str = "eyetrack_settings.backup"
+CONFIG_SAVE_DEBOUNCE: float = 0.5
+
+
+def write_atomic(path, text):
+    """Writes to a temporary file next to path and renames it over, readers see the old or the new file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class ConfigWriter:
+    """
+    Saves the config from a background thread. request() only hands over the config, so the GUI and the
+    tracking threads never wait on file I/O; every request within `debounce` seconds of the first pending
+    one goes out with a single write.
+
+    The backup is the text this writer last read or wrote, which is known to load, instead of the file
+    on disk parsed again before every save.
+    """
+
+    def __init__(self, path, backup_path, debounce=CONFIG_SAVE_DEBOUNCE):
+        self.path = path
+        self.backup_path = backup_path
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.requested = threading.Event()
+        self.stopped = threading.Event()
+        self.config: Optional["EyeTrackConfig"] = None
+        self.last_good: Optional[str] = None
+        self.thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.writes = 0
+
+    def request(self, config):
+        with self.lock:
+            self.config = config
+            self.requests += 1
+            if self.thread is None:
+                self.stopped.clear()
+                self.thread = threading.Thread(target=self.run, name="ConfigWriter", daemon=True)
+                self.thread.start()
+        self.requested.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.requested.wait()
+            # collect whatever else comes in the window, stop() ends the wait early
+            self.stopped.wait(self.debounce)
+            self.requested.clear()
+            self.try_flush()
+
+    def try_flush(self):
+        """flush(), a failed write is logged and its config stays pending for the next try."""
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"\033[91m[ERROR] Failed to save the config, retrying with the next save: {e}\033[0m")
+
+    def flush(self):
+        """Writes a pending config now, on the calling thread."""
+        with self.write_lock:
+            with self.lock:
+                config, self.config = self.config, None
+            if config is None:
+                return
+            try:
+                text = json.dumps(config.model_dump(warnings=False))
+                if text == self.last_good:
+                    return
+                if self.last_good is not None:
+                    write_atomic(self.backup_path, self.last_good)
+                write_atomic(self.path, text)
+            except Exception:
+                with self.lock:
+                    # a newer request replaces it anyway
+                    if self.config is None:
+                        self.config = config
+                raise
+            self.last_good = text
+            self.writes += 1
+        print(f"\033[92m[INFO] Config Saved Successfully\033[0m")
+
+    def stop(self):
+        """Writes what is pending and ends the background thread."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.stopped.set()
+            self.requested.set()
+            thread.join()
+        self.try_flush()
+
+
+config_writer = ConfigWriter(CONFIG_FILE_NAME, BACKUP_CONFIG_FILE_NAME)
+atexit.register(config_writer.stop)
 
 
 class EyeTrackCameraConfig(BaseModel):
@@ -172,6 +272,9 @@ class EyeTrackSettingsConfig(BaseModel):
     ibo_filter_samples: int = 400
     ibo_average_output_samples: int = 0
     ibo_fully_close_eye_threshold: float = 0.3
+    ibo_grid_cell_size: int = 4
+    ibo_interpolate_unseen: bool = True
+    ibo_window_radius_scale: float = 2.5
     leap_calibration_samples: int = 2000
     calibration_samples: int = 600
     osc_right_eye_close_address: str = "/avatar/parameters/RightEyeLidExpandedSqueeze"
@@ -189,6 +292,7 @@ class EyeTrackSettingsConfig(BaseModel):
     gui_left_eye_dominant: bool = False
     gui_outer_side_falloff: bool = False
     gui_eye_dominant_diff_thresh: float = 0.3
+    gui_saccade_velocity_thresh: float = 2.0
 
     gui_legacy_ransac: bool = False
     gui_legacy_ransac_thresh_right: int = 80
@@ -197,6 +301,17 @@ class EyeTrackSettingsConfig(BaseModel):
     gui_osc_vrcft_v1: bool = False
     gui_osc_vrcft_v2: bool = False
     gui_vrc_native: bool = True
+    gui_osc_bundle_native: bool = False
+    gui_osc_bundle_v1: bool = False
+    gui_osc_bundle_v2: bool = False
+    gui_osc_max_rate: int = 0
+    osc_binocular_pair_tolerance: float = 0.004
+    osc_binocular_pair_timeout: float = 0.1
+    output_sinks: List[str] = []
+    output_binary_address: str = "127.0.0.1"
+    output_binary_port: int = 8890
+    output_unix_path: str = "etvr_eye_output.sock"
+    output_shm_name: str = "etvr_eye_output"
     gui_pupil_dilation: bool = False
 
     gui_VRCFTModulePort: int = 8889
@@ -217,6 +332,79 @@ class EyeTrackSettingsConfig(BaseModel):
     gui_OutputMultiplier: float = 1
     gui_use_module: bool = False
 
+    onnx_intra_op_threads: int = 1
+    onnx_inter_op_threads: int = 1
+    onnx_parallel_execution: bool = False
+    onnx_enable_mem_pattern: bool = True
+    onnx_enable_cpu_mem_arena: bool = True
+    onnx_cache_optimized_models: bool = True
+    onnx_use_quantized_models: bool = False
+    onnx_leap_workers: int = 1
+    onnx_leap_max_result_age: int = 0
+
+
+# changed directly by the tracking and GUI code, not through EyeTrackConfig.update, so never in a snapshot
+LIVE_SETTINGS = {"gui_recenter_eyes", "grab_3d_point", "gui_disable_gui", "tracker_single_eye"}
+# numbers the settings GUI keeps as text
+NUMERIC_TEXT_SETTINGS = {"gui_min_cutoff", "gui_speed_coefficient"}
+# the type every number setting has in the snapshot, settings modules may store them as the text they validated
+NUMBER_SETTINGS = {
+    name: float if name in NUMERIC_TEXT_SETTINGS else field.annotation
+    for name, field in EyeTrackSettingsConfig.model_fields.items()
+    if name in NUMERIC_TEXT_SETTINGS or field.annotation in (int, float)
+}
+
+
+class SettingsSnapshot:
+    """
+    Read-only copy of EyeTrackSettingsConfig for the per frame code. Number settings stored as text are
+    converted to the type of their field once here, a value that isn't a number falls back to the default
+    with a warning, and lists become tuples. The settings in LIVE_SETTINGS are not copied, read those from
+    the settings themselves.
+    """
+
+    __slots__ = tuple(name for name in EyeTrackSettingsConfig.model_fields if name not in LIVE_SETTINGS)
+
+    def __init__(self, settings: EyeTrackSettingsConfig):
+        for name in self.__slots__:
+            value = getattr(settings, name)
+            number_type = NUMBER_SETTINGS.get(name)
+            if number_type is not None and isinstance(value, str):
+                value = self.to_number(name, value, number_type)
+            elif isinstance(value, list):
+                value = tuple(value)
+            object.__setattr__(self, name, value)
+
+    @staticmethod
+    def to_number(name, value, number_type):
+        try:
+            return number_type(float(value))
+        except ValueError:
+            default = EyeTrackSettingsConfig.model_fields[name].default
+            print(f"\033[93m[WARN] {name} must be a legal number, using {default}.\033[0m")
+            return number_type(float(default))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"settings snapshots are read-only, change {name} through EyeTrackConfig.update")
+
+
+class SettingsPublisher:
+    """
+    Keeps a SettingsSnapshot of the settings current. on_config_update is a config listener, register it
+    before the listeners that restart processing. Each update replaces the snapshot reference in one store,
+    so a processor that takes `snapshot` once per frame sees one whole set of settings for that frame.
+    """
+
+    def __init__(self, settings: EyeTrackSettingsConfig):
+        self.settings = settings
+        self.snapshot = SettingsSnapshot(settings)
+
+    def on_config_update(self, data: dict):
+        if not EyeTrackSettingsConfig.model_fields.keys() & data.keys():
+            # a camera config change
+            return
+        self.snapshot = SettingsSnapshot(self.settings)
+
 
 class EyeTrackConfig(BaseModel):
     version: int = 1
@@ -233,7 +421,11 @@ class EyeTrackConfig(BaseModel):
             return EyeTrackConfig()
         try:
             with open(CONFIG_FILE_NAME, "r") as settings_file:
-                return EyeTrackConfig(**json.load(settings_file))
+                text = settings_file.read()
+            config = EyeTrackConfig(**json.loads(text))
+            # valid, it is what a backup will be made of
+            config_writer.last_good = text
+            return config
         except json.JSONDecodeError:
             print("[INFO] Failed to load settings file")
             load_config = None
@@ -309,22 +501,12 @@ class EyeTrackConfig(BaseModel):
             self.save()
 
     def save(self):
-        # make sure this is only called if there is a change
-        if os.path.exists(CONFIG_FILE_NAME):
-            try:
-                # Verify existing configuration files.
-                with open(CONFIG_FILE_NAME, "r") as settings_file:
-                    EyeTrackConfig(**json.load(settings_file))
-                shutil.copy(CONFIG_FILE_NAME, BACKUP_CONFIG_FILE_NAME)
-                # print("Backed up settings files.") # Comment out because it's too loud.
-            except shutil.SameFileError:
-                pass
-            except json.JSONDecodeError:
-                # No backup because the saved settings file is broken.
-                pass
-        with open(CONFIG_FILE_NAME, "w") as settings_file:
-            json.dump(obj=self.model_dump(warnings=False), fp=settings_file)
-        print(f"\033[92m[INFO] Config Saved Successfully\033[0m")
+        # written by the config writer thread shortly after, saves close together become one write
+        config_writer.request(self)
+
+    def flush(self):
+        """Writes a pending save right away, before the app exits."""
+        config_writer.stop()
 
     def register_listener_callback(self, callback):
         print(f"[DEBUG] Registering listener {callback}")
@@ -29,25 +29,21 @@ LICENSE: Babble Software Distribution License 1.0
 import sys
 from typing import Tuple
 import math
-import platform
 import numpy as np
 import cv2
-import onnxruntime
-from one_euro_filter import OneEuroFilter
-from utils.misc_utils import FastMedian, resource_path
+from eye import EyeId
+from inference import DADDY_MODEL_FILE, get_inference_service, resolve_model_path
+from one_euro_filter import OneEuroFilterBank
+from utils.misc_utils import FastMedian
 import os
 
-os.environ["OMP_NUM_THREADS"] = "1"
 # DADDY
 # Please change the name of this script and the name of the method if you have something better.
 video_path = "ezgif.com-gif-maker.avi"
 input_size = 192  # Do not change this number.
 heatmap_size = 48  # Do not change this number.
 kernel_size = 7
-if platform.system() == "Darwin":
-    model_file = "Models/daddy230210.onnx"  # The model file name will be changed when performance stabilises.  # funny MacOS files issues :P
-else:
-    model_file = "Models/daddy230210.onnx"  # The model file name will be changed when performance stabilises.
+model_file = DADDY_MODEL_FILE
 
 
 # SHA256 for model version verification
@@ -212,27 +208,16 @@ class BEER(object):
 
 # Deep leArning lanDmark Detection for eYes
 class DADDY_cls(object):
-    def __init__(self):
-        onnxruntime.disable_telemetry_events()
-        options = onnxruntime.SessionOptions()
-        options.inter_op_num_threads = 1  # This number should be changed accordingly
-        options.intra_op_num_threads = 1  # This number should be changed accordingly
-        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
-        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
-
-        ort_session = onnxruntime.InferenceSession(
-            resource_path(model_file), sess_options=options, providers=["CPUExecutionProvider"]
-        )
-        ort_session.set_providers(["CPUExecutionProvider"])  # only cpu mode
-
-        self.ort_session = ort_session
-        self.input_name = ort_session.get_inputs()[0].name
-        self.output_name = ort_session.get_outputs()[0].name
+    def __init__(self, eye_id=EyeId.RIGHT, settings=None):
+        # The session is shared with the other eye, frames of both eyes get batched together.
+        self.eye_id = eye_id
+        self.inference_service = get_inference_service(resolve_model_path(model_file, settings), settings)
 
         min_cutoff = 0.0004
         beta = 0.9
         input_point = np.zeros((11, 2))  # np.array([1, 1])
-        self.one_euro_filter = OneEuroFilter(input_point, min_cutoff=min_cutoff, beta=beta)
+        self.one_euro_filter = OneEuroFilterBank(input_point, min_cutoff=min_cutoff, beta=beta)
+        self.timestamp = None
         # self.ear_oef = OneEuroFilter(
         #     np.zeros(1),
         #     min_cutoff=min_cutoff,
@@ -278,7 +263,7 @@ class DADDY_cls(object):
         frame_resize = cv2.resize(gray_frame, (input_size, input_size))
         imgs = np.divide(frame_resize[np.newaxis, np.newaxis], 255, dtype=np.float32)  # input/255.0
 
-        pred_heatmap = self.ort_session.run(None, {self.input_name: imgs})[0]  # .reshape((-1, 2))
+        pred_heatmap = self.inference_service.run(self.eye_id, imgs)[0]  # .reshape((-1, 2))
         # if imshow_enable:
         #     heatmap = pred_heatmap.reshape((-1, heatmap_size, heatmap_size))
         #     for i in range(heatmap.shape[0]):
@@ -297,7 +282,7 @@ class DADDY_cls(object):
         # pred[:, 0] *= scale_x
         # pred[:, 1] *= scale_y
 
-        pred = self.one_euro_filter(pred)
+        pred = self.one_euro_filter(pred, self.timestamp)
         kps = pred.astype(np.int32)
 
         # eyecenter = kps[:6].mean(axis=0).astype(int)
@@ -340,11 +325,12 @@ class DADDY_cls(object):
 
 
 class External_Run_DADDY(object):
-    def __init__(self):
-        self.algo = DADDY_cls()
+    def __init__(self, eye_id=EyeId.RIGHT, settings=None):
+        self.algo = DADDY_cls(eye_id, settings)
 
-    def run(self, current_image_gray):
+    def run(self, current_image_gray, timestamp=None):
         self.algo.current_image_gray = current_image_gray
+        self.algo.timestamp = timestamp
         pupil_x, pupil_y, ear = self.algo.single_run()
         return pupil_x, pupil_y, ear
 
@@ -26,6 +26,7 @@ LICENSE: Babble Software Distribution License 1.0
 
 from dataclasses import dataclass
 from enum import Enum, IntEnum
+from typing import Optional
 
 
 class EyeId(IntEnum):
@@ -56,3 +57,7 @@ class EyeInfo:
     pupil_dilation: float
     blink: float
     avg_velocity: float
+    vergence_depth: Optional[float] = None
+    ray_distance: Optional[float] = None
+    timestamp: Optional[float] = None  # capture time of the frame
+    saccade: bool = False  # the eye is in a saccade, not fixating
@@ -30,9 +30,8 @@ LICENSE: Babble Software Distribution License 1.0
 
 import sys
 import asyncio
-import os
 from config import EyeTrackCameraConfig
-from config import EyeTrackSettingsConfig
+from config import EyeTrackSettingsConfig, SettingsPublisher
 from pye3d.camera import CameraModel
 from pye3d.detector_3d import Detector3D, DetectorMode
 import queue
@@ -45,11 +44,12 @@ from ransac import *
 from blink import *
 from utils.img_utils import circle_crop
 from eye import EyeInfo, EyeInfoOrigin
+from calibration_map import EyeCalibration
 from intensity_based_openness import *
 from ellipse_based_pupil_dilation import *
 from AHSF import *
 from osc.OSCMessage import OSCMessageType, OSCMessage
-os.environ["OMP_NUM_THREADS"] = "1"
+from one_euro_filter import ScalarOneEuroFilter
 sys.path.append(".")
 
 def run_once(f):
@@ -79,11 +79,15 @@ class EyeProcessor:
         capture_queue_incoming: "queue.Queue(maxsize=2)",
         image_queue_outgoing: "queue.Queue(maxsize=2)",
         eye_id,
-        osc_queue: queue.Queue,
+        osc_queue: "OSCMailbox",
+        settings_publisher: "SettingsPublisher" = None,
     ):
         self.main_config = EyeTrackSettingsConfig
         self.config = config
         self.settings = settings
+        # per frame reads go through the snapshot, taken again before every frame
+        self.settings_publisher = settings_publisher or SettingsPublisher(settings)
+        self.snapshot = self.settings_publisher.snapshot
         self.eye_id = eye_id
         # Cross-thread communication management
         self.capture_queue_incoming = capture_queue_incoming
@@ -92,7 +96,6 @@ class EyeProcessor:
         self.capture_event = capture_event
         self.eye_id = eye_id
         self.baseconfig = baseconfig
-        self.filterlist = []
         self.left_eye_data = [(0.351, 0.399, 1), (0.352, 0.400, 1)]  # Example data
         self.right_eye_data = [(0.351, 0.399, 1), (0.352, 0.400, 1)]  # Example data
         self.osc_queue = osc_queue
@@ -109,6 +112,7 @@ class EyeProcessor:
         self.current_image_gray = None
         self.current_frame_number = None
         self.current_fps = None
+        self.current_frame_time = None
         self.threshold_image = None
         self.thresh = None
         # Calibration Values
@@ -117,6 +121,8 @@ class EyeProcessor:
         # Keep large in order to recenter correctly
         self.calibration_frame_counter = None
         self.calibration_3d_frame_counter = None
+        self.vergence = None
+        self.cal_state = EyeCalibrationState(self.config)
         self.eyeoffx = 1
         self.printcal = True
         self.grab_3d_point = False
@@ -135,8 +141,10 @@ class EyeProcessor:
         self.er_hsrac = None
         self.er_daddy = None
         self.er_leap = None
-        self.ibo = IntensityBasedOpeness(self.eye_id)
-        self.ebpd = EllipseBasedPupilDilation(self.eye_id)
+        # IBO and pupil dilation learn on one shared map per eye
+        self.calibration = EyeCalibration(self.eye_id)
+        self.ibo = IntensityBasedOpeness(self.eye_id, self.calibration)
+        self.ebpd = EllipseBasedPupilDilation(self.eye_id, self.calibration)
         self.roi_include_set = {"rotation_angle", "roi_window_x", "roi_window_y"}
         self.failed = 0
         self.skip_blink_detect = False
@@ -145,10 +153,7 @@ class EyeProcessor:
         self.rawx = 0.0
         self.rawy = 0.0
         self.eyeopen = 0.9
-        self.max_ints = []
-        self.max_int = 0
-        self.min_int = 4000000000000
-        self.frames = 0
+        self.blink_detector = OpennessBlinkDetector()
         self.blinkvalue = False
         self.hasrac_en = False
         self.radius = 10
@@ -168,15 +173,17 @@ class EyeProcessor:
         self.er_ahsf = None
 
 
-        try:
-            min_cutoff = float(self.settings.gui_min_cutoff)  # 0.0004
-            beta = float(self.settings.gui_speed_coefficient)  # 0.9
-        except:
-            print("\033[93m[WARN] OneEuroFilter values must be a legal number.\033[0m")
-            min_cutoff = 0.0004
-            beta = 0.9
-        noisy_point = np.array([1, 1])
-        self.one_euro_filter = OneEuroFilter(noisy_point, min_cutoff=min_cutoff, beta=beta)
+        # the snapshot has already checked and converted them
+        self.one_euro_filter = ScalarOneEuroFilter(
+            (1.0, 1.0), min_cutoff=self.snapshot.gui_min_cutoff, beta=self.snapshot.gui_speed_coefficient
+        )
+
+    def reset_inference(self):
+        # Drop the DADDY/LEAP runners, run() recreates them with the current inference settings.
+        if self.er_leap is not None:
+            self.er_leap.shutdown()
+        self.er_leap = None
+        self.er_daddy = None
 
     def output_images_and_update(self, threshold_image, output_information: EyeInfo):
         #  try:  # I do not like this try.
@@ -203,7 +210,7 @@ class EyeProcessor:
     def capture_crop_rotate_image(self):
         # Get our current frame
 
-        self.ibo.change_roi(self.config.dict(include=self.roi_include_set))
+        self.calibration.change_roi(self.config.dict(include=self.roi_include_set))
         roi_x = self.config.roi_window_x
         roi_y = self.config.roi_window_y
         roi_w = self.config.roi_window_w
@@ -278,36 +285,57 @@ class EyeProcessor:
         except:
             pass
 
+    def ibo_window_radius(self):
+        # Sized from the pupil radius HSF works with, or the configured one while HSF is not running.
+        # self.radius can't be used, DADDY puts the eye aspect ratio there.
+        if self.er_hsf is not None:
+            radius = self.er_hsf.radius
+        elif self.eye_id in [EyeId.LEFT]:
+            radius = self.snapshot.gui_HSF_radius_left
+        else:
+            radius = self.snapshot.gui_HSF_radius_right
+        return int(round(self.snapshot.ibo_window_radius_scale * radius))
+
     def UPDATE(self):
 
-        if self.settings.gui_BLINK:
-            self.eyeopen = BLINK(self)
+        if self.snapshot.gui_BLINK:
+            self.eyeopen = self.blink_detector.run(
+                self.current_image_gray_clean, self.calibration_frame_counter, self.blink_clear
+            )
 
         if (
-            self.settings.gui_IBO and self.eyeopen != 0.0
+            self.snapshot.gui_IBO and self.eyeopen != 0.0
         ):  # TODO make ransac blink it's pwn self var to rid of this non-sense
             self.eyeopen = self.ibo.intense(
                 self.rawx,
                 self.rawy,
                 self.current_image_white,
-                self.settings.ibo_filter_samples,
-                self.settings.ibo_average_output_samples,
+                self.snapshot.ibo_filter_samples,
+                self.snapshot.ibo_average_output_samples,
+                self.snapshot.ibo_grid_cell_size,
+                self.snapshot.ibo_interpolate_unseen,
+                self.ibo_window_radius(),
             )
             # threshold so the eye fully closes
-            if self.eyeopen < float(self.settings.ibo_fully_close_eye_threshold):
+            if self.eyeopen < self.snapshot.ibo_fully_close_eye_threshold:
                 self.eyeopen = 0.0
 
             if self.bd_blink == True:
                 print("blinks")
                 pass
 
-        if self.settings.gui_LEAP_lid and self.eyeopen != 0.0 and not self.settings.gui_LEAP:
+        if self.snapshot.gui_LEAP_lid and self.eyeopen != 0.0 and not self.snapshot.gui_LEAP:
             (
                 self.current_image_gray,
                 self.rawx,
                 self.rawy,
                 self.eyeopen,
-            ) = self.er_leap.run(self.current_image_gray, self.current_image_gray_clean, self.calibration_frame_counter)
+            ) = self.er_leap.run(
+                self.current_image_gray,
+                self.current_image_gray_clean,
+                self.calibration_frame_counter,
+                self.current_frame_time,
+            )
 
         if len(self.prev_y_list) >= 100:  # "lock" eye when close/blink IN TESTING, kinda broke
             self.prev_y_list.pop(0)
@@ -321,15 +349,18 @@ class EyeProcessor:
             # self.out_x = sum(self.prev_x_list) / len(self.prev_x_list)
             self.out_y = sum(self.prev_y_list) / len(self.prev_y_list)
 
-        if self.settings.gui_pupil_dilation:
+        if self.snapshot.gui_pupil_dilation:
             self.pupil_dilation = self.ebpd.intense(
                 self.pupil_width,
                 self.pupil_height,
                 self.rawx,
                 self.rawy,
                 self.current_image_white,
-                self.settings.ibo_filter_samples,
-                self.settings.ibo_average_output_samples,
+                self.snapshot.ibo_filter_samples,
+                self.snapshot.ibo_average_output_samples,
+                self.snapshot.ibo_grid_cell_size,
+                self.snapshot.ibo_interpolate_unseen,
+                self.current_frame_time,
             )
         else:
             self.pupil_dilation = 0.5
@@ -347,6 +378,9 @@ class EyeProcessor:
                 self.pupil_dilation,
                 self.eyeopen,
                 self.avg_velocity,
+                *(self.vergence or (None, None)),
+                timestamp=self.current_frame_time,
+                saccade=self.cal_state.velocity.saccade,
             ),
         )
 
@@ -361,6 +395,9 @@ class EyeProcessor:
                     self.pupil_dilation,
                     self.eyeopen,
                     self.avg_velocity,
+                    *(self.vergence or (None, None)),
+                    timestamp=self.current_frame_time,
+                    saccade=self.cal_state.velocity.saccade,
                 ),
             ),
         )
@@ -368,14 +405,19 @@ class EyeProcessor:
         self.eyeopen = 0.8  # TODO: remove this by fixing checks if is 0.0
 
     def BLINKM(self):
-        self.eyeopen = BLINK(self)
+        self.eyeopen = self.blink_detector.run(
+            self.current_image_gray_clean, self.calibration_frame_counter, self.blink_clear
+        )
 
     def LEAPM(self):
         self.thresh = self.current_image_gray.copy()
         (self.current_image_gray, self.rawx, self.rawy, eyeopen,) = self.er_leap.run(
-            self.current_image_gray, self.current_image_gray_clean, self.calibration_frame_counter
+            self.current_image_gray,
+            self.current_image_gray_clean,
+            self.calibration_frame_counter,
+            self.current_frame_time,
         )  # TODO: make own self var and LEAP toggle
-        if self.settings.gui_LEAP_lid:
+        if self.snapshot.gui_LEAP_lid:
             self.eyeopen = eyeopen
         self.thresh = self.current_image_gray.copy()
         # todo: lorow, fix this as well
@@ -386,19 +428,19 @@ class EyeProcessor:
         # todo: We should have a proper variable for drawing.
         # self.thresh = self.current_image_gray.copy()
         self.thresh = self.current_image_gray.copy()
-        self.rawx, self.rawy, self.radius = self.er_daddy.run(self.current_image_gray)
+        self.rawx, self.rawy, self.radius = self.er_daddy.run(self.current_image_gray, self.current_frame_time)
         # Daddy also uses a one euro filter, so I'll have to use it twice, but I'm not going to think too much about it.
         self.out_x, self.out_y, self.avg_velocity = cal.cal_osc(self, self.rawx, self.rawy, self.angle)
         self.current_algorithm = EyeInfoOrigin.DADDY
 
     def AHSFRACM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -425,20 +467,20 @@ class EyeProcessor:
             self.pupil_width,
             self.pupil_height,
         ) = RANSAC3D(self, True)
-        if self.settings.gui_RANSACBLINK:  # might be redundant
+        if self.snapshot.gui_RANSACBLINK:  # might be redundant
             self.eyeopen = ranblink
 
         self.out_x, self.out_y, self.avg_velocity = cal.cal_osc(self, self.rawx, self.rawy, self.angle)
         self.current_algorithm = EyeInfoOrigin.HSRAC
 
     def HSRACM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -456,20 +498,20 @@ class EyeProcessor:
             self.pupil_width,
             self.pupil_height,
         ) = RANSAC3D(self, True)
-        if self.settings.gui_RANSACBLINK:  # might be redundant
+        if self.snapshot.gui_RANSACBLINK:  # might be redundant
             self.eyeopen = ranblink
 
         self.out_x, self.out_y, self.avg_velocity = cal.cal_osc(self, self.rawx, self.rawy, self.angle)
         self.current_algorithm = EyeInfoOrigin.HSRAC
 
     def HSFM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -481,13 +523,13 @@ class EyeProcessor:
         self.current_algorithm = EyeInfoOrigin.HSF
 
     def RANSAC3DM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -504,19 +546,19 @@ class EyeProcessor:
             self.pupil_width,
             self.pupil_height,
         ) = RANSAC3D(self, True)
-        if self.settings.gui_RANSACBLINK:
+        if self.snapshot.gui_RANSACBLINK:
             self.eyeopen = ranblink
         self.out_x, self.out_y, self.avg_velocity = cal.cal_osc(self, self.rawx, self.rawy, self.angle)
         self.current_algorithm = EyeInfoOrigin.RANSAC
 
     def AHSFM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -534,13 +576,13 @@ class EyeProcessor:
         self.current_algorithm = EyeInfoOrigin.HSF
 
     def BLOBM(self):
-        if self.eye_id in [EyeId.LEFT] and self.settings.gui_circular_crop_left:
+        if self.eye_id in [EyeId.LEFT] and self.snapshot.gui_circular_crop_left:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
         else:
             pass
-        if self.eye_id in [EyeId.RIGHT] and self.settings.gui_circular_crop_right:
+        if self.eye_id in [EyeId.RIGHT] and self.snapshot.gui_circular_crop_right:
             self.current_image_gray, self.cct = circle_crop(
                 self.current_image_gray, self.xc, self.yc, self.cc_radius, self.cct
             )
@@ -602,82 +644,83 @@ class EyeProcessor:
         self.er_hsf = None
 
         # set algo priorities
-        if self.settings.gui_AHSFRAC:
+        if self.snapshot.gui_AHSFRAC:
             if self.er_ahsf is None:
                 self.er_ahsf = AHSF(self.current_image_gray)
-            algolist[self.settings.gui_AHSFRACP] = self.AHSFRACM
+            algolist[self.snapshot.gui_AHSFRACP] = self.AHSFRACM
 
-        if self.settings.gui_AHSF:
+        if self.snapshot.gui_AHSF:
             if self.er_ahsf is None:
                 self.er_ahsf = AHSF(self.current_image_gray)
-            algolist[self.settings.gui_AHSFP] = self.AHSFM
+            algolist[self.snapshot.gui_AHSFP] = self.AHSFM
 
-        if self.settings.gui_HSF:
+        if self.snapshot.gui_HSF:
             if self.er_hsf is None:
                 if self.eye_id in [EyeId.LEFT]:
                     self.er_hsf = External_Run_HSF(
-                        self.settings.gui_skip_autoradius,
-                        self.settings.gui_HSF_radius_left,
+                        self.snapshot.gui_skip_autoradius,
+                        self.snapshot.gui_HSF_radius_left,
                     )
                 else:
                     pass
                 if self.eye_id in [EyeId.RIGHT]:
                     self.er_hsf = External_Run_HSF(
-                        self.settings.gui_skip_autoradius,
-                        self.settings.gui_HSF_radius_right,
+                        self.snapshot.gui_skip_autoradius,
+                        self.snapshot.gui_HSF_radius_right,
                     )
                 else:
                     pass
 
-            algolist[self.settings.gui_HSFP] = self.HSFM
+            algolist[self.snapshot.gui_HSFP] = self.HSFM
 
         else:
             if self.er_hsf is not None:
                 self.er_hsf = None
 
-        if self.settings.gui_HSRAC:
+        if self.snapshot.gui_HSRAC:
             if self.er_hsf is None:
                 if self.eye_id in [EyeId.LEFT]:
                     self.er_hsf = External_Run_HSF(
-                        self.settings.gui_skip_autoradius,
-                        self.settings.gui_HSF_radius_left,
+                        self.snapshot.gui_skip_autoradius,
+                        self.snapshot.gui_HSF_radius_left,
                     )
                 else:
                     pass
                 if self.eye_id in [EyeId.RIGHT]:
                     self.er_hsf = External_Run_HSF(
-                        self.settings.gui_skip_autoradius,
-                        self.settings.gui_HSF_radius_right,
+                        self.snapshot.gui_skip_autoradius,
+                        self.snapshot.gui_HSF_radius_right,
                     )
                 else:
                     pass
 
-            algolist[self.settings.gui_HSRACP] = self.HSRACM
+            algolist[self.snapshot.gui_HSRACP] = self.HSRACM
         else:
-            if not self.settings.gui_HSF and self.er_hsf is not None:
+            if not self.snapshot.gui_HSF and self.er_hsf is not None:
                 self.er_hsf = None
 
-        if self.settings.gui_DADDY:
+        if self.snapshot.gui_DADDY:
             if self.er_daddy is None:
-                self.er_daddy = External_Run_DADDY()
-            algolist[self.settings.gui_DADDYP] = self.DADDYM
+                self.er_daddy = External_Run_DADDY(self.eye_id, self.settings)
+            algolist[self.snapshot.gui_DADDYP] = self.DADDYM
         else:
             if self.er_daddy is not None:
                 self.er_daddy = None
 
-        if self.settings.gui_LEAP or self.settings.gui_LEAP_lid:
+        if self.snapshot.gui_LEAP or self.snapshot.gui_LEAP_lid:
             if self.er_leap is None:
-                self.er_leap = External_Run_LEAP(self.config, self.baseconfig)
-            algolist[self.settings.gui_LEAP] = self.LEAPM
+                self.er_leap = External_Run_LEAP(self.config, self.baseconfig, self.eye_id)
+            algolist[self.snapshot.gui_LEAP] = self.LEAPM
         else:
             if self.er_leap is not None:
+                self.er_leap.shutdown()
                 self.er_leap = None
 
-        if self.settings.gui_RANSAC3D:
-            algolist[self.settings.gui_RANSAC3DP] = self.RANSAC3DM
+        if self.snapshot.gui_RANSAC3D:
+            algolist[self.snapshot.gui_RANSAC3DP] = self.RANSAC3DM
 
-        if self.settings.gui_BLOB:
-            algolist[self.settings.gui_BLOBP] = self.BLOBM
+        if self.snapshot.gui_BLOB:
+            algolist[self.snapshot.gui_BLOBP] = self.BLOBM
 
         (
             _,
@@ -728,11 +771,15 @@ class EyeProcessor:
                     self.current_image,
                     self.current_frame_number,
                     self.current_fps,
+                    self.current_frame_time,
                 ) = self.capture_queue_incoming.get(block=True, timeout=0.1)
             except queue.Empty:
                 # print("No image available")
                 continue
 
+            # settings changed since the last frame apply from this one on
+            self.snapshot = self.settings_publisher.snapshot
+
             if not self.capture_crop_rotate_image():
                 continue
 
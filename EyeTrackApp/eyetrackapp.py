@@ -26,17 +26,17 @@ LICENSE: Babble Software Distribution License 1.0
 
 import os
 import PySimpleGUI as sg
-import queue
 import requests
 import threading
 from camera_widget import CameraWidget
-from config import EyeTrackConfig
+from config import EyeTrackConfig, SettingsPublisher
 from eye import EyeId
+from inference import model_registry
 from settings.VRCFTModuleSettings import VRCFTSettingsWidget
 from settings.general_settings_widget import SettingsWidget
 from settings.algo_settings_widget import AlgoSettingsWidget
 from osc.osc import OSCManager
-from osc.OSCMessage import OSCMessage
+from osc.OSCMailbox import OSCMailbox
 from utils.misc_utils import is_nt, resource_path
 import cv2
 import numpy as np
@@ -263,11 +263,15 @@ def main():
 
     timerResolution(True)
 
-    osc_queue: queue.Queue[OSCMessage] = queue.Queue(maxsize=10)
+    # Load and warm up the enabled models while the UI and cameras come up.
+    model_registry.preload(config.settings)
+
+    osc_queue = OSCMailbox()
+    settings_publisher = SettingsPublisher(config.settings)
 
     eyes = [
-        CameraWidget(EyeId.RIGHT, config, osc_queue),
-        CameraWidget(EyeId.LEFT, config, osc_queue),
+        CameraWidget(EyeId.RIGHT, config, osc_queue, settings_publisher),
+        CameraWidget(EyeId.LEFT, config, osc_queue, settings_publisher),
     ]
 
     settings = [
@@ -279,8 +283,12 @@ def main():
     osc_manager = OSCManager(
         osc_message_in_queue=osc_queue,
         config=config,
+        settings_publisher=settings_publisher,
     )
+    # first, so the listeners after it already see the new snapshot
+    config.register_listener_callback(settings_publisher.on_config_update)
     config.register_listener_callback(osc_manager.update)
+    config.register_listener_callback(model_registry.on_config_update)
     config.register_listener_callback(eyes[0].on_config_update)
     config.register_listener_callback(eyes[1].on_config_update)
 
@@ -346,6 +354,7 @@ def main():
                 timerResolution(False)
                 print("\033[94m[INFO] Exiting EyeTrackApp\033[0m")
                 window.close()
+                config.flush()
                 os._exit(0)  # I do not like this, but for now this fixes app hang on close
                 return
 
@@ -33,6 +33,7 @@ from functools import lru_cache
 import cv2
 import numpy as np
 from utils.img_utils import safe_crop
+from utils.streaming_stats import RingBuffer
 import psutil
 import sys
 import os
@@ -411,7 +412,7 @@ class AutoRadiusCalc(object):
 
 class BlinkDetector(object):
     def __init__(self):
-        self.response_list = []
+        self.response_list = RingBuffer(blink_init_frames)
         self.response_max = None
         self.enable_detect_flg = False
         self.quartile_1 = None
@@ -427,7 +428,7 @@ class BlinkDetector(object):
 
         # quartile_1, quartile_3 = np.percentile(self.response_list, [25, 75])
         # or
-        quartile_1, quartile_3 = np.percentile(np.array(self.response_list), [25, 75])
+        quartile_1, quartile_3 = self.response_list.percentile([25, 75])
         self.quartile_1 = quartile_1
         iqr = quartile_3 - quartile_1
         # response_min = quartile_1 - (iqr * 1.5)
@@ -836,6 +837,10 @@ class External_Run_HSF(object):
 
         self.algo = HSF_cls()
 
+    @property
+    def radius(self):
+        return self.algo.cvparam.radius
+
     def run(self, current_image_gray):
         self.algo.current_image_gray = current_image_gray
         # debug code
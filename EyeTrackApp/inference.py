@@ -0,0 +1,442 @@
+"""
+------------------------------------------------------------------------------------------------------
+
+                                               ,@@@@@@
+                                            @@@@@@@@@@@            @@@
+                                          @@@@@@@@@@@@      @@@@@@@@@@@
+                                        @@@@@@@@@@@@@   @@@@@@@@@@@@@@
+                                      @@@@@@@/         ,@@@@@@@@@@@@@
+                                         /@@@@@@@@@@@@@@@  @@@@@@@@
+                                    @@@@@@@@@@@@@@@@@@@@@@@@ @@@@@
+                                @@@@@@@@                @@@@@
+                              ,@@@                        @@@@&
+                                             @@@@@@.       @@@@
+                                   @@@     @@@@@@@@@/      @@@@@
+                                   ,@@@.     @@@@@@((@     @@@@(
+                                   //@@@        ,,  @@@@  @@@@@
+                                   @@@(                @@@@@@@
+                                   @@@  @          @@@@@@@@#
+                                       @@@@@@@@@@@@@@@@@
+                                      @@@@@@@@@@@@@(
+
+Copyright (c) 2025 EyeTrackVR <3
+LICENSE: Babble Software Distribution License 1.0
+------------------------------------------------------------------------------------------------------
+"""
+
+import hashlib
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+from queue import Queue, Empty
+
+import numpy as np
+import onnxruntime
+
+from utils.misc_utils import resource_path
+
+# How long the service waits for the other eye's frame before running a batch on its own.
+# Both cameras usually run at the same rate, so a couple of milliseconds is enough to pair them.
+BATCH_WINDOW = 0.002
+# If the other eye did not submit anything in this long, we are in single eye mode and never wait.
+PAIR_TIMEOUT = 1.0
+MAX_BATCH_SIZE = 2
+
+# Optimized graphs are stored here, next to the other files the app writes into its working directory.
+MODEL_CACHE_DIR = Path("ModelCache")
+
+DADDY_MODEL_FILE = Path("Models/daddy230210.onnx")  # The model file name will be changed when performance stabilises.
+LEAP_MODEL_FILE = Path("Models/pfld-sim.onnx")
+# INT8 variants made by Benchmark/quantize_models.py sit next to the float models with this suffix.
+QUANTIZED_MODEL_SUFFIX = "-int8"
+
+
+class InferenceOptions:
+    """
+    The onnxruntime knobs exposed in the settings, defaults match what the models were tuned with.
+    """
+
+    __slots__ = (
+        "intra_op_threads",
+        "inter_op_threads",
+        "parallel_execution",
+        "enable_mem_pattern",
+        "enable_cpu_mem_arena",
+        "cache_optimized_models",
+    )
+
+    def __init__(
+        self,
+        intra_op_threads=1,
+        inter_op_threads=1,
+        parallel_execution=False,
+        enable_mem_pattern=True,
+        enable_cpu_mem_arena=True,
+        cache_optimized_models=True,
+    ):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.parallel_execution = parallel_execution
+        self.enable_mem_pattern = enable_mem_pattern
+        self.enable_cpu_mem_arena = enable_cpu_mem_arena
+        self.cache_optimized_models = cache_optimized_models
+
+    @staticmethod
+    def from_settings(settings):
+        if settings is None:
+            return InferenceOptions()
+        return InferenceOptions(
+            intra_op_threads=settings.onnx_intra_op_threads,
+            inter_op_threads=settings.onnx_inter_op_threads,
+            parallel_execution=settings.onnx_parallel_execution,
+            enable_mem_pattern=settings.onnx_enable_mem_pattern,
+            enable_cpu_mem_arena=settings.onnx_enable_cpu_mem_arena,
+            cache_optimized_models=settings.onnx_cache_optimized_models,
+        )
+
+    def key(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __str__(self):
+        return ", ".join(f"{field}={getattr(self, field)}" for field in self.__slots__)
+
+    def to_session_options(self):
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = self.intra_op_threads
+        session_options.inter_op_num_threads = self.inter_op_threads
+        session_options.execution_mode = (
+            onnxruntime.ExecutionMode.ORT_PARALLEL
+            if self.parallel_execution
+            else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        )
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session_options.enable_mem_pattern = self.enable_mem_pattern
+        session_options.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        return session_options
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as model:
+        for chunk in iter(lambda: model.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_cached_model_path(model_path):
+    """
+    Where the optimized graph of `model_path` lives. ORT_ENABLE_ALL output is specific to the onnxruntime
+    version and the CPU it was optimized on, so both are part of the key alongside the model hash.
+    """
+    key = f"{file_sha256(model_path)[:16]}-ort{onnxruntime.__version__}-{platform.machine().lower()}"
+    return MODEL_CACHE_DIR / f"{Path(model_path).stem}-{key}.onnx"
+
+
+def create_session(model_path, options: InferenceOptions = None):
+    onnxruntime.disable_telemetry_events()
+    options = options or InferenceOptions()
+    session_options = options.to_session_options()
+    start = time.perf_counter()
+
+    if not options.cache_optimized_models:
+        session = onnxruntime.InferenceSession(
+            model_path, sess_options=session_options, providers=["CPUExecutionProvider"]
+        )
+        print(f"\033[94m[INFO] Loaded {Path(model_path).name} in {(time.perf_counter() - start) * 1000:.0f} ms\033[0m")
+        return session
+
+    cached_model_path = get_cached_model_path(model_path)
+    if cached_model_path.is_file():
+        # The graph is already optimized, running the optimizers over it again would only cost startup time.
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            session = onnxruntime.InferenceSession(
+                str(cached_model_path), sess_options=session_options, providers=["CPUExecutionProvider"]
+            )
+            print(
+                f"\033[94m[INFO] Loaded {Path(model_path).name} from cache in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms\033[0m"
+            )
+            return session
+        except Exception as e:
+            print(f"\033[93m[WARN] Discarding broken model cache {cached_model_path}: {e}\033[0m")
+            cached_model_path.unlink(missing_ok=True)
+            session_options = options.to_session_options()
+
+    # Let onnxruntime write the optimized graph while it builds the session. It goes into a temp file first,
+    # so a crash halfway through can never leave a truncated model behind for the next start.
+    MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_model_path = cached_model_path.with_suffix(f".{os.getpid()}.tmp")
+    session_options.optimized_model_filepath = str(temp_model_path)
+    session = onnxruntime.InferenceSession(model_path, sess_options=session_options, providers=["CPUExecutionProvider"])
+    try:
+        os.replace(temp_model_path, cached_model_path)
+    except OSError as e:
+        print(f"\033[93m[WARN] Could not cache optimized model: {e}\033[0m")
+    print(
+        f"\033[94m[INFO] Optimized {Path(model_path).name} in {(time.perf_counter() - start) * 1000:.0f} ms, "
+        f"cached to {cached_model_path}\033[0m"
+    )
+    return session
+
+
+class InferenceRequest:
+    __slots__ = ("eye_id", "tensor", "result", "error", "done")
+
+    def __init__(self, eye_id, tensor):
+        self.eye_id = eye_id
+        self.tensor = tensor
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class StereoInferenceService:
+    """
+    Owns the one onnxruntime session of a model and serves every eye from it.
+
+    Frames submitted by the left and right tracking threads within BATCH_WINDOW of each other
+    are stacked into a single batch-2 `session.run` call, and each caller gets back its own slice.
+    Models with a fixed batch axis are still shared, they just run one frame at a time.
+    """
+
+    def __init__(self, session, batch_window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        # dynamic axes are reported as strings (or None), fixed ones as ints
+        self.supports_batching = not isinstance(session.get_inputs()[0].shape[0], int)
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size if self.supports_batching else 1
+        self.requests = Queue()
+        self.last_seen = {}
+        self.batches = 0
+        self.frames = 0
+        self.closed = False
+        self.closed_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._worker, name="StereoInferenceService", daemon=True)
+        self.thread.start()
+
+    def run(self, eye_id, tensor):
+        """Run the model on a batch-1 `tensor`, blocking until the result for this eye is ready."""
+        request = InferenceRequest(eye_id, tensor)
+        with self.closed_lock:
+            if self.closed:
+                # The registry already replaced this service, finish the frame on the session directly
+                # instead of queueing it to a worker that is gone.
+                return self.session.run(None, {self.input_name: tensor})
+            self.requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def shutdown(self):
+        with self.closed_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+        self.thread.join()
+
+    def _other_eye_active(self, eye_id, now):
+        return any(
+            other_id != eye_id and now - last_seen < PAIR_TIMEOUT for other_id, last_seen in self.last_seen.items()
+        )
+
+    def _collect_batch(self, first):
+        batch = [first]
+        now = time.perf_counter()
+        self.last_seen[first.eye_id] = now
+        if self.max_batch_size == 1 or not self._other_eye_active(first.eye_id, now):
+            return batch, False
+
+        deadline = now + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except Empty:
+                break
+            if request is None:
+                return batch, True
+            self.last_seen[request.eye_id] = time.perf_counter()
+            batch.append(request)
+        return batch, False
+
+    def _run_batch(self, batch):
+        try:
+            if len(batch) == 1:
+                tensor = batch[0].tensor
+            else:
+                tensor = np.concatenate([request.tensor for request in batch], axis=0)
+            outputs = self.session.run(None, {self.input_name: tensor})
+            # every run returns fresh arrays, callers can keep their slice
+            for i, request in enumerate(batch):
+                request.result = [output[i : i + 1] for output in outputs]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        self.batches += 1
+        self.frames += len(batch)
+        for request in batch:
+            request.done.set()
+
+    def _worker(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch, should_exit = self._collect_batch(request)
+            self._run_batch(batch)
+            if should_exit:
+                return
+
+
+def warm_up(session):
+    """
+    Run the model on dummy input, so the first real frame does not pay for onnxruntime's allocations.
+    Dynamic axes are warmed up with both a single frame and a stereo batch.
+    """
+    model_input = session.get_inputs()[0]
+    shape = [dim if isinstance(dim, int) else 1 for dim in model_input.shape]
+    batch_sizes = [shape[0]] if isinstance(model_input.shape[0], int) else [1, MAX_BATCH_SIZE]
+    start = time.perf_counter()
+    for batch_size in batch_sizes:
+        shape[0] = batch_size
+        session.run(None, {model_input.name: np.zeros(shape, dtype=np.float32)})
+    return time.perf_counter() - start
+
+
+def get_quantized_model_file(model_file):
+    model_file = Path(model_file)
+    return model_file.with_name(f"{model_file.stem}{QUANTIZED_MODEL_SUFFIX}{model_file.suffix}")
+
+
+def resolve_model_path(model_file, settings=None):
+    """
+    Path of the model that should actually run for `model_file`, the INT8 variant if the settings ask for it.
+    Falls back to the float model when no quantized one was shipped.
+    """
+    if settings is not None and settings.onnx_use_quantized_models:
+        quantized_model_path = resource_path(get_quantized_model_file(model_file))
+        if os.path.isfile(quantized_model_path):
+            return quantized_model_path
+        print(f"\033[93m[WARN] No quantized model found at {quantized_model_path}, using the float model\033[0m")
+    return resource_path(model_file)
+
+
+def get_enabled_model_paths(settings):
+    model_paths = []
+    if settings.gui_DADDY:
+        model_paths.append(resolve_model_path(DADDY_MODEL_FILE, settings))
+    if settings.gui_LEAP or settings.gui_LEAP_lid:
+        model_paths.append(resolve_model_path(LEAP_MODEL_FILE, settings))
+    return model_paths
+
+
+class ModelEntry:
+    __slots__ = ("options_key", "service", "error", "ready")
+
+    def __init__(self, options_key):
+        self.options_key = options_key
+        self.service = None
+        self.error = None
+        self.ready = threading.Event()
+
+
+class ModelRegistry:
+    """
+    Holds one loaded and warmed up StereoInferenceService per model for the lifetime of the app.
+
+    Enabled models are preloaded on a background thread at startup, tracking threads asking for a model
+    that is still loading just wait for it. Restarting tracking reuses the loaded sessions,
+    only changing the inference settings replaces them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.settings = None
+
+    def preload(self, settings):
+        self.settings = settings
+        model_paths = get_enabled_model_paths(settings)
+        options = InferenceOptions.from_settings(settings)
+        threading.Thread(target=self._preload, args=(model_paths, options), name="ModelPreload", daemon=True).start()
+
+    def on_config_update(self, data):
+        if self.settings is None:
+            return
+        if any(key in ("gui_DADDY", "gui_LEAP", "gui_LEAP_lid") or key.startswith("onnx_") for key in data):
+            self.preload(self.settings)
+
+    def get(self, model_path, settings=None) -> StereoInferenceService:
+        options = InferenceOptions.from_settings(settings)
+        entry, should_load = self._get_entry(model_path, options)
+        if should_load:
+            self._load(model_path, options, entry)
+        entry.ready.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.service
+
+    def _get_entry(self, model_path, options):
+        with self.lock:
+            stale = self.entries.get(model_path)
+            if stale is not None and stale.options_key == options.key():
+                return stale, False
+            entry = ModelEntry(options.key())
+            self.entries[model_path] = entry
+        if stale is not None:
+            # Settings changed, whoever still holds the old service finishes on its session directly.
+            stale.ready.wait()
+            if stale.service is not None:
+                stale.service.shutdown()
+        return entry, True
+
+    def _preload(self, model_paths, options):
+        # Free the models that got disabled or swapped for their quantized variant.
+        with self.lock:
+            unused = [
+                self.entries.pop(model_path) for model_path in list(self.entries) if model_path not in model_paths
+            ]
+        for entry in unused:
+            entry.ready.wait()
+            if entry.service is not None:
+                entry.service.shutdown()
+
+        for model_path in model_paths:
+            entry, should_load = self._get_entry(model_path, options)
+            if should_load:
+                self._load(model_path, options, entry)
+
+    def _load(self, model_path, options, entry):
+        try:
+            session = create_session(model_path, options)
+            warm_up_time = warm_up(session)
+            entry.service = StereoInferenceService(session)
+            print(f"\033[94m[INFO] {Path(model_path).name} ready, warm-up took {warm_up_time * 1000:.0f} ms\033[0m")
+        except Exception as e:
+            entry.error = e
+            print(f"\033[91m[ERROR] Failed to load {Path(model_path).name}: {e}\033[0m")
+            with self.lock:
+                # let the next caller try again instead of failing forever
+                if self.entries.get(model_path) is entry:
+                    del self.entries[model_path]
+        finally:
+            entry.ready.set()
+
+
+model_registry = ModelRegistry()
+
+
+def get_inference_service(model_path, settings=None) -> StereoInferenceService:
+    """
+    Return the service shared by both eyes for `model_path`, waiting for it if it is still being preloaded.
+    Changing the inference settings gives the next caller a session built with the new options.
+    """
+    return model_registry.get(model_path, settings)
@@ -27,7 +27,6 @@ LICENSE: Babble Software Distribution License 1.0
 """
 
 import os
-import onnxruntime
 import numpy as np
 import cv2
 import time
@@ -35,66 +34,117 @@ import math
 from queue import Queue
 import threading
 from config import EyeTrackCameraConfig, EyeTrackConfig
-from one_euro_filter import OneEuroFilter
+from eye import EyeId
+from inference import LEAP_MODEL_FILE, get_inference_service, resolve_model_path
+from one_euro_filter import ScalarOneEuroFilter
 import psutil
-from utils.misc_utils import resource_path
-from pathlib import Path
-
-os.environ["OMP_NUM_THREADS"] = "1"
 
 frames = 0
-models = Path("Models")
 
 
-def run_model(input_queue, output_queue, session):
-    while True:
-        frame = input_queue.get()
-        if frame is None:
-            break
+input_size = 112  # Do not change this number.
+
+
+def gray_to_input_tensor(gray_frame, tensor, resized):
+    """
+    Resize the single channel frame into the preallocated (112, 112) uint8 `resized` and scale it to 0-1 into the
+    preallocated (1, 1, 112, 112) float32 `tensor`, nothing is allocated per frame.
+    The model was trained on the luma of an RGB copy of the gray frame, which is the gray frame itself.
+    """
+    cv2.resize(gray_frame, (input_size, input_size), dst=resized)
+    np.multiply(resized, np.float32(1 / 255), out=tensor[0, 0])
+    return tensor
+
+
+class LeapResult:
+    __slots__ = ("seq", "landmarks", "error")
 
-        img_np = np.array(frame, dtype=np.float32) / 255.0
-        gray_img = 0.299 * img_np[:, :, 0] + 0.587 * img_np[:, :, 1] + 0.114 * img_np[:, :, 2]
+    def __init__(self, seq, landmarks=None, error=None):
+        self.seq = seq
+        self.landmarks = landmarks
+        self.error = error
 
-        gray_img = np.expand_dims(np.expand_dims(gray_img, axis=0), axis=0)
 
-        ort_inputs = {session.get_inputs()[0].name: gray_img}
-        pre_landmark = session.run(None, ort_inputs)
-        pre_landmark = np.reshape(pre_landmark, (-1, 2))
-        output_queue.put((frame, pre_landmark))
+class LeapInferencePool:
+    """
+    Runs LEAP on `workers` threads. Every submitted frame gets a sequence number and results are
+    delivered strictly in that order, so the caller always knows which frame the landmarks belong to.
+    """
 
+    def __init__(self, inference_service, eye_id, workers=1):
+        self.inference_service = inference_service
+        self.eye_id = eye_id
+        self.input_queue = Queue()
+        self.condition = threading.Condition()
+        self.submitted = 0
+        self.next_seq = 0
+        self.completed = {}
+        self.latest = None
+        self.closed = False
+        self.threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"LEAP worker {i}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def submit(self, tensor):
+        with self.condition:
+            seq = self.submitted
+            self.submitted += 1
+        self.input_queue.put((seq, tensor))
+        return seq
+
+    def wait_for(self, seq) -> LeapResult:
+        """Block until the results up to `seq` were delivered, return the newest one."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or (self.latest is not None and self.latest.seq >= seq))
+            if self.closed:
+                raise RuntimeError("LEAP inference pool was shut down")
+            return self.latest
+
+    def shutdown(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for _ in self.threads:
+            self.input_queue.put(None)
+
+    def _worker(self):
+        while True:
+            item = self.input_queue.get()
+            if item is None:
+                break
+            seq, tensor = item
+            try:
+                pre_landmark = self.inference_service.run(self.eye_id, tensor)
+                result = LeapResult(seq, landmarks=np.reshape(pre_landmark, (-1, 2)))
+            except Exception as e:
+                result = LeapResult(seq, error=e)
 
-def run_onnx_model(queues, session, frame):
-    for queue in queues:
-        if not queue.full():
-            queue.put(frame)
-            break
+            with self.condition:
+                # Workers can finish out of order, hold results back until everything before them is in.
+                self.completed[seq] = result
+                while self.next_seq in self.completed:
+                    self.latest = self.completed.pop(self.next_seq)
+                    self.next_seq += 1
+                self.condition.notify_all()
 
 
 class LEAP_C:
-    def __init__(self, eye_config: EyeTrackCameraConfig, config: EyeTrackConfig):
+    def __init__(self, eye_config: EyeTrackCameraConfig, config: EyeTrackConfig, eye_id=EyeId.RIGHT):
         self.last_lid = None
         self.current_image_gray = None
         self.current_image_gray_clean = None
-        onnxruntime.disable_telemetry_events()
-        self.num_threads = 1
-        self.queue_max_size = 1
-        self.model_path = resource_path(models / "pfld-sim.onnx")
+        self.eye_id = eye_id
+        self.model_path = resolve_model_path(LEAP_MODEL_FILE, config.settings)
 
         self.print_fps = False
         self.frames = 0
-        self.queues = [Queue(maxsize=self.queue_max_size) for _ in range(self.num_threads)]
-        self.threads = []
         self.model_output = np.zeros((12, 2))
-        self.output_queue = Queue(maxsize=self.queue_max_size)
         self.start_time = time.time()
 
-        opts = onnxruntime.SessionOptions()
-        opts.inter_op_num_threads = 1
-        opts.intra_op_num_threads = 1
-        opts.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
-        opts.enable_mem_pattern = False
-
-        self.one_euro_filter_float = OneEuroFilter(np.random.rand(1, 2), min_cutoff=0.0004, beta=0.9)
+        self.one_euro_filter_float = ScalarOneEuroFilter(np.random.rand(1), min_cutoff=0.0004, beta=0.9)
+        self.timestamp = None
         self.dmax = 0
         self.dmin = 0
         self.openlist = []
@@ -106,88 +156,106 @@ class LEAP_C:
         self.total_velocity_old = 0
         self.old_per = 0.0
         self.delta_per_neg = 0.0
-        self.ort_session1 = onnxruntime.InferenceSession(self.model_path, opts, providers=["CPUExecutionProvider"])
+        # One session per model, shared with the other eye's LEAP instance.
+        self.inference_service = get_inference_service(self.model_path, config.settings)
         self.eye_config: EyeTrackCameraConfig = eye_config
         self.config: EyeTrackConfig = config
 
-        for i in range(self.num_threads):
-            thread = threading.Thread(
-                target=run_model,
-                args=(self.queues[i], self.output_queue, self.ort_session1),
-                name=f"Thread {i}",
-            )
-            self.threads.append(thread)
-            thread.start()
+        # More workers and a higher result age raise throughput, at the cost of landmarks that lag the image.
+        self.max_result_age = max(0, config.settings.onnx_leap_max_result_age)
+        self.result_age = 0
+        self.last_result_seq = None
+        # At most max_result_age + 1 frames are in flight, each keeps its input tensor until its result is in.
+        self.input_tensors = [
+            np.empty((1, 1, input_size, input_size), dtype=np.float32) for _ in range(self.max_result_age + 1)
+        ]
+        self.resized_input = np.empty((input_size, input_size), dtype=np.uint8)
+        self.next_input = 0
+        self.pool = LeapInferencePool(self.inference_service, self.eye_id, config.settings.onnx_leap_workers)
+
+    def shutdown(self):
+        self.pool.shutdown()
 
     def leap_run(self):
-        img = self.current_image_gray_clean.copy()
-        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-        img_height, img_width = img.shape[:2]
-
-        frame = cv2.resize(img, (112, 112))
+        img_height, img_width = self.current_image_gray_clean.shape[:2]
+        tensor = self.input_tensors[self.next_input % len(self.input_tensors)]
+        self.next_input += 1
+        gray_to_input_tensor(self.current_image_gray_clean, tensor, self.resized_input)
         imgvis = self.current_image_gray.copy()
-        run_onnx_model(self.queues, self.ort_session1, frame)
-
-        if not self.output_queue.empty():
-            frame, pre_landmark = self.output_queue.get()
-
-            for point in pre_landmark:
-                x, y = point
-                x = int(x * img_width)
-                y = int(y * img_height)
-                cv2.circle(imgvis, (x, y), 3, (255, 255, 0), -1)
-                cv2.circle(imgvis, (x, y), 1, (0, 0, 255), -1)
-
-            d1 = math.dist(pre_landmark[1], pre_landmark[3])
-            d2 = math.dist(pre_landmark[2], pre_landmark[4])
-            d = (d1 + d2) / 2
-
-            if self.calib == 0:
-                self.openlist = []
-                self.eye_config.leap_calibrated = False
-
-            if not self.eye_config.leap_calibrated:
-                self.openlist.append(d)
-                self.eye_config.leap_calibration_percentile_90 = np.percentile(self.openlist, 90) if len(self.openlist) >= 10 else 0.8
-                self.eye_config.leap_calibration_percentile_2 = np.percentile(self.openlist, 2) - self.eye_config.leap_calibration_percentile_90
-                if len(self.openlist) >= self.config.settings.leap_calibration_samples:
-                    self.eye_config.leap_calibrated = True
-                    self.config.save()
-                    print(f"[INFO] {'Left' if self.eye_config is self.config.left_eye else 'Right'} eye calibrated")
-
-            try:
-                if len(self.openlist) > 0 or self.eye_config.leap_calibrated:
-                    per = (d - self.eye_config.leap_calibration_percentile_90) / self.eye_config.leap_calibration_percentile_2
-                    per = 1 - per
-                    per = np.clip(per, 0.0, 1.0)
-                else:
-                    per = 0.8
-            except:
+        seq = self.pool.submit(tensor)
+
+        # Wait until the result is at most max_result_age frames older than this one, never skip a frame.
+        result = self.pool.wait_for(seq - self.max_result_age)
+        if result.error is not None:
+            raise result.error
+        self.result_age = seq - result.seq
+        # with a result age above 0 the same result can come back twice, only calibrate on new ones
+        is_new_result = result.seq != self.last_result_seq
+        self.last_result_seq = result.seq
+        pre_landmark = result.landmarks
+
+        for point in pre_landmark:
+            x, y = point
+            x = int(x * img_width)
+            y = int(y * img_height)
+            cv2.circle(imgvis, (x, y), 3, (255, 255, 0), -1)
+            cv2.circle(imgvis, (x, y), 1, (0, 0, 255), -1)
+
+        d1 = math.dist(pre_landmark[1], pre_landmark[3])
+        d2 = math.dist(pre_landmark[2], pre_landmark[4])
+        d = (d1 + d2) / 2
+
+        if self.calib == 0:
+            self.openlist = []
+            self.eye_config.leap_calibrated = False
+
+        if not self.eye_config.leap_calibrated and is_new_result:
+            self.openlist.append(d)
+            self.eye_config.leap_calibration_percentile_90 = np.percentile(self.openlist, 90) if len(self.openlist) >= 10 else 0.8
+            self.eye_config.leap_calibration_percentile_2 = np.percentile(self.openlist, 2) - self.eye_config.leap_calibration_percentile_90
+            if len(self.openlist) >= self.config.settings.leap_calibration_samples:
+                self.eye_config.leap_calibrated = True
+                self.config.save()
+                print(f"[INFO] {'Left' if self.eye_config is self.config.left_eye else 'Right'} eye calibrated")
+
+        try:
+            if len(self.openlist) > 0 or self.eye_config.leap_calibrated:
+                per = (d - self.eye_config.leap_calibration_percentile_90) / self.eye_config.leap_calibration_percentile_2
+                per = 1 - per
+                per = np.clip(per, 0.0, 1.0)
+            else:
                 per = 0.8
+        except:
+            per = 0.8
 
-            x = pre_landmark[6][0]
-            y = pre_landmark[6][1]
-
-            self.last_lid = per
-            calib_array = np.array([per, per]).reshape(1, 2)
-            per = self.one_euro_filter_float(calib_array)[0][0]
+        x = pre_landmark[6][0]
+        y = pre_landmark[6][1]
 
-            if per <= 0.25:
-                per = 0.0
+        self.last_lid = per
+        per = self.one_euro_filter_float((per,), self.timestamp)[0]
 
-            return imgvis, float(x*img_width), float(y*img_height), per
+        if per <= 0.25:
+            per = 0.0
 
-        imgvis = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        return imgvis, 0, 0, 0
+        return imgvis, float(x*img_width), float(y*img_height), per
 
 
 class External_Run_LEAP:
-    def __init__(self, eye_config: EyeTrackCameraConfig, config: EyeTrackConfig):
-        self.algo = LEAP_C(eye_config, config)
+    def __init__(self, eye_config: EyeTrackCameraConfig, config: EyeTrackConfig, eye_id=EyeId.RIGHT):
+        self.algo = LEAP_C(eye_config, config, eye_id)
 
-    def run(self, current_image_gray, current_image_gray_clean, calib):
+    def run(self, current_image_gray, current_image_gray_clean, calib, timestamp=None):
         self.algo.current_image_gray = current_image_gray
         self.algo.current_image_gray_clean = current_image_gray_clean
         self.algo.calib = calib
+        self.algo.timestamp = timestamp
         img, x, y, per = self.algo.leap_run()
         return img, x, y, per
+
+    @property
+    def result_age(self):
+        """How many frames older than the last image the returned landmarks are."""
+        return self.algo.result_age
+
+    def shutdown(self):
+        self.algo.shutdown()
@@ -1,6 +1,8 @@
 # https://github.com/jaantollander/OneEuroFilter
 # LICENSE: MIT
 
+import math
+
 import numpy as np
 from time import time
 
@@ -56,4 +58,115 @@ class OneEuroFilter:
                 self.x_prev = x
                 return x
         except:
-            print("\033[91m[ERROR] One Euro Filter Error. Is your system clock running properly?\033[0m")
\ No newline at end of file
+            print("\033[91m[ERROR] One Euro Filter Error. Is your system clock running properly?\033[0m")
+
+# Every output channel goes through a One Euro filter each frame. OneEuroFilter above allocates a handful of small
+# arrays per call and reads the clock itself, the two below keep their state preallocated and take the capture
+# timestamp of the frame, so the smoothing follows the camera timing instead of when processing got to the value.
+# Parameters can be scalars or one per channel. A timestamp of None falls back to time().
+# Below about 20 channels ScalarOneEuroFilter is the faster one, see Benchmark/bench_one_euro_filter.py.
+
+
+class OneEuroFilterBank:
+    """One Euro filter over any number of channels in one vectorized, allocation free update."""
+
+    def __init__(self, x0, dx0=0.0, min_cutoff=1.0, beta=0.0, d_cutoff=1.0, t0=None):
+        x0 = np.asarray(x0, dtype=np.float64)
+        self.data_shape = x0.shape
+        # numpy ufunc calls cost more than the math here, parameters shared by all channels stay Python floats
+        self.min_cutoff = self._parameter(min_cutoff, x0.shape)
+        self.beta = self._parameter(beta, x0.shape)
+        self.d_cutoff = self._parameter(d_cutoff, x0.shape)
+        # Previous values.
+        self.x_prev = x0.copy()
+        self.dx_prev = np.full(x0.shape, dx0, dtype=np.float64)
+        self.t_prev = time() if t0 is None else t0
+        # scratch space
+        self._a = np.empty(x0.shape, dtype=np.float64)
+        self._b = np.empty(x0.shape, dtype=np.float64)
+        self._d = np.empty(x0.shape, dtype=np.float64)
+
+    @staticmethod
+    def _parameter(value, shape):
+        value = np.asarray(value, dtype=np.float64)
+        if value.ndim == 0 or np.all(value == value.flat[0]):
+            return float(value.flat[0])
+        return np.broadcast_to(value, shape).copy()
+
+    def __call__(self, x, t=None, out=None):
+        """Filter `x`, the result goes to `out` if given, otherwise to a new array."""
+        t = time() if t is None else t
+        t_e = t - self.t_prev
+        if t_e != 0.0:  # occasionally when switching to HSF this becomes zero causing divide by zero errors
+            a, b, d = self._a, self._b, self._d
+            w = 2 * np.pi * t_e
+            np.subtract(x, self.x_prev, out=d)
+
+            # The filtered derivative of the signal, dx_hat = (1 - a_d) * dx_prev + a_d * dx.
+            if isinstance(self.d_cutoff, float):
+                r = w * self.d_cutoff
+                a_d = r / (r + 1)
+                np.multiply(d, a_d / t_e, out=b)
+                np.multiply(self.dx_prev, 1 - a_d, out=self.dx_prev)
+                np.add(self.dx_prev, b, out=self.dx_prev)
+            else:
+                np.multiply(self.d_cutoff, w, out=a)
+                np.add(a, 1.0, out=b)
+                np.divide(a, b, out=a)
+                np.divide(d, t_e, out=b)
+                np.subtract(b, self.dx_prev, out=b)
+                np.multiply(b, a, out=b)
+                np.add(self.dx_prev, b, out=self.dx_prev)
+
+            # The filtered signal, x_hat = x_prev + a * (x - x_prev), a = r / (r + 1), r = w * cutoff.
+            np.abs(self.dx_prev, out=a)
+            np.multiply(a, self.beta, out=a)
+            np.add(a, self.min_cutoff, out=a)
+            np.multiply(a, w, out=a)
+            np.add(a, 1.0, out=b)
+            np.divide(a, b, out=a)
+            np.multiply(d, a, out=d)
+            np.add(self.x_prev, d, out=self.x_prev)
+            self.t_prev = t
+        else:
+            self.x_prev[...] = x
+        if out is None:
+            return self.x_prev.copy()
+        out[...] = self.x_prev
+        return out
+
+
+class ScalarOneEuroFilter:
+    """
+    The same filter on plain Python floats. For the one or two values most call sites filter this is several times
+    faster than any numpy version, the per call ufunc overhead is larger than the math.
+    """
+
+    def __init__(self, x0, dx0=0.0, min_cutoff=1.0, beta=0.0, d_cutoff=1.0, t0=None):
+        self.channels = len(x0)
+        self.min_cutoff = [float(v) for v in np.broadcast_to(min_cutoff, self.channels)]
+        self.beta = [float(v) for v in np.broadcast_to(beta, self.channels)]
+        self.d_cutoff = [float(v) for v in np.broadcast_to(d_cutoff, self.channels)]
+        # Previous values.
+        self.x_prev = [float(v) for v in x0]
+        self.dx_prev = [float(dx0)] * self.channels
+        self.t_prev = time() if t0 is None else t0
+
+    def __call__(self, x, t=None):
+        """Filter the sequence of floats `x`, returns a list."""
+        t = time() if t is None else t
+        t_e = t - self.t_prev
+        if t_e == 0.0:
+            self.x_prev = [float(v) for v in x]
+            return list(self.x_prev)
+        w = 2 * math.pi * t_e
+        x_prev, dx_prev = self.x_prev, self.dx_prev
+        for i in range(self.channels):
+            value, prev = float(x[i]), x_prev[i]
+            r = w * self.d_cutoff[i]
+            dx_hat = dx_prev[i] + r / (r + 1) * ((value - prev) / t_e - dx_prev[i])
+            r = w * (self.min_cutoff[i] + self.beta[i] * abs(dx_hat))
+            x_prev[i] = prev + r / (r + 1) * (value - prev)
+            dx_prev[i] = dx_hat
+        self.t_prev = t
+        return list(x_prev)
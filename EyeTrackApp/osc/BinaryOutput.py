@@ -0,0 +1,150 @@
+"""
+Fixed layout binary eye output, and reference readers for it.
+
+Every eye update is one 48 byte little endian record:
+
+    offset  type     field
+    0       4s       magic b"ETVR"
+    4       uint8    layout version, 1
+    5       uint8    eye id, 0 right, 1 left, 2 both
+    6       uint8    EyeInfoOrigin of the algorithm that produced it
+    7       uint8    flags, bit 0 set while the eye is in a saccade
+    8       uint32   sequence number, per sink, wraps around
+    12      float64  capture time, seconds since the epoch, NaN if unknown
+    20      float32  x, y, pupil dilation, blink, average velocity, vergence depth, ray distance
+                     (NaN where the tracker has no value)
+
+The UDP and Unix socket sinks send one record per datagram. The shared memory block starts with an 8 byte
+header (magic, version, slot count, record size) followed by one slot per eye id, each a uint32 sequence
+lock, 4 bytes padding and the record. The writer makes the lock odd while it writes the slot and even
+again when done, so a reader that sees the same even value before and after copying has a whole record.
+
+This module only needs the standard library so it can be copied into other programs. Run it to print
+what a sink sends:
+
+    python BinaryOutput.py udp 127.0.0.1 8890
+    python BinaryOutput.py unix /tmp/etvr.sock
+    python BinaryOutput.py shm etvr_eye_output
+"""
+
+import math
+import os
+import socket
+import struct
+import sys
+import time
+from collections import namedtuple
+
+MAGIC = b"ETVR"
+VERSION = 1
+RECORD = struct.Struct("<4sBBBBId7f")
+HEADER = struct.Struct("<4sBBH")
+SEQUENCE = struct.Struct("<I4x")
+SLOT_COUNT = 3
+FLAG_SACCADE = 1
+SLOT_SIZE = SEQUENCE.size + RECORD.size
+SHM_SIZE = HEADER.size + SLOT_COUNT * SLOT_SIZE
+
+EyeRecord = namedtuple(
+    "EyeRecord",
+    "eye_id origin flags sequence timestamp x y pupil_dilation blink avg_velocity vergence_depth ray_distance",
+)
+
+
+def _float(value):
+    return math.nan if value is None else value
+
+
+def pack_record(buffer, offset, eye_id, sequence, eye_info):
+    """Writes the record of one EyeInfo into buffer at offset."""
+    RECORD.pack_into(
+        buffer,
+        offset,
+        MAGIC,
+        VERSION,
+        eye_id,
+        eye_info.info_type.value,
+        FLAG_SACCADE if eye_info.saccade else 0,
+        sequence & 0xFFFFFFFF,
+        _float(eye_info.timestamp),
+        eye_info.x,
+        eye_info.y,
+        eye_info.pupil_dilation,
+        eye_info.blink,
+        eye_info.avg_velocity,
+        _float(eye_info.vergence_depth),
+        _float(eye_info.ray_distance),
+    )
+
+
+def decode_record(data, offset=0):
+    magic, version, *fields = RECORD.unpack_from(data, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not an eye record: {magic!r} version {version}")
+    return EyeRecord(*fields)
+
+
+def slot_offset(eye_id):
+    return HEADER.size + eye_id * SLOT_SIZE
+
+
+class SharedMemoryReader:
+    """Reads the latest record of an eye from the shared memory sink."""
+
+    def __init__(self, name):
+        from multiprocessing import resource_tracker, shared_memory
+
+        self.shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # attaching registers the block like creating it does, the tracker would unlink it when the reader exits
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        magic, version, slots, record_size = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION or slots != SLOT_COUNT or record_size != RECORD.size:
+            self.shm.close()
+            raise ValueError(f"{name} is not an eye output block")
+
+    def read(self, eye_id, retries=100):
+        """The latest record, None before the first write or if the writer kept it busy for every retry."""
+        offset = slot_offset(eye_id)
+        buf = self.shm.buf
+        for _ in range(retries):
+            (before,) = SEQUENCE.unpack_from(buf, offset)
+            if before & 1:
+                continue
+            data = bytes(buf[offset + SEQUENCE.size : offset + SLOT_SIZE])
+            (after,) = SEQUENCE.unpack_from(buf, offset)
+            if before == after:
+                return decode_record(data) if before else None
+        return None
+
+    def close(self):
+        self.shm.close()
+
+
+def _print_socket(family, address):
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.bind(address)
+    while True:
+        print(decode_record(sock.recv(RECORD.size)))
+
+
+def _print_shared_memory(name):
+    reader = SharedMemoryReader(name)
+    last = {}
+    while True:
+        for eye_id in range(SLOT_COUNT):
+            record = reader.read(eye_id)
+            if record is not None and last.get(eye_id) != record.sequence:
+                last[eye_id] = record.sequence
+                print(record)
+        time.sleep(0.001)
+
+
+if __name__ == "__main__":
+    kind, *args = sys.argv[1:]
+    if kind == "udp":
+        _print_socket(socket.AF_INET, (args[0], int(args[1])))
+    elif kind == "unix":
+        _print_socket(socket.AF_UNIX, args[0])
+    else:
+        _print_shared_memory(args[0])
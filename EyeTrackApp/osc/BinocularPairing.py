@@ -0,0 +1,106 @@
+import dataclasses
+import time
+from typing import Any, Optional
+
+from eye import EyeId
+
+
+@dataclasses.dataclass
+class BinocularUpdate:
+    """One combined output: the left and right EyeInfo of a stereo frame, one of them None if that eye is missing."""
+
+    eye_id: EyeId  # the eye that completed the update
+    left: Optional[Any]
+    right: Optional[Any]
+    skew: Optional[float] = None  # right minus left capture time, seconds
+
+
+class BinocularPairing:
+    """
+    Matches left and right EyeInfo by capture timestamp, so combined values go out once per stereo frame from
+    two eyes seen at the same time. Eye infos without a timestamp are stamped with their arrival time.
+
+    A frame is paired with the other eye's waiting frame nearest to it, within `tolerance` seconds. Keep the
+    tolerance under half a frame period, so a frame can't be paired with the neighbouring stereo frame. Waiting
+    frames the other eye has already moved past can't be paired any more and count as unpaired. When the other
+    eye hasn't been seen for `timeout` seconds, frames go out on their own and still wait for the other eye, so
+    its first frame after a cold start or a dropout pairs with the frame it was captured with.
+    """
+
+    def __init__(self, tolerance=0.004, timeout=0.1):
+        self.tolerance = tolerance
+        self.timeout = timeout
+        self.pending = {EyeId.LEFT: [], EyeId.RIGHT: []}  # (timestamp, eye info, sent on its own) per eye
+        self.latest = {}
+        self.last_seen = {}
+        self.skew = None
+        self.skew_sum = 0.0
+        self.max_skew = 0.0
+        self.pairs = 0
+        self.singles = 0
+        self.unpaired = 0
+
+    def drop(self, frames):
+        self.unpaired += sum(1 for _, _, single in frames if not single)
+
+    def add(self, eye_id, eye_info, now=None):
+        """Returns the BinocularUpdates that are complete with this eye info, at most one."""
+        if now is None:
+            now = time.time()
+        timestamp = getattr(eye_info, "timestamp", None)
+        if timestamp is None:
+            timestamp = now
+        other = EyeId.RIGHT if eye_id == EyeId.LEFT else EyeId.LEFT
+        self.last_seen[eye_id] = now
+        self.latest[eye_id] = timestamp
+        own, waiting = self.pending[eye_id], self.pending[other]
+
+        # frames of the other eye too old for this one are too old for any later one as well
+        stale = sum(1 for waiting_timestamp, _, _ in waiting if waiting_timestamp < timestamp - self.tolerance)
+        self.drop(waiting[:stale])
+        del waiting[:stale]
+        # and frames of this eye nobody is going to wait for any more
+        expired = sum(1 for own_timestamp, _, _ in own if own_timestamp < timestamp - self.timeout)
+        self.drop(own[:expired])
+        del own[:expired]
+
+        if waiting:
+            index = min(range(len(waiting)), key=lambda i: abs(waiting[i][0] - timestamp))
+            other_timestamp, other_info, _ = waiting[index]
+            if abs(other_timestamp - timestamp) <= self.tolerance:
+                # the frames before the match were passed over for a nearer one
+                self.drop(waiting[:index])
+                del waiting[: index + 1]
+                if eye_id == EyeId.LEFT:
+                    left, right, skew = eye_info, other_info, other_timestamp - timestamp
+                else:
+                    left, right, skew = other_info, eye_info, timestamp - other_timestamp
+                self.skew = skew
+                self.skew_sum += abs(skew)
+                self.max_skew = max(self.max_skew, abs(skew))
+                self.pairs += 1
+                return [BinocularUpdate(eye_id, left, right, skew)]
+
+        if now - self.last_seen.get(other, -float("inf")) > self.timeout:
+            # the other eye is gone, nothing to wait for
+            own.append((timestamp, eye_info, True))
+            self.singles += 1
+            left, right = (eye_info, None) if eye_id == EyeId.LEFT else (None, eye_info)
+            return [BinocularUpdate(eye_id, left, right)]
+
+        if self.latest.get(other, -float("inf")) > timestamp + self.tolerance:
+            # the other eye has already moved past this frame
+            self.unpaired += 1
+            return []
+        own.append((timestamp, eye_info, False))
+        return []
+
+    @property
+    def mean_skew(self):
+        return self.skew_sum / self.pairs if self.pairs else 0.0
+
+    def stats(self):
+        return (
+            f"{self.pairs} pairs, {self.singles} single eye, {self.unpaired} unpaired, "
+            f"skew mean {self.mean_skew * 1000:.2f} ms max {self.max_skew * 1000:.2f} ms"
+        )
@@ -0,0 +1,23 @@
+from osc.OSCEncoder import OSCEncodingClient
+
+
+class OSCBundleClient:
+    """
+    Stands in for the udp client while one eye update is sent. send_message only collects the parameters,
+    flush sends all of them as a single OSC bundle with an immediate timetag, one sendto per update.
+    """
+
+    def __init__(self, client: OSCEncodingClient):
+        self.client = client
+        self.messages = []
+
+    def send_message(self, address, value):
+        self.messages.append((address, value))
+
+    def flush(self):
+        if not self.messages:
+            return
+        try:
+            self.client.send_dgram(self.client.encoder.encode_bundle(self.messages))
+        finally:
+            self.messages.clear()
@@ -0,0 +1,114 @@
+import struct
+from collections.abc import Iterable
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.udp_client import SimpleUDPClient
+
+BUNDLE_PREFIX = b"#bundle\x00"
+IMMEDIATELY = b"\x00\x00\x00\x00\x00\x00\x00\x01"
+_SIZE = struct.Struct(">i")
+
+
+def _padded(text):
+    """OSC string: null terminated and padded to a multiple of 4 bytes."""
+    data = text.encode("utf-8") + b"\x00"
+    return data + b"\x00" * (-len(data) % 4)
+
+
+def _arguments(value):
+    # the same argument handling as SimpleUDPClient.send_message
+    if type(value) is float:
+        return (value,)
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    if value is None:
+        return ()
+    if not isinstance(value, Iterable) or isinstance(value, (str, bytes)):
+        return (value,)
+    return tuple(value)
+
+
+class _CompiledMessage:
+    __slots__ = ("buffer", "offset", "packer", "int_positions")
+
+    def __init__(self, address, types):
+        tags = "".join("i" if issubclass(t, int) else "f" for t in types)
+        prefix = _padded(address) + _padded("," + tags)
+        self.packer = struct.Struct(">" + tags)
+        self.offset = len(prefix)
+        self.buffer = bytearray(prefix) + bytearray(self.packer.size)
+        self.int_positions = [i for i, t in enumerate(types) if issubclass(t, int)]
+
+
+class OSCEncoder:
+    """
+    Encodes OSC messages the way python-osc does, but with the address and type tag bytes compiled once per
+    address and argument types. Float and int arguments are packed with a cached struct.Struct straight into
+    a bytearray kept per message, anything else goes through OscMessageBuilder.
+
+    The returned buffer is reused by the next message to the same address, send it before encoding another.
+    Call clear() when the configured addresses change so the old ones do not stay around.
+    """
+
+    def __init__(self):
+        self.compiled = {}
+
+    def clear(self):
+        self.compiled.clear()
+
+    def encode(self, address, value):
+        values = _arguments(value)
+        key = (address, tuple(map(type, values)))
+        message = self.compiled.get(key)
+        if message is None:
+            if not all(t is not bool and (issubclass(t, float) or issubclass(t, int)) for t in key[1]):
+                return self.build(address, values)
+            message = self.compiled[key] = _CompiledMessage(address, key[1])
+        for i in message.int_positions:
+            if values[i].bit_length() > 31:
+                # python-osc sends those as int64
+                return self.build(address, values)
+        message.packer.pack_into(message.buffer, message.offset, *values)
+        return message.buffer
+
+    @staticmethod
+    def build(address, values):
+        builder = OscMessageBuilder(address=address)
+        for value in values:
+            builder.add_arg(value)
+        return builder.build().dgram
+
+    def encode_bundle(self, messages):
+        """One bundle with an immediate timetag holding the (address, value) messages."""
+        bundle = bytearray(BUNDLE_PREFIX)
+        bundle += IMMEDIATELY
+        for address, value in messages:
+            dgram = self.encode(address, value)
+            bundle += _SIZE.pack(len(dgram))
+            bundle += dgram
+        return bundle
+
+
+class _Datagram:
+    """What UDPClient.send needs from a message: its bytes."""
+
+    __slots__ = ("dgram",)
+
+    def __init__(self):
+        self.dgram = b""
+
+
+class OSCEncodingClient:
+    """send_message through the OSCEncoder for a python-osc udp client."""
+
+    def __init__(self, client: SimpleUDPClient, encoder: OSCEncoder):
+        self.client = client
+        self.encoder = encoder
+        self.datagram = _Datagram()
+
+    def send_message(self, address, value):
+        self.send_dgram(self.encoder.encode(address, value))
+
+    def send_dgram(self, dgram):
+        self.datagram.dgram = dgram
+        self.client.send(self.datagram)
@@ -0,0 +1,69 @@
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+from osc.OSCMessage import OSCMessage, OSCMessageType
+
+
+class OSCMailbox:
+    """
+    Latest-value slots between the trackers and the OSC sender, one per eye and message type. put never
+    blocks: a value the sender has not picked up yet is replaced by the newer one and counted as superseded,
+    so a slow sender costs stale values instead of stalling frame processing.
+
+    The waker, if set, is called from the putting thread when the mailbox goes from empty to filled, so an
+    event loop consumer gets one wakeup per drain however many values arrive in between.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False  # a wakeup is pending, set from the first put until the next drain
+        self.slots = {}
+        self.superseded = Counter()
+        self.delivered = 0
+        self.waker: Optional[Callable[[], None]] = None
+
+    @staticmethod
+    def key(message: OSCMessage):
+        if message.type == OSCMessageType.EYE_INFO:
+            return message.type, message.data[0]
+        if isinstance(message.data, dict):
+            # module settings, every field keeps its own latest value
+            return message.type, message.data.get("field")
+        return message.type, None
+
+    def put(self, message: OSCMessage, block=False, timeout=None):
+        """Queue.put compatible, but never blocks."""
+        key = self.key(message)
+        with self.lock:
+            if key in self.slots:
+                self.superseded[key] += 1
+            self.slots[key] = message
+            wake = not self.ready
+            self.ready = True
+        if wake:
+            self.wake()
+
+    def wake(self):
+        waker = self.waker
+        if waker is not None:
+            waker()
+
+    def drain(self):
+        """The latest message of every slot, in the order the slots were first filled."""
+        with self.lock:
+            self.ready = False
+            messages = list(self.slots.values())
+            self.slots.clear()
+        self.delivered += len(messages)
+        return messages
+
+    def empty(self):
+        return not self.slots
+
+    @property
+    def superseded_total(self):
+        return sum(self.superseded.values())
+
+    def stats(self):
+        return f"delivered {self.delivered}, superseded {self.superseded_total}"
@@ -0,0 +1,24 @@
+import asyncio
+
+
+class DatagramClient:
+    """
+    UDP client on an asyncio datagram transport, a stand-in for SimpleUDPClient inside the OSC event loop.
+    send takes anything with a dgram, like UDPClient.send, so OSCEncodingClient works on top of it.
+    """
+
+    def __init__(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    @classmethod
+    async def connect(cls, address, port):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(address, port))
+        return cls(transport)
+
+    def send(self, content):
+        # the transport copies what it can't send right away, reused encoder buffers are safe
+        self.transport.sendto(content.dgram)
+
+    def close(self):
+        self.transport.close()
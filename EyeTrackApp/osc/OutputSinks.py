@@ -0,0 +1,131 @@
+import socket
+from abc import ABC, abstractmethod
+from multiprocessing import shared_memory
+
+from config import EyeTrackConfig, SettingsPublisher
+from osc.BinaryOutput import HEADER, MAGIC, RECORD, SEQUENCE, SHM_SIZE, SLOT_COUNT, VERSION, pack_record, slot_offset
+from osc.OSCBundleClient import OSCBundleClient
+from osc.OSCMessage import OSCMessage, OSCMessageType
+from osc.VRChatOSCSender import VRChatOSCSender
+
+
+class OutputSink(ABC):
+    """Gets every eye update the OSC sender drains from the mailbox, on the OSC event loop thread."""
+
+    @abstractmethod
+    def write(self, eye_id, eye_info):
+        pass
+
+    def close(self):
+        pass
+
+
+class OSCSink(OutputSink):
+    """The VRChat / VRCFT module OSC output."""
+
+    def __init__(
+        self,
+        vrc_sender: VRChatOSCSender,
+        client,
+        main_config: EyeTrackConfig,
+        settings_publisher: SettingsPublisher,
+    ):
+        self.vrc_sender = vrc_sender
+        self.client = client
+        self.bundle_client = OSCBundleClient(client)
+        self.main_config = main_config
+        self.settings_publisher = settings_publisher
+
+    def write(self, eye_id, eye_info):
+        config = self.settings_publisher.snapshot
+        bundle = self.vrc_sender.bundle_output(config)
+        self.vrc_sender.output_osc_info(
+            osc_message=OSCMessage(type=OSCMessageType.EYE_INFO, data=(eye_id, eye_info)),
+            client=self.bundle_client if bundle else self.client,
+            main_config=self.main_config,
+            config=config,
+        )
+        if bundle:
+            self.bundle_client.flush()
+
+
+class BinarySocketSink(OutputSink):
+    """One BinaryOutput record per datagram, over UDP or a Unix datagram socket."""
+
+    def __init__(self, family, address):
+        self.address = address
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.buffer = bytearray(RECORD.size)
+        self.sequence = 0
+        self.dropped = 0
+
+    def write(self, eye_id, eye_info):
+        self.sequence += 1
+        pack_record(self.buffer, 0, eye_id, self.sequence, eye_info)
+        try:
+            self.sock.sendto(self.buffer, self.address)
+        except OSError:
+            # nobody listening on the socket path, or the send buffer is full
+            self.dropped += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class SharedMemorySink(OutputSink):
+    """The latest record of every eye in a named shared memory block, behind a sequence lock per slot."""
+
+    def __init__(self, name):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SHM_SIZE)
+        except FileExistsError:
+            # left over from a run that did not shut down
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.size < SHM_SIZE:
+                self.shm.close()
+                raise
+        self.shm.buf[:SHM_SIZE] = bytes(SHM_SIZE)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, SLOT_COUNT, RECORD.size)
+        self.sequences = [0] * SLOT_COUNT
+
+    def write(self, eye_id, eye_info):
+        offset = slot_offset(eye_id)
+        sequence = self.sequences[eye_id]
+        buf = self.shm.buf
+        SEQUENCE.pack_into(buf, offset, (sequence + 1) & 0xFFFFFFFF)
+        pack_record(buf, offset + SEQUENCE.size, eye_id, sequence // 2 + 1, eye_info)
+        sequence = (sequence + 2) & 0xFFFFFFFF
+        SEQUENCE.pack_into(buf, offset, sequence)
+        self.sequences[eye_id] = sequence
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+SINKS = {
+    "binary_udp": lambda config: BinarySocketSink(
+        socket.AF_INET, (config.output_binary_address, int(config.output_binary_port))
+    ),
+    "binary_unix": lambda config: BinarySocketSink(socket.AF_UNIX, config.output_unix_path),
+    "shared_memory": lambda config: SharedMemorySink(config.output_shm_name),
+}
+
+
+def create_sinks(config):
+    """The sinks named in output_sinks, next to the OSC output."""
+    sinks = []
+    for name in config.output_sinks:
+        factory = SINKS.get(name)
+        if factory is None:
+            print(f"\033[91m[ERROR] Unknown output sink: {name}\033[0m")
+            continue
+        try:
+            sinks.append(factory(config))
+        except (OSError, AttributeError, ValueError) as e:
+            # AF_UNIX is not available everywhere
+            print(f"\033[91m[ERROR] Could not open output sink {name}: {e}\033[0m")
+            continue
+        print(f"\033[92m[INFO] Output sink {name} enabled\033[0m")
+    return sinks
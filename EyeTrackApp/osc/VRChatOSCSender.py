@@ -1,6 +1,7 @@
 from pythonosc.udp_client import SimpleUDPClient
 
 from eye import EyeId
+from osc.BinocularPairing import BinocularPairing, BinocularUpdate
 from osc.OSCMessage import OSCMessage
 
 from config import EyeTrackConfig, EyeTrackSettingsConfig
@@ -37,6 +38,7 @@ class VRChatOSCSender:
         self.right_last_blink = time.time()
         self.r_dilation = 0
         self.l_dilation = 0
+        self.pairing = BinocularPairing()
 
     def output_osc_info(
         self,
@@ -50,13 +52,17 @@ class VRChatOSCSender:
 
 
         output_method = None
+        combined_method = None
 
         if config.gui_vrc_native:
             output_method = self.output_native
+            combined_method = self.output_native_combined
         if config.gui_osc_vrcft_v1:
             output_method = self.output_v1_params
+            combined_method = self.output_v1_combined
         if config.gui_osc_vrcft_v2:
             output_method = self.output_v2_params
+            combined_method = self.output_v2_combined
 
         if output_method:
             output_method(
@@ -71,6 +77,37 @@ class VRChatOSCSender:
                 pupil_dilation=eye_info.pupil_dilation,
             )
 
+        if combined_method and not self.is_single_eye and eye_id in [EyeId.LEFT, EyeId.RIGHT]:
+            # values of both eyes go out once per stereo frame, not on every eye's message
+            self.pairing.tolerance = config.osc_binocular_pair_tolerance
+            self.pairing.timeout = config.osc_binocular_pair_timeout
+            for update in self.pairing.add(eye_id, eye_info):
+                self.apply_binocular_update(update)
+                combined_method(main_config=main_config, config=config, client=client, update=update)
+
+    def apply_binocular_update(self, update: BinocularUpdate):
+        for side, eye_info in [(EyeId.LEFT, update.left), (EyeId.RIGHT, update.right)]:
+            if eye_info is not None:
+                self.update_eye_state(
+                    eye_id=side,
+                    eye_x=eye_info.x,
+                    eye_y=eye_info.y,
+                    eye_blink=eye_info.blink,
+                    avg_velocity=eye_info.avg_velocity,
+                    pupil_dilation=eye_info.pupil_dilation,
+                )
+
+    @staticmethod
+    def bundle_output(config: EyeTrackSettingsConfig):
+        """Whether the active output protocol is set to send each update as one OSC bundle."""
+        if config.gui_osc_vrcft_v2:
+            return config.gui_osc_bundle_v2
+        if config.gui_osc_vrcft_v1:
+            return config.gui_osc_bundle_v1
+        if config.gui_vrc_native:
+            return config.gui_osc_bundle_native
+        return False
+
     @staticmethod
     def get_is_single_eye(eye_display_id):
         return eye_display_id in [EyeId.RIGHT, EyeId.LEFT, 0, 1]
@@ -115,22 +152,24 @@ class VRChatOSCSender:
                 [float(eye_x), float(eye_y), 1.0, float(eye_x), float(eye_y), 1.0],
             )
 
-        if eye_id in [EyeId.LEFT, EyeId.RIGHT, EyeId.BOTH] and not self.is_single_eye:
+        if eye_id == EyeId.BOTH and not self.is_single_eye:
             self.output_osc_native_blink(**default_eye_blink_params, single_eye_mode=False)
 
-        if not self.is_single_eye:
-            # vrc native ET (z values may need tweaking, they act like a scalar)
-            client.send_message(
-                "/tracking/eye/LeftRightVec",
-                [
-                    float(self.l_eye_x),
-                    float(self.left_y),
-                    1.0,
-                    float(self.r_eye_x),
-                    float(self.right_y),
-                    1.0,
-                ],
-            )
+    def output_native_combined(self, main_config, config, client, update: BinocularUpdate):
+        self.output_osc_native_blink(eye_id=update.eye_id, client=client, config=config, single_eye_mode=False)
+
+        # vrc native ET (z values may need tweaking, they act like a scalar)
+        client.send_message(
+            "/tracking/eye/LeftRightVec",
+            [
+                float(self.l_eye_x),
+                float(self.left_y),
+                1.0,
+                float(self.r_eye_x),
+                float(self.right_y),
+                1.0,
+            ],
+        )
 
     def output_v1_params(
         self,
@@ -189,6 +228,7 @@ class VRChatOSCSender:
                     _eyelid_transformer(config, self.r_eye_blink),
                 )
 
+    def output_v1_combined(self, main_config, config, client, update: BinocularUpdate):
         if main_config.eye_display_id == EyeId.BOTH and self.right_y != 621 and self.left_y != 621:
             y = (self.right_y + self.left_y) / 2
             client.send_message(config.osc_eyes_y_address, y)
@@ -266,8 +306,9 @@ class VRChatOSCSender:
                     _eyelid_transformer(config, self.r_eye_blink),
                 )
 
-            avg_pupil_dilation = (self.l_dilation + self.r_dilation) / 2
-            client.send_message("/avatar/parameters/v2/PupilDilation", avg_pupil_dilation)
+    def output_v2_combined(self, main_config, config, client, update: BinocularUpdate):
+        avg_pupil_dilation = (self.l_dilation + self.r_dilation) / 2
+        client.send_message("/avatar/parameters/v2/PupilDilation", avg_pupil_dilation)
 
 
 
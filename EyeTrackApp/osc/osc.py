@@ -25,55 +25,75 @@ LICENSE: Babble Software Distribution License 1.0
 """
 
 
-from time import sleep
-from typing import Dict, Optional, Iterable, Callable
+import asyncio
+import threading
+from time import monotonic
+from typing import Dict, Optional, Iterable, Callable, List
 
-from pythonosc import udp_client
 from pythonosc import osc_server
 from pythonosc import dispatcher
 
-from config import EyeTrackConfig
+from config import EyeTrackConfig, SettingsPublisher
+from osc.OSCEncoder import OSCEncoder, OSCEncodingClient
+from osc.OSCMailbox import OSCMailbox
 from osc.OSCMessage import OSCMessage, OSCMessageType
+from osc.OSCTransport import DatagramClient
+from osc.OutputSinks import OSCSink, OutputSink, create_sinks
 from osc.VRCFTModuleMessenger import VRCFTModuleSender
 from osc.VRChatOSCSender import VRChatOSCSender
-import queue
-import threading
+
 
 class OSCManager:
+    """
+    Sending and receiving share one asyncio event loop on a single thread. The sender sleeps until the
+    mailbox wakes it and the receiver is a datagram endpoint on the same loop, so stopping either one or
+    rebinding the receive port takes effect right away instead of waiting out a polling interval.
+    """
+
     def __init__(
         self,
-        osc_message_in_queue: queue.Queue[OSCMessage],
+        osc_message_in_queue: OSCMailbox,
         config: EyeTrackConfig,
+        settings_publisher: Optional[SettingsPublisher] = None,
     ):
-        self.sender_cancellation_event = threading.Event()
-        self.receiver_cancellation_event = threading.Event()
         self.listeners = {}
         self.osc_message_in_queue = osc_message_in_queue
         self.config = config
         self.settings = config.settings
+        # without a shared publisher, keep one up to date from our own config updates
+        self.owns_publisher = settings_publisher is None
+        self.settings_publisher = settings_publisher or SettingsPublisher(config.settings)
         self.osc_sender: Optional[OSCSender] = None
-        self.osc_receiver = None
-        self.osc_sender_thread: Optional[threading.Thread] = None
-        self.osc_receiver_thread: Optional[threading.Thread] = None
+        self.osc_receiver: Optional[OSCReceiver] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[threading.Thread] = None
 
     def start(self):
         self.setup_sender()
         self.setup_receiver()
 
+    def start_loop(self):
+        if self.loop_thread is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, name="OSC", daemon=True)
+            self.loop_thread.start()
+
+    def run(self, coroutine):
+        """Runs the coroutine on the OSC loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
     def setup_sender(self):
         print(f"\033[92m[INFO] Setting up OSC sender\033[0m")
-        self.sender_cancellation_event.clear()
-        self.osc_sender = OSCSender(self.sender_cancellation_event, self.osc_message_in_queue, self.config)
-        self.osc_sender_thread = threading.Thread(target=self.osc_sender.run)
-        self.osc_sender_thread.start()
+        self.start_loop()
+        self.osc_sender = OSCSender(self.osc_message_in_queue, self.config, self.settings_publisher)
+        self.run(self.osc_sender.start())
 
     def setup_receiver(self):
         if self.settings.gui_ROSC:
-            self.receiver_cancellation_event.clear()
             print(f"\033[92m[INFO] Setting up OSC receiver\033[0m")
-            self.osc_receiver = OSCReceiver(self.receiver_cancellation_event, self.config, self.listeners)
-            self.osc_receiver_thread = threading.Thread(target=self.osc_receiver.run)
-            self.osc_receiver_thread.start()
+            self.start_loop()
+            self.osc_receiver = OSCReceiver(self.config, self.listeners)
+            self.run(self.osc_receiver.start())
 
     def register_listeners(self, osc_address: str, callbacks: Iterable[Callable]):
         if not self.listeners.get(osc_address):
@@ -82,6 +102,8 @@ class OSCManager:
         self.listeners[osc_address].extend(callbacks)
 
     def update(self, data: dict):
+        if self.owns_publisher:
+            self.settings_publisher.on_config_update(data)
         keys = set(data.keys())
         sender_trigger_keys = {
             "gui_osc_port",
@@ -89,10 +111,14 @@ class OSCManager:
             "gui_VRCFTModuleIPAddress",
             "gui_use_module",
         }
-        if sender_trigger_keys.intersection(keys):
+        if sender_trigger_keys.intersection(keys) or any(key.startswith("output_") for key in keys):
             self.stop_sender()
             self.setup_sender()
 
+        if self.osc_sender and any(key.startswith("osc_") for key in keys):
+            # addresses changed, compile the new ones on first use
+            self.osc_sender.encoder.clear()
+
         receiver_trigger_keys = {
             "gui_ROSC",
             "gui_osc_receiver_port",
@@ -104,112 +130,161 @@ class OSCManager:
     def shutdown(self):
         self.stop_sender()
         self.stop_receiver()
+        if self.loop_thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+            self.loop_thread = None
 
     def stop_sender(self):
-        self.sender_cancellation_event.set()
-        self.osc_sender_thread.join()
+        if self.osc_sender is None or self.osc_sender.task is None:
+            return
+        self.run(self.osc_sender.stop())
+        print(f"\033[94m[INFO] OSC sender stopped, {self.osc_message_in_queue.stats()}\033[0m")
+        print(f"\033[94m[INFO] Binocular pairing: {self.osc_sender.vrc_sender.pairing.stats()}\033[0m")
 
     def stop_receiver(self):
-        if self.osc_receiver_thread:
-            self.receiver_cancellation_event.set()
-            self.osc_receiver_thread.join()
+        if self.osc_receiver is not None:
+            self.run(self.osc_receiver.stop())
+            self.osc_receiver = None
 
 
 class OSCSender:
     def __init__(
         self,
-        cancellation_event: threading.Event,
-        msg_queue: queue.Queue[OSCMessage],
+        msg_queue: OSCMailbox,
         main_config: EyeTrackConfig,
+        settings_publisher: SettingsPublisher,
     ):
-        self.cancellation_event = cancellation_event
         self.msg_queue = msg_queue
         self.main_config = main_config
         self.config = main_config.settings
+        self.settings_publisher = settings_publisher
         self.vrc_sender = VRChatOSCSender()
         self.module_sender = VRCFTModuleSender()
 
-        self.vrc_client = None
-        self.vrcft_client = None
+        self.vrc_client: Optional[DatagramClient] = None
+        self.vrcft_client: Optional[DatagramClient] = None
+        self.encoder = OSCEncoder()
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.sinks: List[OutputSink] = []
+        self.failing_sinks = set()
 
-    def run(self):
-        self.vrc_client = udp_client.SimpleUDPClient(self.config.gui_osc_address, int(self.config.gui_osc_port))
-        self.vrcft_client = udp_client.SimpleUDPClient(
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.vrc_client = await DatagramClient.connect(self.config.gui_osc_address, int(self.config.gui_osc_port))
+        self.vrcft_client = await DatagramClient.connect(
             self.config.gui_VRCFTModuleIPAddress,
             int(self.config.gui_VRCFTModulePort),
         )
+        self.sinks = create_sinks(self.config)
+        self.wakeup = asyncio.Event()
+        self.msg_queue.waker = lambda: loop.call_soon_threadsafe(self.wakeup.set)
+        if not self.msg_queue.empty():
+            # filled before the waker was there
+            self.wakeup.set()
+        self.task = loop.create_task(self.run())
+
+    async def stop(self):
+        self.msg_queue.waker = None
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        self.vrc_client.close()
+        self.vrcft_client.close()
+        for sink in self.sinks:
+            sink.close()
 
+    async def run(self):
         vrc_osc_output_client = self.vrc_client
         if self.config.gui_use_module:
             vrc_osc_output_client = self.vrcft_client
+        vrc_osc_output_client = OSCEncodingClient(vrc_osc_output_client, self.encoder)
+        osc_sink = OSCSink(self.vrc_sender, vrc_osc_output_client, self.main_config, self.settings_publisher)
+        sinks = [osc_sink, *self.sinks]
+        module_client = OSCEncodingClient(self.vrcft_client, self.encoder)
+
+        last_drain = 0.0
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            max_rate = self.settings_publisher.snapshot.gui_osc_max_rate
+            if max_rate > 0:
+                # hold off until the next output slot, whatever arrives meanwhile replaces what is waiting
+                remaining = last_drain + 1 / max_rate - monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            last_drain = monotonic()
 
-        while not self.cancellation_event.is_set():
-            try:
-                osc_message: OSCMessage = self.msg_queue.get(block=True, timeout=0.1)
+            for osc_message in self.msg_queue.drain():
                 match osc_message.type:
                     case OSCMessageType.EYE_INFO:
-                        self.vrc_sender.output_osc_info(
-                            osc_message=osc_message,
-                            client=vrc_osc_output_client,
-                            main_config=self.main_config,
-                            config=self.config,
-                        )
+                        eye_id, eye_info = osc_message.data
+                        for sink in sinks:
+                            self.write_sink(sink, eye_id, eye_info)
                     case OSCMessageType.VRCFT_MODULE_INFO:
-                        self.module_sender.send(osc_message=osc_message, client=self.vrcft_client)
+                        try:
+                            self.module_sender.send(osc_message=osc_message, client=module_client)
+                        except Exception as e:
+                            print(f"\033[93m[WARN] Could not send the VRCFT module info: {e}\033[0m")
                     case _:
-                        raise Exception("Encountered message without a handler %s", osc_message.type)
-            except TypeError:
-                continue
-            except queue.Empty:
-                continue
+                        print(f"\033[93m[WARN] Encountered message without a handler {osc_message.type}\033[0m")
+
+    def write_sink(self, sink: OutputSink, eye_id, eye_info):
+        """One sink failing must not stop the others, or the sender."""
+        try:
+            sink.write(eye_id, eye_info)
+        except TypeError:
+            # incomplete eye info, nothing to send
+            return
+        except Exception as e:
+            if sink not in self.failing_sinks:
+                # once per failure streak, not every frame
+                self.failing_sinks.add(sink)
+                print(f"\033[93m[WARN] {type(sink).__name__} failed to write: {e}\033[0m")
+            return
+        if sink in self.failing_sinks:
+            self.failing_sinks.discard(sink)
+            print(f"\033[94m[INFO] {type(sink).__name__} is writing again\033[0m")
 
 
 class OSCReceiver:
     def __init__(
         self,
-        cancellation_event: threading.Event,
         main_config: EyeTrackConfig,
         listeners: Dict[str, Callable[[OSCMessage], None]],
     ):
         self.config = main_config.settings
-        self.cancellation_event = cancellation_event
         self.dispatcher = dispatcher.Dispatcher()
+        self.dispatcher.set_default_handler(self.handle_osc_message)
         self.listeners = listeners
-        self.server_thread = None
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    async def start(self):
+        server = osc_server.AsyncIOOSCUDPServer(
+            (self.config.gui_osc_address, int(self.config.gui_osc_receiver_port)),
+            self.dispatcher,
+            asyncio.get_running_loop(),
+        )
         try:
-            # this thing sucks ass god fucking damn it.
-            # like, there is no way of shutting it down UNLESS you run it in a thread
-            # which is kinda dumb, but oh well.
-            # Also, it doesn't shutdown properly. It's STILL connected to the port
-            self.server = osc_server.OSCUDPServer(
-                (self.config.gui_osc_address, int(self.config.gui_osc_receiver_port)),
-                self.dispatcher,
-            )
-        except Exception:  # noqa
+            self.transport, _ = await server.create_serve_endpoint()
+        except OSError:
             print(f"\033[91m[ERROR] OSC Receive port: {self.config.gui_osc_receiver_port} occupied.\033[0m")
+            return
+        print("\033[92m[INFO] OSC Listening on {}\033[0m".format(self.transport.get_extra_info("sockname")))
 
-    def shutdown(self):
+    async def stop(self):
         print("\033[94m[INFO] Exiting OSC Receiver\033[0m")
-        try:
-            self.server.shutdown()
-            self.server_thread.join()
-        except Exception:  # noqa
-            pass
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+            # the socket is closed by a callback close() schedules, let it run so the port is free to bind again
+            await asyncio.sleep(0)
 
     def handle_osc_message(self, address, value):
         for listener in self.listeners.get(address, []):
             listener(OSCMessage(type=OSCMessageType.EYE_INFO, data=value))
-
-    def run(self):
-        try:
-            self.dispatcher.set_default_handler(self.handle_osc_message)
-            print("\033[92m[INFO] OSC Listening on {}\033[0m".format(self.server.server_address))
-            self.server_thread = threading.Thread(target=self.server.serve_forever)
-            self.server_thread.start()
-
-            while not self.cancellation_event.is_set():
-                sleep(10)
-
-            self.shutdown()
-        except Exception:  # noqa:
-            print(f"\033[91m[ERROR] OSC Receive port: {self.config.gui_osc_receiver_port} occupied.\033[0m")
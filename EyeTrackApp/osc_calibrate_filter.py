@@ -30,13 +30,14 @@ import time
 from enum import IntEnum
 from utils.misc_utils import PlaySound, SND_FILENAME, SND_ASYNC, resource_path
 from utils.eye_falloff import velocity_falloff
+from utils.eye_velocity import VelocityEstimator
 import socket
 import struct
 import threading
 import os
 import subprocess
 import math
-from utils.calibration_3d import receive_calibration_data, converge_3d
+from utils.calibration_3d import receive_calibration_data, update_vergence
 from utils.misc_utils import resource_path
 from pathlib import Path
 
@@ -95,38 +96,122 @@ class EyeId(IntEnum):
     SETTINGS = 3
 
 
-class var:
-    average_velocity = 0
-    velocity_rolling_list = []
-    past_x = 0
-    past_y = 0
-    start_time = time.time()
-    r_eye_x = 0.0
-    l_eye_x = 0.0
-    left_y = 0.0
-    right_y = 0.0
-    l_eye_velocity = 0.0
-    r_eye_velocity = 0.0
-    overlay_active = False
-    falloff_latch = False
-    single_eye = True
-    left_enb = 0
-    right_enb = 0
-    eye_wait = 10
-    left_calib = False
-    right_calib = False
-    completed_3d_calib = 0
+class EyeCalibrationState:
+    """
+    Calibration bounds and velocity of one eye, only used from that eye's thread. The bounds are cached as
+    plain floats and written back to the camera config when they change.
+    """
+
+    __slots__ = (
+        "config",
+        "xmax",
+        "xmin",
+        "ymax",
+        "ymin",
+        "xoff",
+        "yoff",
+        "dirty",
+        "velocity",
+    )
+
+    def __init__(self, config):
+        self.velocity = VelocityEstimator()
+        self.load(config)
+
+    def load(self, config):
+        self.config = config
+        self.xmax = config.calib_XMAX
+        self.xmin = config.calib_XMIN
+        self.ymax = config.calib_YMAX
+        self.ymin = config.calib_YMIN
+        self.xoff = config.calib_XOFF
+        self.yoff = config.calib_YOFF
+        self.dirty = False
+
+    def store(self):
+        if not self.dirty:
+            return
+        self.config.calib_XMAX = self.xmax
+        self.config.calib_XMIN = self.xmin
+        self.config.calib_YMAX = self.ymax
+        self.config.calib_YMIN = self.ymin
+        self.config.calib_XOFF = self.xoff
+        self.config.calib_YOFF = self.yoff
+        self.dirty = False
+
+    def set_offset(self, cx, cy):
+        self.xoff = cx
+        self.yoff = cy
+        self.dirty = True
+
+    def reset_bounds(self):
+        self.xmax = -69420
+        self.xmin = 69420
+        self.ymax = -69420
+        self.ymin = 69420
+        self.dirty = True
+
+    def extend_bounds(self, cx, cy):
+        if cx > self.xmax:
+            self.xmax = cx
+            self.dirty = True
+        if cx < self.xmin:
+            self.xmin = cx
+            self.dirty = True
+        if cy > self.ymax:
+            self.ymax = cy
+            self.dirty = True
+        if cy < self.ymin:
+            self.ymin = cy
+            self.dirty = True
+
+class BinocularState:
+    """What the two eye threads share, hold `lock` while reading or writing the eye values and 3D calibration."""
+
+    __slots__ = (
+        "lock",
+        "r_eye_x",
+        "l_eye_x",
+        "left_y",
+        "right_y",
+        "l_eye_velocity",
+        "r_eye_velocity",
+        "l_eye_saccade",
+        "r_eye_saccade",
+        "left_calib",
+        "right_calib",
+        "completed_3d_calib",
+        "overlay_active",
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.r_eye_x = 0.0
+        self.l_eye_x = 0.0
+        self.left_y = 0.0
+        self.right_y = 0.0
+        self.l_eye_velocity = 0.0
+        self.r_eye_velocity = 0.0
+        self.l_eye_saccade = False
+        self.r_eye_saccade = False
+        self.left_calib = False
+        self.right_calib = False
+        self.completed_3d_calib = 0
+        self.overlay_active = False
+
+
+binocular = BinocularState()
 
 
 @Async
 def center_overlay_calibrate(self):
     tools = Path("Tools")
     # try:
-    if var.overlay_active != True:
+    if binocular.overlay_active != True:
         
         overlay_path = resource_path("tools/ETVR_SteamVR_Calibration_Overlay.exe")
         os.startfile(overlay_path, arguments="center")
-        var.overlay_active = True
+        binocular.overlay_active = True
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         server_address = ("localhost", 2112)
         sock.bind(server_address)
@@ -135,23 +220,23 @@ def center_overlay_calibrate(self):
         message = received_int
         self.settings.gui_recenter_eyes = False
         self.calibration_frame_counter = 0
-        var.overlay_active = False
+        binocular.overlay_active = False
 
 
 #  except:
 #  print("[WARN] Calibration overlay error. Make sure SteamVR is Running.")
 #   self.settings.gui_recenter_eyes = False
-#   var.overlay_active = False
+#   binocular.overlay_active = False
 
 
 @Async
 def overlay_calibrate_3d(self):
     try:
-        if var.overlay_active != True:
+        if binocular.overlay_active != True:
             overlay_path = resource_path("tools/EyeTrackVR-Overlay.exe")
             os.startfile(overlay_path)
-            var.overlay_active = True
-            while var.overlay_active:
+            binocular.overlay_active = True
+            while binocular.overlay_active:
                 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
                 server_address = ("localhost", 2112)
                 sock.bind(server_address)
@@ -163,12 +248,12 @@ def overlay_calibrate_3d(self):
 
                 print(message)
                 if message == 9:
-                    var.overlay_active = False
+                    binocular.overlay_active = False
 
     except:
         print("[WARN] Calibration overlay error. Make sure SteamVR is Running.")
         self.settings.gui_recenter_eyes = False
-        var.overlay_active = False
+        binocular.overlay_active = False
 
 
 class cal:
@@ -183,9 +268,9 @@ class cal:
         if cy == 0:
             cy = 1
         if self.eye_id == EyeId.RIGHT:
-            flipx = self.settings.gui_flip_x_axis_right
+            flipx = self.snapshot.gui_flip_x_axis_right
         else:
-            flipx = self.settings.gui_flip_x_axis_left
+            flipx = self.snapshot.gui_flip_x_axis_left
         if self.calibration_3d_frame_counter == -621:  # or self.settings.gui_3d_calibration:
 
             self.calibration_3d_frame_counter = self.calibration_3d_frame_counter - 1
@@ -195,71 +280,65 @@ class cal:
         #  print(self.eye_id, cx, cy)
         # self.settings.gui_3d_calibration = False
 
-        if self.settings.grab_3d_point:
-            # Check if both calibrations are done
-            if var.left_calib and var.right_calib:
-                self.settings.grab_3d_point = False
-                var.left_calib = False
-                var.right_calib = False
-                print("end", len(self.config.calibration_points_3d), self.config.calibration_points_3d)
+        with binocular.lock:
+            if self.settings.grab_3d_point:
+                # Check if both calibrations are done
+                if binocular.left_calib and binocular.right_calib:
+                    self.settings.grab_3d_point = False
+                    binocular.left_calib = False
+                    binocular.right_calib = False
+                    print("end", len(self.config.calibration_points_3d), self.config.calibration_points_3d)
 
-            else:
-                # Check if it's the left eye and left calibration is not done yet
-                if self.eye_id == EyeId.LEFT and not var.left_calib:
-                    var.left_calib = True
-                    self.config.calibration_points_3d.append((cx, cy, 1))
-                # Check if it's the right eye and right calibration is not done yet
-                elif self.eye_id == EyeId.RIGHT and not var.right_calib:
-                    var.right_calib = True
-                    self.config.calibration_points_3d.append((cx, cy, 0))
-
-        if self.eye_id == EyeId.LEFT and len(self.config.calibration_points_3d) == 9 and var.left_calib == False:
-            var.left_calib = True
-            receive_calibration_data(self.config.calibration_points_3d, self.eye_id)
-            print("SENT LEFT EYE POINTS")
-            var.completed_3d_calib += 1
-
-        if self.eye_id == EyeId.RIGHT and len(self.config.calibration_points_3d) == 9 and var.right_calib == False:
-            var.right_calib = True
-            receive_calibration_data(self.config.calibration_points_3d, self.eye_id)
-            print("SENT RIGHT EYE POINTS")
-            var.completed_3d_calib += 1
+                else:
+                    # Check if it's the left eye and left calibration is not done yet
+                    if self.eye_id == EyeId.LEFT and not binocular.left_calib:
+                        binocular.left_calib = True
+                        self.config.calibration_points_3d.append((cx, cy, 1))
+                    # Check if it's the right eye and right calibration is not done yet
+                    elif self.eye_id == EyeId.RIGHT and not binocular.right_calib:
+                        binocular.right_calib = True
+                        self.config.calibration_points_3d.append((cx, cy, 0))
+
+            points_3d = len(self.config.calibration_points_3d)
+            if self.eye_id == EyeId.LEFT and points_3d == 9 and binocular.left_calib == False:
+                binocular.left_calib = True
+                receive_calibration_data(self.config.calibration_points_3d, self.eye_id)
+                print("SENT LEFT EYE POINTS")
+                binocular.completed_3d_calib += 1
+
+            if self.eye_id == EyeId.RIGHT and points_3d == 9 and binocular.right_calib == False:
+                binocular.right_calib = True
+                receive_calibration_data(self.config.calibration_points_3d, self.eye_id)
+                print("SENT RIGHT EYE POINTS")
+                binocular.completed_3d_calib += 1
         # print(len(self.config.calibration_points), self.eye_id)
 
-        if var.completed_3d_calib >= 2:
-            converge_3d()
-        # pass
+        # cheap enough to run every frame, stays None until both eyes are 3D calibrated
+        self.vergence = update_vergence(self.eye_id, cx, cy)
+
+        state = self.cal_state
+        if state.config is not self.config:
+            state.load(self.config)
 
         if self.calibration_frame_counter == 0:
             self.calibration_frame_counter = None
-            self.config.calib_XOFF = cx
-            self.config.calib_YOFF = cy
+            state.set_offset(cx, cy)
+            state.store()
             self.baseconfig.save()
             PlaySound(resource_path("Audio/completed.wav"), SND_FILENAME | SND_ASYNC)
-        if self.calibration_frame_counter == self.settings.calibration_samples:
-            self.config.calib_XMAX = -69420
-            self.config.calib_XMIN = 69420
-            self.config.calib_YMAX = -69420
-            self.config.calib_YMIN = 69420
+        if self.calibration_frame_counter == self.snapshot.calibration_samples:
+            state.reset_bounds()
             self.blink_clear = True
             self.calibration_frame_counter -= 1
         elif self.calibration_frame_counter != None:
             self.blink_clear = False
             self.settings.gui_recenter_eyes = False
-            if cx > self.config.calib_XMAX:
-                self.config.calib_XMAX = cx
-            if cx < self.config.calib_XMIN:
-                self.config.calib_XMIN = cx
-            if cy > self.config.calib_YMAX:
-                self.config.calib_YMAX = cy
-            if cy < self.config.calib_YMIN:
-                self.config.calib_YMIN = cy
+            state.extend_bounds(cx, cy)
 
             self.calibration_frame_counter -= 1
 
         if self.settings.gui_recenter_eyes == True:
-            self.config.calib_XOFF = cx
-            self.config.calib_YOFF = cy
+            state.set_offset(cx, cy)
             if self.ts == 0:
                 center_overlay_calibrate(self)  # TODO, only call on windows machines?
                 self.settings.gui_recenter_eyes = False
@@ -270,33 +349,35 @@ class cal:
         else:
             self.ts = 10
 
+        state.store()
+
         out_x = 0.5
         out_y = 0.5
 
-        if self.config.calib_XMAX != None and self.config.calib_XOFF != None:
+        if state.xmax != None and state.xoff != None:
 
-            calib_diff_x_MAX = self.config.calib_XMAX - self.config.calib_XOFF
+            calib_diff_x_MAX = state.xmax - state.xoff
             if calib_diff_x_MAX == 0:
                 calib_diff_x_MAX = 1
 
-            calib_diff_x_MIN = self.config.calib_XMIN - self.config.calib_XOFF
+            calib_diff_x_MIN = state.xmin - state.xoff
             if calib_diff_x_MIN == 0:
                 calib_diff_x_MIN = 1
 
-            calib_diff_y_MAX = self.config.calib_YMAX - self.config.calib_YOFF
+            calib_diff_y_MAX = state.ymax - state.yoff
             if calib_diff_y_MAX == 0:
                 calib_diff_y_MAX = 1
 
-            calib_diff_y_MIN = self.config.calib_YMIN - self.config.calib_YOFF
+            calib_diff_y_MIN = state.ymin - state.yoff
             if calib_diff_y_MIN == 0:
                 calib_diff_y_MIN = 1
 
-            xl = float((cx - self.config.calib_XOFF) / calib_diff_x_MAX)
-            xr = float((cx - self.config.calib_XOFF) / calib_diff_x_MIN)
-            yu = float((cy - self.config.calib_YOFF) / calib_diff_y_MIN)
-            yd = float((cy - self.config.calib_YOFF) / calib_diff_y_MAX)
+            xl = float((cx - state.xoff) / calib_diff_x_MAX)
+            xr = float((cx - state.xoff) / calib_diff_x_MIN)
+            yu = float((cy - state.yoff) / calib_diff_y_MIN)
+            yd = float((cy - state.yoff) / calib_diff_y_MAX)
 
-            if self.settings.gui_flip_y_axis:  # check config on flipped values settings and apply accordingly
+            if self.snapshot.gui_flip_y_axis:  # check config on flipped values settings and apply accordingly
                 if yd >= 0:
                     out_y = max(0.0, min(1.0, yd))
                 if yu > 0:
@@ -318,36 +399,21 @@ class cal:
                 if xl > 0:
                     out_x = -abs(max(0.0, min(1.0, xl)))
 
-            if self.settings.gui_outer_side_falloff:
-
-                run_time = time.time()
-                out_x_mult = out_x * 100
-                out_y_mult = out_y * 100
-                velocity = abs(
-                    np.sqrt(abs(np.square(out_x_mult - var.past_x) - np.square(out_y_mult - var.past_y)))
-                    / ((var.start_time - run_time) * 10)
-                )
-                if len(var.velocity_rolling_list) < 15:
-                    var.velocity_rolling_list.append(float(velocity))
-                else:
-                    var.velocity_rolling_list.pop(0)
-                    var.velocity_rolling_list.append(float(velocity))
-                var.average_velocity = sum(var.velocity_rolling_list) / len(var.velocity_rolling_list)
-                var.past_x = out_x_mult
-                var.past_y = out_y_mult
+            state.velocity.saccade_threshold = self.snapshot.gui_saccade_velocity_thresh
+            state.velocity.update(out_x, out_y, self.current_frame_time)
 
-            out_x, out_y = velocity_falloff(self, var, out_x, out_y)
+            out_x, out_y = velocity_falloff(
+                self, binocular, out_x, out_y, state.velocity.average, state.velocity.saccade
+            )
 
             try:
-                noisy_point = np.array([float(out_x), float(out_y)])  # fliter our values with a One Euro Filter
-                point_hat = self.one_euro_filter(noisy_point)
-                out_x = point_hat[0]
-                out_y = point_hat[1]
+                # fliter our values with a One Euro Filter
+                out_x, out_y = self.one_euro_filter((float(out_x), float(out_y)), self.current_frame_time)
 
             except:
                 pass
 
-            return out_x, out_y, var.average_velocity
+            return out_x, out_y, state.velocity.average
         else:
             if self.printcal:
                 print("\033[91m[ERROR] Please Calibrate Eye(s).\033[0m")
@@ -270,13 +270,13 @@ def RANSAC3D(self, hsrac_en):
     # crop 15% sqare around min_loc
     # frame_gray = frame_gray[max_loc[1] - maxloc1_hf:max_loc[1] + maxloc1_hf,
     #               max_loc[0] - maxloc0_hf:max_loc[0] + maxloc0_hf]
-    if self.settings.gui_legacy_ransac:
+    if self.snapshot.gui_legacy_ransac:
         if self.eye_id in [EyeId.LEFT]:
-            threshold_value = self.settings.gui_legacy_ransac_thresh_left
+            threshold_value = self.snapshot.gui_legacy_ransac_thresh_left
         else:
-            threshold_value = self.settings.gui_legacy_ransac_thresh_right
+            threshold_value = self.snapshot.gui_legacy_ransac_thresh_right
     else:
-        threshold_value = min_val + self.settings.gui_thresh_add
+        threshold_value = min_val + self.snapshot.gui_thresh_add
 
     _, thresh = cv2.threshold(frame_gray, threshold_value, 255, cv2.THRESH_BINARY)
     try:
@@ -387,7 +387,7 @@ def RANSAC3D(self, hsrac_en):
         # if abs(perscalarw-perscalarh) >= 0.2: # TODO setting
         #    blink = 0.0
 
-        if self.settings.gui_RANSACBLINK:
+        if self.snapshot.gui_RANSACBLINK:
 
             if self.ran_blink_check_for_file:
                 if self.eye_id in [EyeId.LEFT]:
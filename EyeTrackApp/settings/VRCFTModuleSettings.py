@@ -1,14 +1,13 @@
-from queue import Queue
-
 from config import EyeTrackConfig
 from eye import EyeId
+from osc.OSCMailbox import OSCMailbox
 from osc.OSCMessage import OSCMessage, OSCMessageType
 from settings.BaseSettings import BaseSettingsWidget
 from settings.modules.VRCFTSettingsModule import VRCFTSettingsModule
 
 
 class VRCFTSettingsWidget(BaseSettingsWidget):
-    def __init__(self, widget_id: EyeId, main_config: EyeTrackConfig, osc_queue_in: Queue[OSCMessage]):
+    def __init__(self, widget_id: EyeId, main_config: EyeTrackConfig, osc_queue_in: OSCMailbox):
         self.osc_queue = osc_queue_in
         settings_modules = [
             VRCFTSettingsModule,
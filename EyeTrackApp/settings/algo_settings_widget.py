@@ -32,6 +32,7 @@ from settings.modules.AdvancedTrackingAlgoSettingsModule import (
     AdvancedTrackingAlgoSettingsModule,
 )
 from settings.modules.BlinkAlgoModule import BlinkAlgoSettingsModule
+from settings.modules.InferenceSettingsModule import InferenceSettingsModule
 from settings.modules.TrackingAlgorithmModule import TrackingAlgorithmModule
 
 
@@ -41,5 +42,6 @@ class AlgoSettingsWidget(BaseSettingsWidget):
             TrackingAlgorithmModule,
             BlinkAlgoSettingsModule,
             AdvancedTrackingAlgoSettingsModule,
+            InferenceSettingsModule,
         ]
         super().__init__(widget_id, main_config, settings_modules)
@@ -1,10 +1,10 @@
-from pydantic import AfterValidator
+from pydantic import AfterValidator, PositiveInt
 from typing_extensions import Annotated
 
 from settings.modules.BaseModule import BaseSettingsModule, BaseValidationModel
 import PySimpleGUI as sg
 
-from settings.modules.CommonFieldValidators import check_is_float_convertible
+from settings.modules.CommonFieldValidators import try_convert_to_float
 
 
 class BlinkAlgoSettingsValidationModel(BaseValidationModel):
@@ -14,7 +14,10 @@ class BlinkAlgoSettingsValidationModel(BaseValidationModel):
     gui_LEAP_lid: bool
     ibo_filter_samples: int
     calibration_samples: int
-    ibo_fully_close_eye_threshold: Annotated[str, AfterValidator(check_is_float_convertible)]
+    ibo_fully_close_eye_threshold: Annotated[float, AfterValidator(try_convert_to_float)]
+    ibo_grid_cell_size: PositiveInt
+    ibo_interpolate_unseen: bool
+    ibo_window_radius_scale: Annotated[float, AfterValidator(try_convert_to_float)]
     gui_circular_crop_left: bool
     gui_circular_crop_right: bool
     leap_calibration_samples: int
@@ -32,6 +35,9 @@ class BlinkAlgoSettingsModule(BaseSettingsModule):
         self.ibo_filter_samples = f"-IBOFILTERSAMPLE{widget_id}-"
         self.calibration_samples = f"-CALIBRATIONSAMPLES{widget_id}-"
         self.ibo_fully_close_eye_threshold = f"-CLOSETHRESH{widget_id}-"
+        self.ibo_grid_cell_size = f"-IBOGRIDCELLSIZE{widget_id}-"
+        self.ibo_interpolate_unseen = f"-IBOINTERPOLATE{widget_id}-"
+        self.ibo_window_radius_scale = f"-IBOWINDOWSCALE{widget_id}-"
         self.gui_circular_crop_left = f"-CIRCLECROPLEFT{widget_id}-"
         self.gui_circular_crop_right = f"-CIRCLECROPRIGHT{widget_id}-"
         self.leap_calibration_samples = f"-LEAPCALIBRATION{widget_id}-"
@@ -93,6 +99,29 @@ class BlinkAlgoSettingsModule(BaseSettingsModule):
                     size=(0, 10),
                 ),
             ],
+            [
+                sg.Text("IBO Grid Cell Size", background_color="#424042"),
+                sg.InputText(
+                    self.config.ibo_grid_cell_size,
+                    key=self.ibo_grid_cell_size,
+                    size=(0, 10),
+                    tooltip="Pixels per side of one IBO calibration cell. Bigger cells calibrate faster but less precisely. Changing it restarts the calibration.",
+                ),
+                sg.Text("IBO Window Scale", background_color="#424042"),
+                sg.InputText(
+                    self.config.ibo_window_radius_scale,
+                    key=self.ibo_window_radius_scale,
+                    size=(0, 10),
+                    tooltip="Half size of the area IBO measures around the pupil, in pupil radii. 0 measures the whole ROI.",
+                ),
+                sg.Checkbox(
+                    "IBO Fill Unseen Cells From Neighbours",
+                    default=self.config.ibo_interpolate_unseen,
+                    key=self.ibo_interpolate_unseen,
+                    background_color="#424042",
+                    tooltip="Start a cell the pupil has not visited yet from the cells around it instead of from scratch.",
+                ),
+            ],
             [
                 sg.Checkbox(
                     "Left Eye Circle crop",
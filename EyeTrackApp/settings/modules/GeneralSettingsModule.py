@@ -12,6 +12,7 @@ class GeneralSettingsValidationModel(BaseValidationModel):
     gui_right_eye_dominant: bool
     gui_left_eye_dominant: bool
     gui_eye_dominant_diff_thresh: float
+    gui_saccade_velocity_thresh: float
 
 
 class GeneralSettingsModule(BaseSettingsModule):
@@ -23,6 +24,7 @@ class GeneralSettingsModule(BaseSettingsModule):
         self.gui_flip_y_axis = f"-FLIPYAXIS{widget_id}-"
         self.gui_outer_side_falloff = f"-EYEFALLOFF{widget_id}-"
         self.gui_eye_dominant_diff_thresh = f"-DIFFTHRESH{widget_id}-"
+        self.gui_saccade_velocity_thresh = f"-SACCADETHRESH{widget_id}-"
         self.gui_left_eye_dominant = f"-LEFTEYEDOMINANT{widget_id}-"
         self.gui_right_eye_dominant = f"-RIGHTEYEDOMINANT{widget_id}-"
         self.gui_update_check = f"-UPDATECHECK{widget_id}-"
@@ -86,6 +88,14 @@ class GeneralSettingsModule(BaseSettingsModule):
                     key=self.gui_eye_dominant_diff_thresh,
                     size=(0, 10),
                 ),
+                sg.Text("Saccade Velocity Threshold", background_color="#424042"),
+                sg.InputText(
+                    self.config.gui_saccade_velocity_thresh,
+                    key=self.gui_saccade_velocity_thresh,
+                    size=(0, 10),
+                    tooltip="Eye speed, in calibrated range per second, above which a movement counts as a saccade. "
+                    "When only one eye is in a saccade, outer side falloff follows the other one.",
+                ),
             ],
             [
                 sg.Checkbox(
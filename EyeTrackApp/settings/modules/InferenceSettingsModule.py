@@ -0,0 +1,108 @@
+from pydantic import NonNegativeInt, PositiveInt
+
+from settings.modules.BaseModule import BaseSettingsModule, BaseValidationModel
+import PySimpleGUI as sg
+
+
+class InferenceSettingsValidationModel(BaseValidationModel):
+    onnx_intra_op_threads: NonNegativeInt  # 0 lets onnxruntime pick
+    onnx_inter_op_threads: NonNegativeInt
+    onnx_parallel_execution: bool
+    onnx_enable_mem_pattern: bool
+    onnx_enable_cpu_mem_arena: bool
+    onnx_cache_optimized_models: bool
+    onnx_use_quantized_models: bool
+    onnx_leap_workers: PositiveInt
+    onnx_leap_max_result_age: NonNegativeInt
+
+
+class InferenceSettingsModule(BaseSettingsModule):
+    def __init__(self, config, widget_id, **kwargs):
+        super().__init__(config=config, widget_id=widget_id, **kwargs)
+        self.validation_model = InferenceSettingsValidationModel
+
+        self.onnx_intra_op_threads = f"-ONNXINTRAOPTHREADS{widget_id}-"
+        self.onnx_inter_op_threads = f"-ONNXINTEROPTHREADS{widget_id}-"
+        self.onnx_parallel_execution = f"-ONNXPARALLELEXECUTION{widget_id}-"
+        self.onnx_enable_mem_pattern = f"-ONNXMEMPATTERN{widget_id}-"
+        self.onnx_enable_cpu_mem_arena = f"-ONNXMEMARENA{widget_id}-"
+        self.onnx_cache_optimized_models = f"-ONNXMODELCACHE{widget_id}-"
+        self.onnx_use_quantized_models = f"-ONNXQUANTIZEDMODELS{widget_id}-"
+        self.onnx_leap_workers = f"-ONNXLEAPWORKERS{widget_id}-"
+        self.onnx_leap_max_result_age = f"-ONNXLEAPMAXRESULTAGE{widget_id}-"
+
+    def get_layout(self):
+        return [
+            [sg.Text("Neural Network (DADDY/LEAP) Runtime Settings:", background_color="#242224")],
+            [
+                sg.Text("Intra Op Threads", background_color="#424042"),
+                sg.InputText(
+                    self.config.onnx_intra_op_threads,
+                    key=self.onnx_intra_op_threads,
+                    size=(0, 10),
+                    tooltip="Threads used inside a single operator. More threads lower latency but raise CPU usage.",
+                ),
+                sg.Text("Inter Op Threads", background_color="#424042"),
+                sg.InputText(
+                    self.config.onnx_inter_op_threads,
+                    key=self.onnx_inter_op_threads,
+                    size=(0, 10),
+                    tooltip="Threads used to run independent operators at once, only used with parallel execution.",
+                ),
+            ],
+            [
+                sg.Checkbox(
+                    "Parallel Execution",
+                    default=self.config.onnx_parallel_execution,
+                    key=self.onnx_parallel_execution,
+                    background_color="#424042",
+                    tooltip="Run independent branches of the model in parallel instead of sequentially.",
+                ),
+                sg.Checkbox(
+                    "Memory Pattern",
+                    default=self.config.onnx_enable_mem_pattern,
+                    key=self.onnx_enable_mem_pattern,
+                    background_color="#424042",
+                    tooltip="Preplan memory allocations from the first inference.",
+                ),
+                sg.Checkbox(
+                    "CPU Memory Arena",
+                    default=self.config.onnx_enable_cpu_mem_arena,
+                    key=self.onnx_enable_cpu_mem_arena,
+                    background_color="#424042",
+                    tooltip="Reuse memory between inferences instead of allocating it every frame.",
+                ),
+                sg.Checkbox(
+                    "Cache Optimized Models",
+                    default=self.config.onnx_cache_optimized_models,
+                    key=self.onnx_cache_optimized_models,
+                    background_color="#424042",
+                    tooltip="Store the optimized model on disk so following starts skip graph optimization.",
+                ),
+            ],
+            [
+                sg.Checkbox(
+                    "Use Quantized (INT8) Models",
+                    default=self.config.onnx_use_quantized_models,
+                    key=self.onnx_use_quantized_models,
+                    background_color="#424042",
+                    tooltip="Run the INT8 variants of the LEAP and DADDY models. Faster on low-end CPUs, slightly less accurate.",
+                ),
+            ],
+            [
+                sg.Text("LEAP Workers", background_color="#424042"),
+                sg.InputText(
+                    self.config.onnx_leap_workers,
+                    key=self.onnx_leap_workers,
+                    size=(0, 10),
+                    tooltip="Frames LEAP can run at the same time. Only helps with a max result age above 0.",
+                ),
+                sg.Text("LEAP Max Result Age", background_color="#424042"),
+                sg.InputText(
+                    self.config.onnx_leap_max_result_age,
+                    key=self.onnx_leap_max_result_age,
+                    size=(0, 10),
+                    tooltip="How many frames the LEAP result may lag behind the image. 0 waits for every frame, higher values trade latency for throughput.",
+                ),
+            ],
+        ]
@@ -15,6 +15,10 @@ class OSCValidationModel(BaseValidationModel):
     gui_vrc_native: bool
     gui_osc_vrcft_v1: bool
     gui_osc_vrcft_v2: bool
+    gui_osc_bundle_native: bool
+    gui_osc_bundle_v1: bool
+    gui_osc_bundle_v2: bool
+    gui_osc_max_rate: int
     gui_use_module: bool
 
     @model_validator(mode="after")
@@ -43,6 +47,10 @@ class OSCSettingsModule(BaseSettingsModule):
         self.gui_vrc_native = f"-VRCNATIVE{widget_id}-"
         self.gui_osc_vrcft_v1 = f"-OSCVRCFTV1{widget_id}-"
         self.gui_osc_vrcft_v2 = f"-OSCVRCFTV2{widget_id}-"
+        self.gui_osc_bundle_native = f"-OSCBUNDLENATIVE{widget_id}-"
+        self.gui_osc_bundle_v1 = f"-OSCBUNDLEV1{widget_id}-"
+        self.gui_osc_bundle_v2 = f"-OSCBUNDLEV2{widget_id}-"
+        self.gui_osc_max_rate = f"-OSCMAXRATE{widget_id}-"
         self.gui_use_module = f"-OSCUSEMODULE{widget_id}-"
 
     def get_layout(self):
@@ -82,6 +90,29 @@ class OSCSettingsModule(BaseSettingsModule):
                     tooltip="Toggle VRCFT's v2 (UE) Eyetracking format.",
                 ),
             ],
+            [
+                sg.Checkbox(
+                    "Bundle VRC Native",
+                    default=self.config.gui_osc_bundle_native,
+                    key=self.gui_osc_bundle_native,
+                    background_color="#424042",
+                    tooltip="Send all VRC native parameters of an eye update in one OSC bundle.",
+                ),
+                sg.Checkbox(
+                    "Bundle VRCFT v1",
+                    default=self.config.gui_osc_bundle_v1,
+                    key=self.gui_osc_bundle_v1,
+                    background_color="#424042",
+                    tooltip="Send all VRCFT v1 parameters of an eye update in one OSC bundle.",
+                ),
+                sg.Checkbox(
+                    "Bundle VRCFT v2",
+                    default=self.config.gui_osc_bundle_v2,
+                    key=self.gui_osc_bundle_v2,
+                    background_color="#424042",
+                    tooltip="Send all VRCFT v2 parameters of an eye update in one OSC bundle.",
+                ),
+            ],
             [
                 sg.Text("Address:", background_color=BACKGROUND_COLOR),
                 sg.InputText(
@@ -97,6 +128,13 @@ class OSCSettingsModule(BaseSettingsModule):
                     size=(0, 10),
                     tooltip="OSC port we send data to.",
                 ),
+                sg.Text("Max Rate:", background_color=BACKGROUND_COLOR),
+                sg.InputText(
+                    self.config.gui_osc_max_rate,
+                    key=self.gui_osc_max_rate,
+                    size=(0, 10),
+                    tooltip="Most OSC updates per second, the latest values are sent. 0 sends every update.",
+                ),
             ],
             [
                 sg.Text("Receive functions", background_color=BACKGROUND_COLOR),
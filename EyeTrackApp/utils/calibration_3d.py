@@ -1,11 +1,21 @@
 # calibration_module.py
 import numpy as np
+from utils.vergence import convergence_point, vergence
+
+IPD = 0.058
+
+
 class CalibrationProcessor:
     def __init__(self):
         self.left_eye_data = None
         self.right_eye_data = None
         self.P_left = None
         self.P_right = None
+        self.gaze_map_left = None
+        self.gaze_map_right = None
+        self.left_point = None
+        self.right_point = None
+        self.vergence = None  # (depth, ray distance) of the last frame, None until calibrated
         self.gt_3d = np.array([
     (0.8, 0.8, 1), (0, 0.8, 1), (-0.8, 0.8, 1), (0.8, 0, 1), (0, 0, 1),
     (-0.8, 0, 1), (0.8, -0.8, 1), (0, -0.8, 1), (-0.8, -0.8, 1)
@@ -39,7 +49,7 @@ class CalibrationProcessor:
        # print('receive',len(self.left_eye_data), self.left_eye_data, self.right_eye_data, data, eye_id)
         # Check if both sets of data have been received
         if self.left_eye_data is not None and self.right_eye_data is not None:
-            if len(self.left_eye_data) == 8 and len(self.right_eye_data) == 8:
+            if len(self.left_eye_data) == len(self.gt_3d) and len(self.right_eye_data) == len(self.gt_3d):
                 self.process_calibration_data()
 
     def process_calibration_data(self):
@@ -60,6 +70,7 @@ class CalibrationProcessor:
         if len(self.right_eye_data) != len(self.gt_3d):
             raise ValueError(
                 f"Number of right eye points ({len(self.right_eye_data)}) does not match number of 3D points ({len(self.gt_3d)}).")
+        self.set_P()
 
 
 
@@ -67,48 +78,48 @@ class CalibrationProcessor:
        # self.left_eye_data = None
       #  self.right_eye_data = None
 
-    # Function to compute the 3D gaze direction from 2D points
-    def compute_gaze_direction(self, P, point_2d):
-        print(P, point_2d)
-        # Convert 2D point to homogeneous coordinates
-        point_2d_h = np.append(point_2d, 1)
-        # Solve for 3D direction (Ax = b, where A is the projection matrix and b is the 2D point)
-        direction, _, _, _ = np.linalg.lstsq(P[:, :-1], point_2d_h, rcond=None)
-        direction /= np.linalg.norm(direction)
+    # The calibration targets all sit on the z = 1 plane, so on that plane P is an affine map from target x, y to
+    # the 2D eye point. Its inverse turns eye points back into gaze directions without a solve per frame.
+    @staticmethod
+    def gaze_map(P):
+        return np.linalg.pinv(P[:2, :2]), P[2, :2] + P[3, :2]
+
+    # Function to compute the 3D gaze direction from 2D points, point_2d can be a (..., 2) batch
+    def compute_gaze_direction(self, P, point_2d, gaze_map=None):
+        inverse, offset = gaze_map if gaze_map is not None else self.gaze_map(P)
+        xy = (np.asarray(point_2d, dtype=np.float64)[..., :2] - offset) @ inverse
+        direction = np.concatenate((xy, np.ones(xy.shape[:-1] + (1,))), axis=-1)
+        direction /= np.linalg.norm(direction, axis=-1, keepdims=True)
         return direction
 
-
     # Compute the convergence point given 2D points for both eyes
     def compute_convergence_point(self, left_point_2d, right_point_2d, P_left, P_right, IPD):
-        left_eye_pos = np.array([-IPD / 2, 0, 0])
-        right_eye_pos = np.array([IPD / 2, 0, 0])
-
         gaze_left = self.compute_gaze_direction(P_left, left_point_2d)
         gaze_right = self.compute_gaze_direction(P_right, right_point_2d)
+        best_point, _ = convergence_point(gaze_left, gaze_right, IPD)
+        return best_point
 
-        # Parameterize the gaze directions as lines
-        def line_parametric_form(point, direction, t):
-            return point + t * direction
-
-        # Find the closest point between two lines
-        t_values = np.linspace(-10, 10, 1000)
-        min_distance = float('inf')
-        best_point = None
-
-        for t1 in t_values:
-            for t2 in t_values:
-                point1 = line_parametric_form(left_eye_pos, gaze_left, t1)
-                point2 = line_parametric_form(right_eye_pos, gaze_right, t2)
-                distance = np.linalg.norm(point1 - point2)
-                if distance < min_distance:
-                    min_distance = distance
-                    best_point = (point1 + point2) / 2
+    def compute_vergence(self, left_point_2d, right_point_2d, IPD=IPD):
+        """Vergence depth and ray distance for the eye points, batches of (..., 2) work too."""
+        gaze_left = self.compute_gaze_direction(self.P_left, left_point_2d, self.gaze_map_left)
+        gaze_right = self.compute_gaze_direction(self.P_right, right_point_2d, self.gaze_map_right)
+        return vergence(gaze_left, gaze_right, IPD)
 
-        return best_point
+    def update_point(self, eye_id, cx, cy):
+        if eye_id == 1:
+            self.left_point = (cx, cy)
+        elif eye_id == 0:
+            self.right_point = (cx, cy)
+        if self.gaze_map_left is None or self.left_point is None or self.right_point is None:
+            return self.vergence
+        self.vergence = self.compute_vergence(self.left_point, self.right_point)
+        return self.vergence
 
     def set_P(self):
         self.P_left = self.estimate_projection_matrix(self.left_eye_data, self.gt_3d)
         self.P_right = self.estimate_projection_matrix(self.right_eye_data, self.gt_3d)
+        self.gaze_map_left = self.gaze_map(self.P_left)
+        self.gaze_map_right = self.gaze_map(self.P_right)
 
 
 
@@ -119,12 +130,6 @@ def receive_calibration_data(data, eye_id):
     global calibration_processor
     calibration_processor.receive_calibration_data(eye_id, data)
 
-def converge_3d():
-    IPD = 0.058
-    left_point_2d = (120, 100)
-    right_point_2d = (118, 65)
-   # estimate_projection_matrix
-    calibration_processor.set_P()
-    convergence_point = calibration_processor.compute_convergence_point(left_point_2d, right_point_2d, calibration_processor.P_left, calibration_processor.P_right, IPD)
-
-    print(f"Convergence Point: {convergence_point}")
\ No newline at end of file
+def update_vergence(eye_id, cx, cy):
+    """Feed the latest eye point, returns (depth, ray distance) once both eyes are 3D calibrated."""
+    return calibration_processor.update_point(eye_id, cx, cy)
@@ -1,45 +1,58 @@
-import numpy as np
+import math
 
 from eye import EyeId
 
 
-def velocity_falloff(self, var, out_x, out_y):
+def velocity_falloff(self, binocular, out_x, out_y, avg_velocity, saccade=False):
 
     if (
-        self.settings.gui_right_eye_dominant
-        or self.settings.gui_left_eye_dominant
-        or self.settings.gui_outer_side_falloff
+        self.snapshot.gui_right_eye_dominant
+        or self.snapshot.gui_left_eye_dominant
+        or self.snapshot.gui_outer_side_falloff
     ):
-        # Calculate the distance between the two eyes
-        dist = np.sqrt(np.square(var.l_eye_x - var.r_eye_x) + np.square(var.left_y - var.right_y))
-        if self.eye_id == EyeId.LEFT:
-            var.l_eye_x = out_x
-            var.left_y = out_y
+        # both eye threads come through here, the read of the other eye and the write of this one go together
+        with binocular.lock:
+            # Calculate the distance between the two eyes
+            dist = math.hypot(binocular.l_eye_x - binocular.r_eye_x, binocular.left_y - binocular.right_y)
+            if self.eye_id == EyeId.LEFT:
+                binocular.l_eye_x = out_x
+                binocular.left_y = out_y
+                binocular.l_eye_velocity = avg_velocity
+                binocular.l_eye_saccade = saccade
+
+            if self.eye_id == EyeId.RIGHT:
+                binocular.r_eye_x = out_x
+                binocular.right_y = out_y
+                binocular.r_eye_velocity = avg_velocity
+                binocular.r_eye_saccade = saccade
+
+            # Check if the distance is greater than the threshold
+            if dist > self.snapshot.gui_eye_dominant_diff_thresh:
+
+                if self.snapshot.gui_right_eye_dominant:
+                    out_x, out_y = binocular.r_eye_x, binocular.right_y
+
+                elif self.snapshot.gui_left_eye_dominant:
+                    out_x, out_y = binocular.l_eye_x, binocular.left_y
+
+                elif binocular.l_eye_saccade != binocular.r_eye_saccade:
+                    # Real saccades move both eyes, one eye jumping on its own is a tracking error, follow the other
+                    if binocular.l_eye_saccade:
+                        out_x, out_y = binocular.r_eye_x, binocular.right_y
+                    else:
+                        out_x, out_y = binocular.l_eye_x, binocular.left_y
 
-        if self.eye_id == EyeId.RIGHT:
-            var.r_eye_x = out_x
-            var.right_y = out_y
-
-        # Check if the distance is greater than the threshold
-        if dist > self.settings.gui_eye_dominant_diff_thresh:
-
-            if self.settings.gui_right_eye_dominant:
-                out_x, out_y = var.r_eye_x, var.right_y
-
-            elif self.settings.gui_left_eye_dominant:
-                out_x, out_y = var.l_eye_x, var.left_y
-
-            else:
-                # If the distance is too large, identify the eye with the lower velocity
-                if var.l_eye_velocity < var.r_eye_velocity:
-                    # Mirror the position of the eye with lower velocity to the other eye
-                    out_x, out_y = var.r_eye_x, var.right_y
                 else:
-                    # Mirror the position of the eye with lower velocity to the other eye
-                    out_x, out_y = var.l_eye_x, var.left_y
-        else:
-            # If the distance is within the threshold, do not mirror the eyes
-            pass
+                    # If the distance is too large, identify the eye with the lower velocity
+                    if binocular.l_eye_velocity < binocular.r_eye_velocity:
+                        # Mirror the position of the eye with lower velocity to the other eye
+                        out_x, out_y = binocular.r_eye_x, binocular.right_y
+                    else:
+                        # Mirror the position of the eye with lower velocity to the other eye
+                        out_x, out_y = binocular.l_eye_x, binocular.left_y
+            else:
+                # If the distance is within the threshold, do not mirror the eyes
+                pass
     else:
         pass
     return out_x, out_y
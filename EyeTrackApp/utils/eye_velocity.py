@@ -0,0 +1,54 @@
+"""
+Eye velocity from the calibrated gaze position and the capture time of each frame.
+"""
+
+import math
+import time
+
+from utils.streaming_stats import RollingMean
+
+
+class VelocityEstimator:
+    """
+    Euclidean eye speed in position units per second between consecutive frames, and its mean over the last
+    `window` frames. Frames over `saccade_threshold` are classified as a saccade, which then lasts until the
+    speed drops under half of it again so noise around the threshold does not flicker between the two.
+    """
+
+    def __init__(self, window=15, saccade_threshold=2.0):
+        self.speeds = RollingMean(window)
+        self.saccade_threshold = saccade_threshold
+        self.reset()
+
+    def reset(self):
+        self.speeds.clear()
+        self.speed = 0.0
+        self.saccade = False
+        self.last_x = None
+        self.last_y = None
+        self.last_time = None
+
+    @property
+    def average(self):
+        return self.speeds.mean()
+
+    @property
+    def fixation(self):
+        return not self.saccade
+
+    def update(self, x, y, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        if self.last_time is not None:
+            dt = timestamp - self.last_time
+            if dt <= 0:
+                # the same frame again or a clock step back, nothing to measure
+                return self.speed
+            self.speed = math.hypot(x - self.last_x, y - self.last_y) / dt
+            self.speeds.append(self.speed)
+            threshold = self.saccade_threshold * 0.5 if self.saccade else self.saccade_threshold
+            self.saccade = self.speed > threshold
+        self.last_x = x
+        self.last_y = y
+        self.last_time = timestamp
+        return self.speed
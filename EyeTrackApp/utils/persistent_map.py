@@ -0,0 +1,145 @@
+"""
+uint32 maps (IBO, EBPD) kept in memory-mapped files.
+
+The file is a 16 byte header (magic, height, width) followed by the raw row-major little-endian uint32 map.
+The tracker writes into the mapping directly, so saving is only a flush, and that runs on a background
+thread. read_map_file and read_legacy_png read a map without mapping it, for carrying over the per-value
+maps of older versions, which were stored in this format or as 2x uint16 PNGs.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from queue import Queue
+
+import cv2
+import numpy as np
+
+MAGIC = b"ETVRMAP1"
+HEADER = struct.Struct("<8sII")
+
+
+def read_legacy_png(png_path):
+    img = cv2.imread(png_path, flags=cv2.IMREAD_UNCHANGED)
+    if img is None or img.ndim != 3:
+        raise ValueError(f"{png_path} is not a map image")
+    # low 16 bits in the first channel, high 16 bits in the second
+    return img[:, :, 0].astype(np.uint32) | (img[:, :, 1].astype(np.uint32) << np.uint32(16))
+
+
+def read_map_file(path):
+    """A copy of the map stored in a map file."""
+    with open(path, "rb") as f:
+        magic, height, width = HEADER.unpack(f.read(HEADER.size))
+        data = np.fromfile(f, dtype="<u4")
+    if magic != MAGIC or data.size != height * width:
+        raise ValueError(f"{path} is not a valid map file")
+    return data.astype(np.uint32).reshape(height, width)
+
+
+class _Flusher:
+    """One daemon thread flushing every map, started on first use."""
+
+    def __init__(self):
+        self.queue = Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def request(self, persistent_map):
+        with self.lock:
+            if persistent_map in self.pending:
+                return
+            self.pending.add(persistent_map)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="MapFlusher", daemon=True)
+                self.thread.start()
+        self.queue.put(persistent_map)
+
+    def _run(self):
+        while True:
+            persistent_map = self.queue.get()
+            with self.lock:
+                self.pending.discard(persistent_map)
+            persistent_map.flush()
+
+
+_flusher = _Flusher()
+
+
+class PersistentMap:
+    def __init__(self, path):
+        self.path = path
+        self.mm = None
+        self.lock = threading.Lock()
+
+    def open(self, shape):
+        """Map the stored data if it has `shape`. Returns None when there is nothing usable stored."""
+        if not os.path.isfile(self.path):
+            print("\033[94m[INFO] File does not exist.\033[0m")
+            return None
+
+        with open(self.path, "rb") as f:
+            magic, height, width = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or os.path.getsize(self.path) != HEADER.size + height * width * 4:
+            raise ValueError(f"{self.path} is not a valid map file")
+        if (height, width) != tuple(shape):
+            print("[WARN] Size does not match the input frame.")
+            return None
+        return self._map(shape)
+
+    def create(self, shape):
+        """Replace the stored map with a zeroed one of `shape`. Falls back to memory only if the file can't be written."""
+        self.close()
+        height, width = shape
+        try:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, height, width))
+                f.truncate(HEADER.size + height * width * 4)
+            return self._map(shape)
+        except OSError as e:
+            print(f"\033[93m[WARN] Could not create {self.path}, the map will not be saved: {e}\033[0m")
+            return np.zeros(shape, dtype=np.uint32)
+
+    def _map(self, shape):
+        with open(self.path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        with self.lock:
+            self.mm = mm
+        return np.frombuffer(mm, dtype="<u4", count=shape[0] * shape[1], offset=HEADER.size).reshape(shape)
+
+    def flush_async(self):
+        """Ask the background thread to write the map to disk, never blocks the caller."""
+        if self.mm is not None:
+            _flusher.request(self)
+
+    def flush(self):
+        with self.lock:
+            if self.mm is None:
+                return
+            try:
+                self.mm.flush()
+            except (OSError, ValueError) as e:
+                print(f"\033[93m[WARN] Could not save {self.path}: {e}\033[0m")
+
+    def close(self):
+        """Flush and unmap. Arrays returned by open/create must be dropped before, they point into the mapping."""
+        with self.lock:
+            if self.mm is None:
+                return
+            try:
+                self.mm.flush()
+                self.mm.close()
+            except BufferError:
+                # something still holds the array, the mapping goes away with it
+                pass
+            self.mm = None
+
+    def delete(self):
+        self.close()
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"\033[93m[WARN] Could not remove {self.path}: {e}\033[0m")
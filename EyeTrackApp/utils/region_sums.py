@@ -0,0 +1,18 @@
+"""
+Square windows around a point, clipped to the frame.
+
+IBO measures a single window per frame, summing the crop directly is cheaper than building an integral image
+(cv2.integral costs about as much as one frame.sum(), see Benchmark/bench_ibo_window.py).
+"""
+
+
+def window_bounds(shape, x, y, radius):
+    """The (x0, y0, x1, y1) square of half size `radius` around (x, y), clipped to a frame of `shape`."""
+    height, width = shape[:2]
+    x, y, radius = min(max(int(x), 0), width - 1), min(max(int(y), 0), height - 1), int(radius)
+    return max(x - radius, 0), max(y - radius, 0), min(x + radius + 1, width), min(y + radius + 1, height)
+
+
+def window_area(bounds):
+    x0, y0, x1, y1 = bounds
+    return (x1 - x0) * (y1 - y0)
@@ -0,0 +1,155 @@
+"""
+Windowed statistics that are updated one sample per frame.
+
+The trackers keep a few hundred of the last values around and ask for a percentile or a mean every frame.
+Doing that with list.pop(0) + np.percentile costs an O(n) shift and an O(n log n) sort per frame,
+these keep their state between frames so every update is cheap.
+"""
+
+import math
+from bisect import bisect_left, insort
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed size numpy buffer holding the last `capacity` samples."""
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = max(1, int(capacity))
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.index = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def full(self):
+        return self.size == self.capacity
+
+    def append(self, value):
+        """Add `value`, return the sample it pushed out or None while the buffer is still filling up."""
+        evicted = self.data[self.index] if self.full else None
+        self.data[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return evicted
+
+    def values(self):
+        """The samples in insertion order, oldest first."""
+        if not self.full:
+            return self.data[: self.size]
+        return np.roll(self.data, -self.index)
+
+    def mean(self):
+        return float(self.data[: self.size].mean())
+
+    def percentile(self, q):
+        return np.percentile(self.data[: self.size], q)
+
+    def clear(self):
+        self.index = 0
+        self.size = 0
+
+
+class RollingMean:
+    """Mean over the last `window` samples with a running sum."""
+
+    def __init__(self, window):
+        self.buffer = RingBuffer(window)
+        self.total = 0.0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @property
+    def full(self):
+        return self.buffer.full
+
+    @property
+    def window(self):
+        return self.buffer.capacity
+
+    def append(self, value):
+        evicted = self.buffer.append(value)
+        self.total += value - (evicted if evicted is not None else 0.0)
+        self.updates += 1
+        if self.updates >= self.buffer.capacity:
+            # resum now and then, so float error can't pile up over hours of tracking
+            self.total = float(self.buffer.data[: self.buffer.size].sum())
+            self.updates = 0
+
+    def mean(self):
+        return self.total / len(self.buffer) if len(self.buffer) else 0.0
+
+    def resize(self, window):
+        """Change the window, dropping the oldest samples if it shrinks."""
+        window = max(1, int(window))
+        if window == self.buffer.capacity:
+            return
+        values = self.buffer.values()[-window:]
+        self.buffer = RingBuffer(window)
+        self.clear()
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self.buffer.clear()
+        self.total = 0.0
+        self.updates = 0
+
+
+class RollingQuantile:
+    """
+    Exact percentiles over the last `window` samples.
+
+    The window is kept sorted, so an update is a binary search plus a memmove and any percentile
+    is a lookup. Results match np.percentile with its default linear interpolation.
+    """
+
+    def __init__(self, window):
+        self.buffer = RingBuffer(window)
+        self.sorted = []
+
+    def __len__(self):
+        return len(self.sorted)
+
+    @property
+    def full(self):
+        return self.buffer.full
+
+    @property
+    def window(self):
+        return self.buffer.capacity
+
+    def append(self, value):
+        value = float(value)
+        evicted = self.buffer.append(value)
+        if evicted is not None:
+            del self.sorted[bisect_left(self.sorted, evicted)]
+        insort(self.sorted, value)
+
+    def percentile(self, q):
+        if not self.sorted:
+            raise ValueError("percentile of an empty window")
+        position = (len(self.sorted) - 1) * q / 100
+        lower = math.floor(position)
+        upper = min(lower + 1, len(self.sorted) - 1)
+        return self.sorted[lower] + (self.sorted[upper] - self.sorted[lower]) * (position - lower)
+
+    def resize(self, window):
+        """Change the window, dropping the oldest samples if it shrinks."""
+        window = max(1, int(window))
+        if window == self.buffer.capacity:
+            return
+        values = self.buffer.values()[-window:]
+        self.clear()
+        self.buffer = RingBuffer(window)
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self.buffer.clear()
+        self.sorted.clear()
@@ -0,0 +1,69 @@
+"""
+Binocular vergence from the two gaze rays.
+
+The gaze rays of the two eyes hardly ever intersect exactly, so the convergence point is taken as the midpoint
+of the shortest segment between them. That segment has a closed form, everything here works on arrays of
+shape (..., 3) so a whole batch of samples costs the same handful of numpy calls as a single one.
+"""
+
+import numpy as np
+
+# below this the rays are treated as parallel, relative to the product of the squared direction lengths
+PARALLEL_EPS = 1e-12
+
+
+def _dot(a, b):
+    return (a * b).sum(axis=-1)
+
+
+def closest_points(origin_a, dir_a, origin_b, dir_b):
+    """
+    Parameters t_a, t_b of the closest points origin + t * dir on the two lines, and the points themselves.
+    Parallel lines have no single closest pair, for those t_a is 0 and t_b the projection of origin_a.
+    """
+    origin_a, dir_a = np.asarray(origin_a, dtype=np.float64), np.asarray(dir_a, dtype=np.float64)
+    origin_b, dir_b = np.asarray(origin_b, dtype=np.float64), np.asarray(dir_b, dtype=np.float64)
+    w = origin_a - origin_b
+    a = _dot(dir_a, dir_a)
+    b = _dot(dir_a, dir_b)
+    c = _dot(dir_b, dir_b)
+    d = _dot(dir_a, w)
+    e = _dot(dir_b, w)
+
+    denom = a * c - b * b
+    parallel = denom <= PARALLEL_EPS * a * c
+    denom = np.where(parallel, 1.0, denom)
+    t_a = np.where(parallel, 0.0, (b * e - c * d) / denom)
+    t_b = np.where(parallel, e / c, (a * e - b * d) / denom)
+
+    point_a = origin_a + t_a[..., None] * dir_a
+    point_b = origin_b + t_b[..., None] * dir_b
+    return t_a, t_b, point_a, point_b
+
+
+def eye_positions(ipd):
+    """Left and right eye centres, ipd apart on the x axis around the origin."""
+    return np.array([-ipd / 2, 0.0, 0.0]), np.array([ipd / 2, 0.0, 0.0])
+
+
+def convergence_point(left_dir, right_dir, ipd):
+    """Midpoint between the two gaze rays and their distance at that point."""
+    left_eye, right_eye = eye_positions(ipd)
+    _, _, point_left, point_right = closest_points(left_eye, left_dir, right_eye, right_dir)
+    return (point_left + point_right) / 2, np.linalg.norm(point_left - point_right, axis=-1)
+
+
+def vergence(left_dir, right_dir, ipd):
+    """
+    Vergence depth, the distance from between the eyes to the convergence point, and the distance between the
+    rays there as a quality measure: the further apart the rays pass, the less the depth can be trusted.
+    Parallel or diverging rays, and rays that only meet behind the eyes, are looking at infinity.
+    """
+    left_eye, right_eye = eye_positions(ipd)
+    t_left, t_right, point_left, point_right = closest_points(left_eye, left_dir, right_eye, right_dir)
+    depth = np.linalg.norm((point_left + point_right) / 2, axis=-1)
+    depth = np.where((t_left > 0) & (t_right > 0), depth, np.inf)
+    ray_distance = np.linalg.norm(point_left - point_right, axis=-1)
+    if depth.ndim == 0:
+        return float(depth), float(ray_distance)
+    return depth, ray_distance
@@ -1,4 +1,14 @@
 import dataclasses
+from typing import Optional
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+
+from config import SettingsPublisher
+from eye import EyeId
+from osc.OSCEncoder import OSCEncoder, OSCEncodingClient
+from osc.OutputSinks import OSCSink
+from osc.VRChatOSCSender import VRChatOSCSender
 
 
 @dataclasses.dataclass
@@ -8,6 +18,7 @@ class EyeInfoMock:
     blink: float
     pupil_dilation: float
     avg_velocity: float
+    timestamp: Optional[float] = None
 
 
 class SimpleUDPClientMock:
@@ -18,3 +29,46 @@ class SimpleUDPClientMock:
 
     def send_message(self, address, value):
         self.messages.append((address, value))
+
+
+class DatagramClientMock:
+    """Stands in for the DatagramClient of the OSC sender, keeps what was sent as (address, value) pairs."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, content):
+        dgram = bytes(content.dgram)
+        for message in OscBundle(dgram) if OscBundle.dgram_is_bundle(dgram) else [OscMessage(dgram)]:
+            params = message.params
+            self.messages.append((message.address, params[0] if len(params) == 1 else params))
+
+    def close(self):
+        pass
+
+
+def osc_output(main_config, updates):
+    """What the OSC sink of the sender sends for (eye id, eye info) updates, in order."""
+    client = DatagramClientMock()
+    sink = OSCSink(
+        VRChatOSCSender(),
+        OSCEncodingClient(client, OSCEncoder()),
+        main_config,
+        SettingsPublisher(main_config.settings),
+    )
+    for eye_id, eye_info in updates:
+        sink.write(eye_id, eye_info)
+    return client.messages
+
+
+def stereo_updates(blink):
+    """
+    Two stereo frames, right eye first. The first right eye goes out on its own, nothing of the left eye has been
+    seen yet, and still pairs with its left eye, so combined values go out for that single eye and once per frame.
+    """
+    return [
+        (EyeId.RIGHT, EyeInfoMock(x=0.25, y=0.5, blink=blink, pupil_dilation=0.5, avg_velocity=0, timestamp=1.0)),
+        (EyeId.LEFT, EyeInfoMock(x=-0.25, y=0.25, blink=blink, pupil_dilation=0.25, avg_velocity=0, timestamp=1.0)),
+        (EyeId.RIGHT, EyeInfoMock(x=0.5, y=0.5, blink=blink, pupil_dilation=0.5, avg_velocity=0, timestamp=1.02)),
+        (EyeId.LEFT, EyeInfoMock(x=-0.5, y=0.25, blink=blink, pupil_dilation=0.75, avg_velocity=0, timestamp=1.02)),
+    ]
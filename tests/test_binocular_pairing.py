@@ -0,0 +1,85 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from eye import EyeId
+from osc.BinocularPairing import BinocularPairing
+from osc.OSCMessage import OSCMessage, OSCMessageType
+from osc.VRChatOSCSender import VRChatOSCSender
+from tests import SimpleUDPClientMock
+
+
+def info(timestamp, x=0.0):
+    return SimpleNamespace(x=x, y=0.0, blink=0.8, pupil_dilation=0.5, avg_velocity=0.0, timestamp=timestamp)
+
+
+def running(pairing, now=0.0):
+    """Both eyes were just seen, otherwise the first frame of an eye goes out on its own."""
+    pairing.last_seen = {EyeId.LEFT: now, EyeId.RIGHT: now}
+    return pairing
+
+
+def test_pairs_once_per_stereo_frame():
+    pairing = running(BinocularPairing(tolerance=0.004, timeout=0.1))
+    updates = []
+    for frame in range(10):
+        t = frame / 60
+        # the right camera runs 3 ms behind, arrival order alternates
+        frames = [(EyeId.LEFT, t), (EyeId.RIGHT, t + 0.003)]
+        first, second = frames if frame % 2 else frames[::-1]
+        updates += pairing.add(first[0], info(first[1]), now=t)
+        updates += pairing.add(second[0], info(second[1]), now=t + 0.001)
+    assert len(updates) == 10
+    assert all(u.left is not None and u.right is not None for u in updates)
+    assert all(u.skew == pytest.approx(0.003) for u in updates)
+    assert pairing.mean_skew == pytest.approx(0.003)
+    assert pairing.unpaired == 0
+
+
+def test_stale_frames_are_not_paired():
+    pairing = running(BinocularPairing(tolerance=0.004, timeout=0.1), now=1.0)
+    assert pairing.add(EyeId.LEFT, info(1.000), now=1.0) == []
+    assert pairing.add(EyeId.RIGHT, info(0.990), now=1.0) == []  # too old for the left frame
+    assert pairing.add(EyeId.LEFT, info(1.016), now=1.01) == []  # replaces the waiting left frame
+    (update,) = pairing.add(EyeId.RIGHT, info(1.017), now=1.02)
+    assert update.left.timestamp == 1.016 and update.right.timestamp == 1.017
+    assert pairing.unpaired == 2
+
+
+def test_missing_eye_times_out():
+    pairing = BinocularPairing(tolerance=0.004, timeout=0.1)
+    pairing.add(EyeId.RIGHT, info(0.0), now=0.0)
+    assert pairing.add(EyeId.LEFT, info(0.05), now=0.05) == []
+    (update,) = pairing.add(EyeId.LEFT, info(0.2), now=0.2)
+    assert update.left.timestamp == 0.2 and update.right is None
+    assert pairing.singles == 2
+
+
+def test_combined_values_sent_once_per_pair(main_config_v2_params):
+    main_config_v2_params.eye_display_id = EyeId.BOTH
+    sender, client = VRChatOSCSender(), SimpleUDPClientMock("127.0.0.1", 9000)
+    running(sender.pairing, now=time.time())
+    for eye_id, t in [(EyeId.RIGHT, 10.001), (EyeId.LEFT, 10.0), (EyeId.RIGHT, 10.018), (EyeId.LEFT, 10.017)]:
+        sender.output_osc_info(
+            OSCMessage(type=OSCMessageType.EYE_INFO, data=(eye_id, info(t))),
+            client=client,
+            main_config=main_config_v2_params,
+            config=main_config_v2_params.settings,
+        )
+    assert [address for address, _ in client.messages].count("/avatar/parameters/v2/PupilDilation") == 2
+
+
+def test_cold_start_pairs_the_frames_captured_together():
+    pairing = BinocularPairing()
+    updates = []
+    for frame in range(5):
+        t = frame / 120
+        updates += pairing.add(EyeId.RIGHT, info(t), now=t)
+        updates += pairing.add(EyeId.LEFT, info(t), now=t + 0.001)
+    # the very first right frame goes out on its own, then waits for its left frame
+    assert updates[0].right.timestamp == 0.0 and updates[0].left is None
+    pairs = updates[1:]
+    assert [(u.left.timestamp, u.right.timestamp) for u in pairs] == [(frame / 120,) * 2 for frame in range(5)]
+    assert pairing.mean_skew == pairing.max_skew == 0
+    assert (pairing.pairs, pairing.singles, pairing.unpaired) == (5, 1, 0)
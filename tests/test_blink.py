@@ -0,0 +1,87 @@
+import numpy as np
+
+from blink import OpennessBlinkDetector
+
+
+class LegacyBlink:
+    """BLINK as it ran on EyeProcessor before OpennessBlinkDetector, the reference for the decisions."""
+
+    def __init__(self):
+        self.filterlist = []
+        self.max_ints = []
+        self.max_int = 0
+        self.min_int = 4000000000000
+        self.frames = 0
+
+    def __call__(self, frame, calibration_frame_counter, blink_clear):
+        if blink_clear == True:
+            self.max_ints = []
+            self.max_int = 0
+            self.frames = 0
+
+        intensity = np.sum(frame)
+
+        if calibration_frame_counter == 300:
+            self.filterlist = []  # clear filter
+        if len(self.filterlist) < 300:
+            self.filterlist.append(intensity)
+        else:
+            self.filterlist.pop(0)
+            self.filterlist.append(intensity)
+        if (
+            intensity >= np.percentile(self.filterlist, 99)
+            or intensity <= np.percentile(self.filterlist, 1)
+            and len(self.max_ints) >= 1
+        ):  # filter abnormally high values
+            try:
+                intensity = min(self.max_ints)
+            except:
+                pass
+
+        self.frames = self.frames + 1
+        if intensity > self.max_int:
+            self.max_int = intensity
+            if self.frames > 300:
+                self.max_ints.append(self.max_int)
+        if intensity < self.min_int:
+            self.min_int = intensity
+
+        if len(self.max_ints) > 1:
+            if intensity > min(self.max_ints):
+                blinkvalue = 0.0
+            else:
+                blinkvalue = 0.8
+        try:
+            return blinkvalue
+        except:
+            return 0.8
+
+
+def recorded_sequence(frame_num=2500, seed=0):
+    """Eye frames with a slow lighting drift and blinks, the eye getting brighter while the lid is down."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(40, 200, (60, 80)).astype(np.float64)
+    blink_starts = set(rng.choice(np.arange(100, frame_num), frame_num // 40, replace=False).tolist())
+    frames, blink = [], 0
+    for i in range(frame_num):
+        if i in blink_starts:
+            blink = int(rng.integers(3, 8))
+        lid = 25.0 if blink else 0.0
+        blink = max(blink - 1, 0)
+        frame = base + 10 * np.sin(i / 300) + lid + rng.normal(0, 3, base.shape)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def test_same_blink_decisions_as_legacy():
+    legacy, detector = LegacyBlink(), OpennessBlinkDetector()
+    decisions = []
+    for i, frame in enumerate(recorded_sequence()):
+        # a recalibration half way through: blink state cleared, then the filter 300 frames before it ends
+        clear = i == 1200
+        counter = 300 if i == 1500 else None
+        expected = legacy(frame, counter, clear)
+        assert detector.run(frame, counter, clear) == expected, f"frame {i}"
+        decisions.append(expected)
+    # the sequence has to exercise both outcomes for the comparison to mean anything
+    assert 0.0 in decisions and 0.8 in decisions
@@ -0,0 +1,138 @@
+import os
+
+import cv2
+import numpy as np
+
+from calibration_map import INTENSITY, PUPIL_AREA, EyeCalibration, PositionMap
+from eye import EyeId
+from utils.persistent_map import PersistentMap
+
+
+def make_map(tmp_path, cell_size=4):
+    return PositionMap(PersistentMap(str(tmp_path / "IBO_LEFT.map")), cell_size)
+
+
+def test_cells_are_quantized_and_clamped(tmp_path):
+    position_map = make_map(tmp_path)
+    position_map.reset((30, 41))
+    assert position_map.grid.shape == (8, 11, 1)
+    assert position_map.cell(0, 0) == position_map.cell(3, 3) == (0, 0)
+    assert position_map.cell(40, 29) == (7, 10)
+    assert position_map.cell(1000, 1000) == (7, 10)
+
+
+def test_population_tracks_seen_cells(tmp_path):
+    position_map = make_map(tmp_path)
+    position_map.reset((30, 40))
+    position_map.set((1, 1), 100)
+    position_map.set((1, 1), 90)
+    position_map.set((2, 2), 50)
+    assert position_map.population == [2]
+    position_map.set((2, 2), 0)
+    assert position_map.population == [1]
+
+
+def test_neighbour_mean_skips_unseen_cells(tmp_path):
+    position_map = make_map(tmp_path)
+    position_map.reset((30, 40))
+    assert position_map.neighbour_mean((3, 3)) == 0
+    position_map.set((2, 2), 100)
+    position_map.set((4, 4), 200)
+    position_map.set((3, 3), 1000)
+    assert position_map.neighbour_mean((3, 3)) == 150
+
+
+def test_reopen_keeps_values_and_meta(tmp_path):
+    position_map = make_map(tmp_path)
+    position_map.reset((30, 40))
+    position_map.set((5, 6), 1234)
+    position_map.meta[:, 0] = [99, 0, 10, 20]
+    position_map.save()
+    position_map.store.close()
+    position_map.data = None
+
+    reopened = make_map(tmp_path)
+    assert reopened.open((30, 40))
+    assert reopened.get((5, 6)) == 1234
+    assert reopened.population == [1]
+    np.testing.assert_array_equal(reopened.meta[:, 0], [99, 0, 10, 20])
+    # a different cell size does not fit the stored grid
+    assert not make_map(tmp_path, cell_size=8).open((30, 40))
+
+
+def test_channels_share_cells(tmp_path):
+    position_map = PositionMap(PersistentMap(str(tmp_path / "CALIBRATION_LEFT.map")), 4, channels=2)
+    position_map.reset((30, 40))
+    position_map.set((1, 2), 100, INTENSITY)
+    position_map.set((1, 2), 7, PUPIL_AREA)
+    np.testing.assert_array_equal(position_map.data[1, 2], [100, 7])
+    assert position_map.population == [1, 1]
+    position_map.clear(INTENSITY)
+    assert position_map.population == [0, 1]
+    assert position_map.get((1, 2), PUPIL_AREA) == 7
+
+
+def test_clearing_one_channel_keeps_the_other(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calibration = EyeCalibration(EyeId.LEFT, cell_size=4)
+    intensity, pupil_area = calibration.channel(INTENSITY), calibration.channel(PUPIL_AREA)
+    for i in range(50):
+        intensity.update(20, 10, (30, 40), 1000 + i % 5 * 10, 400, 0, 4)
+        pupil_area.update(20, 10, (30, 40), 300 - i % 7, 400, 0, 4)
+    calibration.save()
+    assert calibration.map.population == [1, 1]
+
+    intensity.clear()
+    assert calibration.map.population == [0, 1]
+    assert intensity.maxval == 0
+    assert pupil_area.maxval > 0
+
+
+def write_legacy_png(path, data):
+    # 2x uint16 per value, the way older versions stored their maps
+    img = np.zeros((*data.shape, 3), dtype=np.uint16)
+    img[:, :, 0] = data & 0xFFFF
+    img[:, :, 1] = data >> 16
+    cv2.imwrite(str(path), img)
+
+
+def test_legacy_maps_are_migrated_into_their_channels(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # a per-pixel IBO png of a (30, 40) frame
+    ibo = np.zeros((30, 41), dtype=np.uint32)
+    ibo[5, 6], ibo[6, 7], ibo[20, 30] = 900, 700, 80000
+    ibo[:4, -1] = [1500, 0, 10, 20]
+    write_legacy_png(tmp_path / "IBO_LEFT.png", ibo)
+    # a pupil area map on a 2 px grid
+    ebpd = PositionMap(PersistentMap("EBPD_LEFT.map"), 2)
+    ebpd.reset((30, 40))
+    ebpd.set((2, 3), 40)
+    ebpd.set((3, 3), 30)
+    ebpd.meta[:, 0] = [400, 0, 10, 20]
+    ebpd.save()
+    ebpd.store.close()
+
+    calibration = EyeCalibration(EyeId.LEFT, cell_size=4)
+    calibration.change_roi({"rotation": 0, "x": 10, "y": 20})
+    calibration.check((30, 40), 4)
+    position_map = calibration.map
+    assert position_map.get(position_map.cell(6, 5), INTENSITY) == 700
+    assert position_map.get(position_map.cell(30, 20), INTENSITY) == 80000
+    assert position_map.get(position_map.cell(6, 4), PUPIL_AREA) == 30
+    assert position_map.population == [2, 1]
+    assert calibration.channel(INTENSITY).maxval == 1500
+    assert calibration.channel(PUPIL_AREA).maxval == 400
+    assert sorted(os.listdir(tmp_path)) == ["CALIBRATION_LEFT.map"]
+
+
+def test_legacy_maps_of_another_roi_are_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ibo = np.zeros((30, 41), dtype=np.uint32)
+    ibo[5, 6] = 900
+    ibo[:4, -1] = [1500, 0, 10, 20]
+    write_legacy_png(tmp_path / "IBO_LEFT.png", ibo)
+
+    calibration = EyeCalibration(EyeId.LEFT, cell_size=4)
+    calibration.check((30, 40), 4)
+    assert calibration.map.population == [0, 0]
+    assert (tmp_path / "IBO_LEFT.png").exists()
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import pytest
+
+from config import ConfigWriter, EyeTrackConfig
+
+
+@pytest.fixture()
+def writer(tmp_path):
+    writer = ConfigWriter(str(tmp_path / "settings.json"), str(tmp_path / "settings.backup"), debounce=0.05)
+    yield writer
+    writer.stop()
+
+
+def read(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def wait_for_writes(writer, writes, timeout=2.0):
+    end = time.monotonic() + timeout
+    while writer.writes < writes and time.monotonic() < end:
+        time.sleep(0.01)
+    return writer.writes
+
+
+def test_saves_in_the_window_are_one_write(writer, tmp_path):
+    config = EyeTrackConfig()
+    for port in range(9000, 9020):
+        config.settings.gui_osc_port = port
+        writer.request(config)
+    # nothing is written on the requesting thread
+    assert not (tmp_path / "settings.json").exists()
+
+    assert wait_for_writes(writer, 1) == 1
+    time.sleep(0.1)
+    assert writer.writes == 1
+    assert writer.requests == 20
+    assert read(writer.path)["settings"]["gui_osc_port"] == 9019
+    assert not (tmp_path / "settings.json.tmp").exists()
+
+
+def test_backup_is_the_previous_write(writer):
+    config = EyeTrackConfig()
+    writer.request(config)
+    writer.flush()
+    assert writer.writes == 1
+
+    config.settings.gui_osc_port = 1234
+    writer.request(config)
+    writer.flush()
+    assert read(writer.backup_path)["settings"]["gui_osc_port"] == EyeTrackConfig().settings.gui_osc_port
+    assert read(writer.path)["settings"]["gui_osc_port"] == 1234
+
+    # unchanged config, no write
+    writer.request(config)
+    writer.flush()
+    assert writer.writes == 2
+
+
+def test_stop_writes_what_is_pending(tmp_path):
+    writer = ConfigWriter(str(tmp_path / "settings.json"), str(tmp_path / "settings.backup"), debounce=10)
+    config = EyeTrackConfig()
+    config.settings.gui_osc_port = 4321
+    writer.request(config)
+    start = time.monotonic()
+    writer.stop()
+    assert time.monotonic() - start < 1
+    assert read(writer.path)["settings"]["gui_osc_port"] == 4321
+
+
+def test_failed_write_is_retried_with_the_next_save(writer, monkeypatch):
+    replace = os.replace
+
+    def denied(src, dst):
+        raise PermissionError(13, "Permission denied", dst)
+
+    monkeypatch.setattr(os, "replace", denied)
+    config = EyeTrackConfig()
+    config.settings.gui_osc_port = 1111
+    writer.request(config)
+    time.sleep(0.2)
+    assert writer.writes == 0
+    assert writer.thread.is_alive()
+    assert writer.config is config
+
+    monkeypatch.setattr(os, "replace", replace)
+    config.settings.gui_osc_port = 2222
+    writer.request(config)
+    assert wait_for_writes(writer, 1) == 1
+    assert read(writer.path)["settings"]["gui_osc_port"] == 2222
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.eye_velocity import VelocityEstimator
+
+
+def test_speed_follows_capture_timestamps():
+    rng = np.random.default_rng(0)
+    times = 1000 + np.cumsum(rng.uniform(0.005, 0.012, 200))
+    estimator = VelocityEstimator()
+    # 0.3 units per second along x and 0.4 along y, 0.5 in total whatever the frame timing
+    for t in times:
+        estimator.update(0.3 * (t - times[0]), 0.4 * (t - times[0]), t)
+    assert estimator.speed == pytest.approx(0.5)
+    assert estimator.average == pytest.approx(0.5)
+
+
+def test_speed_does_not_decay_with_uptime():
+    early, late = VelocityEstimator(), VelocityEstimator()
+    for i in range(30):
+        early.update(i * 0.01, 0.0, 10 + i / 100)
+        late.update(i * 0.01, 0.0, 10_000 + i / 100)
+    assert early.average == pytest.approx(late.average) == pytest.approx(1.0)
+
+
+def test_repeated_timestamp_is_ignored():
+    estimator = VelocityEstimator()
+    estimator.update(0.0, 0.0, 1.0)
+    estimator.update(0.1, 0.0, 1.1)
+    assert estimator.update(0.5, 0.5, 1.1) == pytest.approx(1.0)
+    assert len(estimator.speeds) == 1
+
+
+def test_saccade_classification_has_hysteresis():
+    estimator = VelocityEstimator(saccade_threshold=2.0)
+    states = []
+    x, t = 0.0, 0.0
+    for speed in [0.1, 0.1, 3.0, 1.5, 1.2, 0.5, 1.5]:
+        x += speed * 0.01
+        t += 0.01
+        estimator.update(x, 0.0, t)
+        states.append(estimator.saccade)
+    # the first update only sets the starting point
+    assert states == [False, False, True, True, True, False, False]
+    assert estimator.fixation
+
+
+def test_window_limits_the_average():
+    estimator = VelocityEstimator(window=3)
+    for i, x in enumerate([0.0, 0.1, 0.2, 0.3, 0.3, 0.3, 0.3]):
+        estimator.update(x, 0.0, i * 0.1)
+    assert estimator.average == pytest.approx(0.0)
+    estimator.reset()
+    assert estimator.average == 0.0 and estimator.last_time is None
+    assert math.isclose(estimator.update(1.0, 1.0, 5.0), 0.0)
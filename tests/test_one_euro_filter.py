@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import one_euro_filter
+from one_euro_filter import OneEuroFilter, OneEuroFilterBank, ScalarOneEuroFilter
+
+
+@pytest.fixture()
+def signal():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(0, 0.05, (500, 4)), axis=0)
+    # camera timing jitter and one repeated timestamp
+    times = np.cumsum(rng.uniform(0.005, 0.012, 501))
+    times[200] = times[199]
+    return values, times
+
+
+def reference(values, times, monkeypatch, **params):
+    clock = iter(times)
+    monkeypatch.setattr(one_euro_filter, "time", lambda: next(clock))
+    f = OneEuroFilter(values[0].copy(), **params)
+    return np.array([f(x.copy()) for x in values])
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        dict(min_cutoff=0.0004, beta=0.9),
+        dict(min_cutoff=0.00001, beta=0.05, d_cutoff=2.0),
+        dict(min_cutoff=np.array([0.0004, 0.0004, 0.01, 1.0]), beta=0.9, d_cutoff=np.array([1.0, 1.0, 2.0, 0.5])),
+    ],
+)
+def test_bank_and_scalar_match_reference(signal, monkeypatch, params):
+    values, times = signal
+    expected = reference(values, times, monkeypatch, **params)
+
+    bank = OneEuroFilterBank(values[0], t0=times[0], **params)
+    out = np.empty(4)
+    bank_result = np.array([bank(x, t, out).copy() for x, t in zip(values, times[1:])])
+    np.testing.assert_allclose(bank_result, expected, rtol=1e-9, atol=1e-12)
+
+    scalar = ScalarOneEuroFilter(values[0], t0=times[0], **params)
+    scalar_result = np.array([scalar(x.tolist(), t) for x, t in zip(values, times[1:])])
+    np.testing.assert_allclose(scalar_result, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_bank_keeps_the_input_shape():
+    bank = OneEuroFilterBank(np.zeros((11, 2)), min_cutoff=0.0004, beta=0.9, t0=0.0)
+    result = bank(np.ones((11, 2)), 0.01)
+    assert result.shape == (11, 2)
+    # the result is not the filter state
+    result[:] = 5
+    assert np.all(bank.x_prev < 1)
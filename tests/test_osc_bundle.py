@@ -0,0 +1,79 @@
+import socket
+
+import pytest
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage
+
+from eye import EyeId
+from osc.osc import OSCManager, OSCMessage
+from osc.OSCMailbox import OSCMailbox
+from osc.OSCMessage import OSCMessageType
+from tests import EyeInfoMock
+
+UPDATES = [
+    (EyeId.RIGHT, EyeInfoMock(x=0.1, y=0.2, blink=1.0, pupil_dilation=0.5, avg_velocity=0.0)),
+    (EyeId.LEFT, EyeInfoMock(x=-0.3, y=0.25, blink=0.5, pupil_dilation=0.25, avg_velocity=0.0)),
+    (EyeId.RIGHT, EyeInfoMock(x=0.15, y=0.2, blink=0.0, pupil_dilation=0.5, avg_velocity=0.0)),
+    (EyeId.LEFT, EyeInfoMock(x=-0.25, y=0.3, blink=0.75, pupil_dilation=0.5, avg_velocity=0.0)),
+]
+
+
+@pytest.fixture()
+def sink():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(0.2)
+    yield sock
+    sock.close()
+
+
+def receive(sock):
+    datagrams = []
+    while True:
+        try:
+            datagrams.append(sock.recv(65536))
+        except socket.timeout:
+            return datagrams
+
+
+def run_updates(main_config, sock):
+    main_config.settings.gui_osc_address = "127.0.0.1"
+    main_config.settings.gui_osc_port = sock.getsockname()[1]
+    main_config.eye_display_id = EyeId.BOTH
+    mailbox = OSCMailbox()
+    manager = OSCManager(config=main_config, osc_message_in_queue=mailbox)
+    manager.setup_sender()
+    try:
+        datagrams = []
+        for update in UPDATES:
+            # one update at a time, the mailbox only keeps the latest per eye
+            mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=update))
+            datagrams += receive(sock)
+        return datagrams
+    finally:
+        manager.shutdown()
+
+
+def decode(datagram):
+    if OscBundle.dgram_is_bundle(datagram):
+        return [(message.address, message.params) for message in OscBundle(datagram)]
+    message = OscMessage(datagram)
+    return [(message.address, message.params)]
+
+
+@pytest.mark.parametrize("protocol", ["native", "v1", "v2"])
+def test_bundles_carry_the_individual_messages(main_config, sink, protocol):
+    settings = main_config.settings
+    setattr(settings, {"native": "gui_vrc_native", "v1": "gui_osc_vrcft_v1", "v2": "gui_osc_vrcft_v2"}[protocol], True)
+
+    individual = run_updates(main_config, sink)
+    assert len(individual) > len(UPDATES)
+    assert all(not OscBundle.dgram_is_bundle(datagram) for datagram in individual)
+
+    setattr(settings, f"gui_osc_bundle_{protocol}", True)
+    bundled = run_updates(main_config, sink)
+    assert len(bundled) == len(UPDATES)
+    assert all(OscBundle.dgram_is_bundle(datagram) for datagram in bundled)
+    assert all(OscBundle(datagram).timestamp == 0 for datagram in bundled)  # immediately
+
+    assert [m for d in bundled for m in decode(d)] == [m for d in individual for m in decode(d)]
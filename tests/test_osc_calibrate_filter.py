@@ -0,0 +1,108 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import osc_calibrate_filter
+from config import EyeTrackCameraConfig, EyeTrackSettingsConfig, SettingsSnapshot
+from eye import EyeId
+from osc_calibrate_filter import BinocularState, EyeCalibrationState, cal
+from utils.eye_falloff import velocity_falloff
+
+
+class CountingConfig(EyeTrackCameraConfig):
+    """Camera config that counts the writes to the calibration bounds."""
+
+    def __setattr__(self, name, value):
+        if name.startswith("calib_"):
+            self.__dict__.setdefault("_calib_writes", [0])[0] += 1
+        super().__setattr__(name, value)
+
+
+def make_eye(eye_id, samples=10):
+    config = CountingConfig()
+    settings = EyeTrackSettingsConfig(calibration_samples=samples)
+    return SimpleNamespace(
+        eye_id=eye_id,
+        config=config,
+        baseconfig=SimpleNamespace(save=lambda: None),
+        settings=settings,
+        snapshot=SettingsSnapshot(settings),
+        cal_state=EyeCalibrationState(config),
+        calibration_frame_counter=None,
+        calibration_3d_frame_counter=None,
+        blink_clear=False,
+        ts=10,
+        printcal=True,
+        current_frame_time=None,
+        one_euro_filter=lambda values, t: values,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_binocular(monkeypatch):
+    monkeypatch.setattr(osc_calibrate_filter, "binocular", BinocularState())
+
+
+def calibrate(eye, points, center):
+    eye.calibration_frame_counter = eye.settings.calibration_samples
+    # the first calibration frame only resets the bounds
+    cal.cal_osc(eye, *center, 0)
+    for cx, cy in points:
+        cal.cal_osc(eye, cx, cy, 0)
+    while eye.calibration_frame_counter is not None:
+        cal.cal_osc(eye, *center, 0)
+
+
+def test_calibration_bounds_reach_the_config_only_on_change():
+    eye = make_eye(EyeId.LEFT)
+    calibrate(eye, [(10, 20), (90, 20), (50, 80), (50, 5), (60, 60), (55, 50)], center=(50, 40))
+    assert (eye.config.calib_XMIN, eye.config.calib_XMAX) == (10, 90)
+    assert (eye.config.calib_YMIN, eye.config.calib_YMAX) == (5, 80)
+    assert (eye.config.calib_XOFF, eye.config.calib_YOFF) == (50, 40)
+
+    writes = eye.config._calib_writes[0]
+    for _ in range(100):
+        out_x, out_y, _ = cal.cal_osc(eye, 70, 60, 0)
+    assert eye.config._calib_writes[0] == writes
+    # halfway from the center to the bounds, both axes point the other way without the flip settings
+    assert (out_x, out_y) == pytest.approx((-0.5, -0.5))
+
+
+def test_eyes_keep_their_own_calibration():
+    left, right = make_eye(EyeId.LEFT), make_eye(EyeId.RIGHT)
+    calibrate(left, [(5, 5), (100, 100)], center=(50, 50))
+    calibrate(right, [(20, 30), (40, 50)], center=(30, 40))
+    assert (left.cal_state.xmin, left.cal_state.xmax) == (5, 100)
+    assert (right.cal_state.xmin, right.cal_state.xmax) == (20, 40)
+
+
+def test_falloff_from_two_threads_keeps_both_eyes():
+    binocular = BinocularState()
+    settings = EyeTrackSettingsConfig(gui_outer_side_falloff=True, gui_eye_dominant_diff_thresh=10.0)
+    eyes = [SimpleNamespace(eye_id=eye_id, snapshot=SettingsSnapshot(settings)) for eye_id in (EyeId.LEFT, EyeId.RIGHT)]
+
+    def run(eye, value):
+        for _ in range(2000):
+            velocity_falloff(eye, binocular, value, value, 0.0)
+
+    threads = [threading.Thread(target=run, args=(eye, value)) for eye, value in zip(eyes, (0.25, -0.25))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (binocular.l_eye_x, binocular.left_y) == (0.25, 0.25)
+    assert (binocular.r_eye_x, binocular.right_y) == (-0.25, -0.25)
+
+
+def test_falloff_follows_the_fixating_eye():
+    binocular = BinocularState()
+    settings = EyeTrackSettingsConfig(gui_outer_side_falloff=True, gui_eye_dominant_diff_thresh=0.1)
+    left, right = [
+        SimpleNamespace(eye_id=eye_id, snapshot=SettingsSnapshot(settings)) for eye_id in (EyeId.LEFT, EyeId.RIGHT)
+    ]
+    velocity_falloff(left, binocular, 0.5, 0.5, 1.0, saccade=True)
+    velocity_falloff(right, binocular, 0.0, 0.0, 3.0, saccade=False)
+    # the left eye jumps on its own, its slower average does not make it the one to trust
+    assert velocity_falloff(left, binocular, 0.5, 0.5, 1.0, saccade=True) == (0.0, 0.0)
+    assert velocity_falloff(right, binocular, 0.0, 0.0, 3.0, saccade=False) == (0.0, 0.0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from pythonosc.osc_bundle_builder import IMMEDIATELY, OscBundleBuilder
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from osc.OSCEncoder import OSCEncoder
+
+
+def python_osc(address, value):
+    builder = OscMessageBuilder(address=address)
+    if value is None:
+        pass
+    elif isinstance(value, (list, tuple)):
+        for val in value:
+            builder.add_arg(val)
+    else:
+        builder.add_arg(value)
+    return builder.build().dgram
+
+
+@pytest.mark.parametrize(
+    "address,value",
+    [
+        ("/avatar/parameters/v2/EyeLeftX", 0.25),
+        ("/avatar/parameters/LeftEyeX", -1.0),
+        ("/avatar/parameters/v2/EyeLid", 0),
+        ("/avatar/parameters/EyesY", np.float64(0.125)),
+        ("/tracking/eye/LeftRightVec", [0.1, -0.2, 1.0, 0.3, 0.4, 1.0]),
+        ("/a", None),
+        ("/abc", True),
+        ("/abcd", "text"),
+        ("/big", 2**40),
+        ("/mixed", [1, 0.5, 7]),
+    ],
+)
+def test_same_bytes_as_python_osc(address, value):
+    encoder = OSCEncoder()
+    # twice, the second time from the compiled message
+    assert bytes(encoder.encode(address, value)) == python_osc(address, value)
+    assert bytes(encoder.encode(address, value)) == python_osc(address, value)
+
+
+def test_compiled_message_reuses_its_buffer():
+    encoder = OSCEncoder()
+    first = encoder.encode("/avatar/parameters/v2/EyeX", 0.5)
+    second = encoder.encode("/avatar/parameters/v2/EyeX", -0.5)
+    assert first is second
+    assert bytes(second) == python_osc("/avatar/parameters/v2/EyeX", -0.5)
+    encoder.clear()
+    assert not encoder.compiled
+
+
+def test_bundle_matches_python_osc():
+    messages = [("/avatar/parameters/v2/EyeLeftX", 0.1), ("/avatar/parameters/v2/EyeLeftX", 0.2), ("/x", [1.0, 2])]
+    bundle = OscBundleBuilder(IMMEDIATELY)
+    for address, value in messages:
+        builder = OscMessageBuilder(address=address)
+        for val in value if isinstance(value, list) else [value]:
+            builder.add_arg(val)
+        bundle.add_content(builder.build())
+    assert bytes(OSCEncoder().encode_bundle(messages)) == bundle.build().dgram
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from eye import EyeId
+from osc.OSCMailbox import OSCMailbox
+from osc.OSCMessage import OSCMessage, OSCMessageType
+from tests import EyeInfoMock
+
+
+def eye_message(eye_id, x):
+    return OSCMessage(
+        type=OSCMessageType.EYE_INFO,
+        data=(eye_id, EyeInfoMock(x=x, y=0, blink=1.0, pupil_dilation=0.5, avg_velocity=0.0)),
+    )
+
+
+def module_message(field, value):
+    return OSCMessage(type=OSCMessageType.VRCFT_MODULE_INFO, data={"command": "set", "field": field, "value": value})
+
+
+def test_put_never_blocks_without_a_sender():
+    mailbox = OSCMailbox()
+    start = time.perf_counter()
+    for i in range(10000):
+        mailbox.put(eye_message(EyeId.LEFT, i))
+    assert time.perf_counter() - start < 1.0
+    assert mailbox.superseded_total == 9999
+
+
+def test_latest_value_per_eye_and_type():
+    mailbox = OSCMailbox()
+    mailbox.put(eye_message(EyeId.RIGHT, 1))
+    mailbox.put(eye_message(EyeId.LEFT, 2))
+    mailbox.put(eye_message(EyeId.RIGHT, 3))
+    mailbox.put(module_message("gui_osc_port", 9000))
+    mailbox.put(module_message("gui_osc_address", "127.0.0.1"))
+
+    messages = mailbox.drain()
+    assert [(m.data[0], m.data[1].x) for m in messages[:2]] == [(EyeId.RIGHT, 3), (EyeId.LEFT, 2)]
+    assert [m.data["field"] for m in messages[2:]] == ["gui_osc_port", "gui_osc_address"]
+    assert mailbox.superseded == {(OSCMessageType.EYE_INFO, EyeId.RIGHT): 1}
+    assert mailbox.delivered == 4
+    assert mailbox.empty() and mailbox.drain() == []
+
+
+def test_waker_runs_once_per_drain():
+    mailbox = OSCMailbox()
+    wakeups = []
+    mailbox.waker = lambda: wakeups.append(threading.get_ident())
+
+    putter = threading.Thread(target=mailbox.put, args=(eye_message(EyeId.LEFT, 1),))
+    putter.start()
+    putter.join()
+    # called from the putting thread
+    assert len(wakeups) == 1 and wakeups[0] != threading.get_ident()
+
+    mailbox.put(eye_message(EyeId.RIGHT, 2))
+    mailbox.put(eye_message(EyeId.LEFT, 3))
+    assert len(wakeups) == 1
+    assert len(mailbox.drain()) == 2
+    mailbox.put(eye_message(EyeId.LEFT, 4))
+    assert len(wakeups) == 2
@@ -1,269 +1,79 @@
-from queue import Queue
-from time import sleep
-from unittest import mock
-
 import pytest
 
-from osc.osc import OSCManager, OSCMessage
-from osc.OSCMessage import OSCMessageType
-from tests import EyeInfoMock, SimpleUDPClientMock
+from eye import EyeId
+from tests import EyeInfoMock, osc_output, stereo_updates
 
 
-@pytest.mark.parametrize(
-    "messages,expected_outcome",
-    [
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=0,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/tracking/eye/EyesClosedAmount", 0.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]),
-            ],
-        ),
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=0,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/tracking/eye/EyesClosedAmount", 0.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]),
-            ],
-        ),
-    ],
-)
-def test_send_command_native_params_single_eye(main_config_native_params, messages, expected_outcome):
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_native_params,
-            osc_message_in_queue=msg_queue,
-        )
-
-        client.start()
+@pytest.mark.parametrize("eye_id", [EyeId.RIGHT, EyeId.LEFT])
+def test_send_command_native_params_single_eye(main_config_native_params, eye_id):
+    eye_info = EyeInfoMock(x=0.25, y=-0.5, blink=1, pupil_dilation=0.75, avg_velocity=0)
 
-        for message in messages:
-            sleep(0.01)
-            msg_queue.put(message)
-        client.shutdown()
-
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
+    assert osc_output(main_config_native_params, [(eye_id, eye_info)]) == [
+        ("/tracking/eye/EyesClosedAmount", 0.0),
+        ("/tracking/eye/LeftRightVec", [0.25, -0.5, 1.0, 0.25, -0.5, 1.0]),
+    ]
 
 
 @pytest.mark.parametrize(
-    "eye_data,expected_outcome",
+    "blink,expected_outcome",
     [
         (
+            0.5,
             [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0.5,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/tracking/eye/EyesClosedAmount", 0.0),
-                ("/tracking/eye/EyesClosedAmount", 0.0),
-                # we're expecting 621 as left_y here because that's the default value
-                # before the first state update with real data, but that's ok
-                # we're gonna be like 10 messages deep before anyone starts playing
-                # and if they already are, they won't be able to notice
-                ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.0, 0.0, 1.0]),
+                # the right eye on its own, averaged with the defaults of the left eye. We're expecting 621 as
+                # left_y here because that's the default value before the first state update with real data,
+                # but that's ok, we're gonna be like 10 messages deep before anyone starts playing
+                ("/tracking/eye/EyesClosedAmount", pytest.approx(0.4)),
+                ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.25, 0.5, 1.0]),
+                # nothing per eye in dual eye mode, once per pair
                 ("/tracking/eye/EyesClosedAmount", 0.5),
+                ("/tracking/eye/LeftRightVec", [-0.25, 0.25, 1.0, 0.25, 0.5, 1.0]),
                 ("/tracking/eye/EyesClosedAmount", 0.5),
-                ("/tracking/eye/LeftRightVec", [0.0, 5.0, 1.0, 0.0, 0.0, 1.0]),
+                ("/tracking/eye/LeftRightVec", [-0.5, 0.25, 1.0, 0.5, 0.5, 1.0]),
             ],
         ),
         # binary blink
         (
+            0.0,
             [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/tracking/eye/EyesClosedAmount", 1.0),
+                ("/tracking/eye/EyesClosedAmount", pytest.approx(0.65)),
+                ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.25, 0.5, 1.0]),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.0, 0.0, 1.0]),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
+                ("/tracking/eye/LeftRightVec", [-0.25, 0.25, 1.0, 0.25, 0.5, 1.0]),
                 ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 5.0, 1.0, 0.0, 0.0, 1.0]),
+                ("/tracking/eye/LeftRightVec", [-0.5, 0.25, 1.0, 0.5, 0.5, 1.0]),
             ],
         ),
     ],
 )
-def test_send_command_native_params_dual_eye(main_config_native_params, eye_data, expected_outcome):
-    main_config_native_params.eye_display_id = 2
-
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_native_params,
-            osc_message_in_queue=msg_queue,
-        )
-
-        client.start()
-
-        for message in eye_data:
-            sleep(0.01)
-            msg_queue.put(message)
-        client.shutdown()
+def test_send_command_native_params_dual_eye(main_config_native_params, blink, expected_outcome):
+    main_config_native_params.eye_display_id = EyeId.BOTH
 
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
+    assert osc_output(main_config_native_params, stereo_updates(blink)) == expected_outcome
 
 
-@pytest.mark.parametrize(
-    "eye_data,expected_outcome",
-    [
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.0, 0.0, 1.0]),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/EyesClosedAmount", 1.0),
-                ("/tracking/eye/LeftRightVec", [0.0, 5.0, 1.0, 0.0, 0.0, 1.0]),
-            ],
-        ),
-    ],
-)
-def test_send_command_native_params_eye_outer_side_falloff(main_config_native_params, eye_data, expected_outcome):
-    main_config_native_params.eye_display_id = 2
+def test_send_command_native_params_eye_outer_side_falloff(main_config_native_params):
+    main_config_native_params.eye_display_id = EyeId.BOTH
     main_config_native_params.settings.gui_outer_side_falloff = True
 
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_native_params,
-            osc_message_in_queue=msg_queue,
-        )
-
-        client.start()
-
-        for message in eye_data:
-            msg_queue.put(message)
-            sleep(1)
-        client.shutdown()
-
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
+    assert osc_output(main_config_native_params, stereo_updates(0.0)) == [
+        ("/tracking/eye/EyesClosedAmount", pytest.approx(0.65)),
+        ("/tracking/eye/LeftRightVec", [0.0, 621.0, 1.0, 0.25, 0.5, 1.0]),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        # both eyes closed
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/LeftRightVec", [-0.25, 0.25, 1.0, 0.25, 0.5, 1.0]),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/EyesClosedAmount", 1.0),
+        ("/tracking/eye/LeftRightVec", [-0.5, 0.25, 1.0, 0.5, 0.5, 1.0]),
+    ]
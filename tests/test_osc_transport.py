@@ -0,0 +1,76 @@
+import socket
+import threading
+import time
+
+import pytest
+from pythonosc.udp_client import SimpleUDPClient
+
+from osc.osc import OSCManager
+from osc.OSCMailbox import OSCMailbox
+
+ADDRESS = "/avatar/parameters/etvr_recenter"
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture()
+def manager(main_config):
+    main_config.settings.gui_osc_address = "127.0.0.1"
+    main_config.settings.gui_osc_port = free_port()
+    main_config.settings.gui_osc_receiver_port = free_port()
+    main_config.settings.gui_ROSC = True
+    manager = OSCManager(config=main_config, osc_message_in_queue=OSCMailbox())
+    received = []
+    event = threading.Event()
+
+    def listener(message):
+        received.append(message.data)
+        event.set()
+
+    manager.register_listeners(ADDRESS, [listener])
+    manager.received, manager.event = received, event
+    yield manager
+    manager.shutdown()
+
+
+def send(manager, port, value):
+    manager.event.clear()
+    SimpleUDPClient("127.0.0.1", port).send_message(ADDRESS, value)
+    return manager.event.wait(1.0)
+
+
+def test_send_and_receive_share_one_thread(manager):
+    before = threading.active_count()
+    manager.start()
+    assert threading.active_count() == before + 1
+    assert send(manager, manager.settings.gui_osc_receiver_port, True)
+    assert manager.received == [True]
+
+
+def test_receiver_rebinds_on_port_change(manager):
+    manager.start()
+    old_port = manager.settings.gui_osc_receiver_port
+    new_port = free_port()
+    manager.settings.gui_osc_receiver_port = new_port
+    manager.update({"gui_osc_receiver_port": new_port})
+
+    assert send(manager, new_port, 1.0)
+    assert not send(manager, old_port, 2.0)
+    assert manager.received == [1.0]
+
+    # the old port is free again right away
+    manager.settings.gui_osc_receiver_port = old_port
+    manager.update({"gui_osc_receiver_port": old_port})
+    assert send(manager, old_port, 3.0)
+
+
+def test_shutdown_is_immediate(manager):
+    manager.start()
+    start = time.perf_counter()
+    manager.shutdown()
+    assert time.perf_counter() - start < 0.5
+    assert manager.loop_thread is None
@@ -1,157 +1,55 @@
-from queue import Queue
-from time import sleep
-from unittest import mock
-
 import pytest
 
-from osc.osc import OSCManager, OSCMessage
-from osc.OSCMessage import OSCMessageType
-from tests import EyeInfoMock, SimpleUDPClientMock
-
-
-@pytest.mark.parametrize(
-    "messages,expected_outcome",
-    [
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=0,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/avatar/parameters/v2/EyeX", 0),
-                ("/avatar/parameters/v2/EyeY", 0),
-                ("/avatar/parameters/v2/EyeLid", 1.0),
-                ("/avatar/parameters/v2/EyeLid", 1.0),
-            ],
-        ),
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=0,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/avatar/parameters/v2/EyeX", 0),
-                ("/avatar/parameters/v2/EyeY", 0),
-                ("/avatar/parameters/v2/EyeLid", 1.0),
-                ("/avatar/parameters/v2/EyeLid", 1.0),
-            ],
-        ),
-    ],
-)
-def test_send_command_v2_params_single_eye(main_config_v2_params, messages, expected_outcome):
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_v2_params,
-            osc_message_in_queue=msg_queue,
-        )
+from eye import EyeId
+from tests import EyeInfoMock, osc_output, stereo_updates
 
-        client.start()
 
-        for message in messages:
-            sleep(0.01)
-            msg_queue.put(message)
-        client.shutdown()
+@pytest.mark.parametrize("eye_id", [EyeId.RIGHT, EyeId.LEFT])
+def test_send_command_v2_params_single_eye(main_config_v2_params, eye_id):
+    eye_info = EyeInfoMock(x=0.25, y=-0.5, blink=1, pupil_dilation=0.75, avg_velocity=0)
 
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
+    assert osc_output(main_config_v2_params, [(eye_id, eye_info)]) == [
+        ("/avatar/parameters/v2/EyeX", 0.25),
+        ("/avatar/parameters/v2/EyeY", -0.5),
+        ("/avatar/parameters/v2/PupilDilation", 0.75),
+        ("/avatar/parameters/v2/EyeLid", 1.0),
+        ("/avatar/parameters/v2/EyeLid", 1.0),
+    ]
 
 
 @pytest.mark.parametrize(
-    "eye_data,expected_outcome",
+    "blink,expected_outcome",
     [
         (
+            0.5,
             [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=1,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0.5,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/avatar/parameters/v2/EyeLidRight", 1.0),
-                ("/avatar/parameters/v2/EyeRightX", 0),
-                ("/avatar/parameters/v2/EyeRightY", 0),
-                ("/avatar/parameters/v2/EyeLidRight", 1.0),
+                ("/avatar/parameters/v2/EyeLidRight", 0.5),
+                ("/avatar/parameters/v2/EyeRightX", 0.25),
+                ("/avatar/parameters/v2/EyeRightY", 0.5),
+                ("/avatar/parameters/v2/EyeLidRight", 0.5),
+                # the right eye on its own, the left dilation is not known yet
+                ("/avatar/parameters/v2/PupilDilation", 0.25),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.5),
-                ("/avatar/parameters/v2/EyeLeftX", 10),
-                ("/avatar/parameters/v2/EyeLeftY", 5),
+                ("/avatar/parameters/v2/EyeLeftX", -0.25),
+                ("/avatar/parameters/v2/EyeLeftY", 0.25),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.5),
+                # once for the first pair
+                ("/avatar/parameters/v2/PupilDilation", 0.375),
+                ("/avatar/parameters/v2/EyeLidRight", 0.5),
+                ("/avatar/parameters/v2/EyeRightX", 0.5),
+                ("/avatar/parameters/v2/EyeRightY", 0.5),
+                ("/avatar/parameters/v2/EyeLidRight", 0.5),
+                ("/avatar/parameters/v2/EyeLidLeft", 0.5),
+                ("/avatar/parameters/v2/EyeLeftX", -0.5),
+                ("/avatar/parameters/v2/EyeLeftY", 0.25),
+                ("/avatar/parameters/v2/EyeLidLeft", 0.5),
+                # once for the second pair
+                ("/avatar/parameters/v2/PupilDilation", 0.625),
             ],
         ),
         # binary blink
         (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
+            0.0,
             [
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
@@ -159,117 +57,78 @@ def test_send_command_v2_params_single_eye(main_config_v2_params, messages, expe
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeRightX", 0),
-                ("/avatar/parameters/v2/EyeRightY", 0),
+                ("/avatar/parameters/v2/EyeRightX", 0.25),
+                ("/avatar/parameters/v2/EyeRightY", 0.5),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
+                ("/avatar/parameters/v2/PupilDilation", 0.25),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLeftX", 10),
-                ("/avatar/parameters/v2/EyeLeftY", 5),
+                ("/avatar/parameters/v2/EyeLeftX", -0.25),
+                ("/avatar/parameters/v2/EyeLeftY", 0.25),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-            ],
-        ),
-    ],
-)
-def test_send_command_v2_params_dual_eye(main_config_v2_params, eye_data, expected_outcome):
-    main_config_v2_params.eye_display_id = 2
-
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_v2_params,
-            osc_message_in_queue=msg_queue,
-        )
-
-        client.start()
-
-        for message in eye_data:
-            sleep(0.01)
-            msg_queue.put(message)
-        client.shutdown()
-
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
-
-
-@pytest.mark.parametrize(
-    "eye_data,expected_outcome",
-    [
-        (
-            [
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        0,
-                        EyeInfoMock(
-                            x=0,
-                            y=0,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-                OSCMessage(
-                    type=OSCMessageType.EYE_INFO,
-                    data=(
-                        1,
-                        EyeInfoMock(
-                            x=10,
-                            y=5,
-                            blink=0,
-                            pupil_dilation=1,
-                            avg_velocity=0,
-                        ),
-                    ),
-                ),
-            ],
-            [
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
+                ("/avatar/parameters/v2/PupilDilation", 0.375),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
+                ("/avatar/parameters/v2/EyeRightX", 0.5),
+                ("/avatar/parameters/v2/EyeRightY", 0.5),
                 ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeRightX", 0),
-                ("/avatar/parameters/v2/EyeRightY", 0),
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+                ("/avatar/parameters/v2/EyeLeftX", -0.5),
+                ("/avatar/parameters/v2/EyeLeftY", 0.25),
                 ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLidRight", 0.0),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
-                ("/avatar/parameters/v2/EyeLeftX", 10),
-                ("/avatar/parameters/v2/EyeLeftY", 5),
-                ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+                ("/avatar/parameters/v2/PupilDilation", 0.625),
             ],
         ),
     ],
 )
-def test_send_command_v2_params_eye_outer_side_falloff(main_config_v2_params, eye_data, expected_outcome):
-    main_config_v2_params.eye_display_id = 2
-    main_config_v2_params.settings.gui_outer_side_falloff = True
+def test_send_command_v2_params_dual_eye(main_config_v2_params, blink, expected_outcome):
+    main_config_v2_params.eye_display_id = EyeId.BOTH
 
-    with mock.patch("EyeTrackApp.osc.osc.udp_client.SimpleUDPClient", SimpleUDPClientMock):
-        msg_queue = Queue()
-        client = OSCManager(
-            config=main_config_v2_params,
-            osc_message_in_queue=msg_queue,
-        )
+    assert osc_output(main_config_v2_params, stereo_updates(blink)) == expected_outcome
 
-        client.start()
 
-        for message in eye_data:
-            msg_queue.put(message)
-            sleep(1)
-        client.shutdown()
+def test_send_command_v2_params_eye_outer_side_falloff(main_config_v2_params):
+    main_config_v2_params.eye_display_id = EyeId.BOTH
+    main_config_v2_params.settings.gui_outer_side_falloff = True
 
-        assert msg_queue.empty()
-        assert client.osc_sender.client.messages == expected_outcome
+    assert osc_output(main_config_v2_params, stereo_updates(0.0)) == [
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeRightX", 0.25),
+        ("/avatar/parameters/v2/EyeRightY", 0.5),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/PupilDilation", 0.25),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        # both eyes closed, the lids go out together
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLeftX", -0.25),
+        ("/avatar/parameters/v2/EyeLeftY", 0.25),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/PupilDilation", 0.375),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeRightX", 0.5),
+        ("/avatar/parameters/v2/EyeRightY", 0.5),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLidRight", 0.0),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/EyeLeftX", -0.5),
+        ("/avatar/parameters/v2/EyeLeftY", 0.25),
+        ("/avatar/parameters/v2/EyeLidLeft", 0.0),
+        ("/avatar/parameters/v2/PupilDilation", 0.625),
+    ]
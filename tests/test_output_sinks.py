@@ -0,0 +1,156 @@
+import math
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from eye import EyeId, EyeInfo, EyeInfoOrigin
+from osc.BinaryOutput import FLAG_SACCADE, RECORD, SharedMemoryReader, decode_record
+from osc.osc import OSCManager, OSCMessage
+from osc.OSCMailbox import OSCMailbox
+from osc.OSCMessage import OSCMessageType
+from osc.OutputSinks import BinarySocketSink, OutputSink, SharedMemorySink, create_sinks
+
+LEFT = EyeInfo(
+    EyeInfoOrigin.LEAP, 0.25, -0.5, 0.75, 0.5, 1.5, vergence_depth=0.6, ray_distance=0.01, timestamp=12.5, saccade=True
+)
+RIGHT = EyeInfo(EyeInfoOrigin.HSRAC, 0.125, 0.5, 0.25, 1.0, 0.0)
+
+
+def assert_record(record, eye_id, eye_info, sequence):
+    assert record.eye_id == eye_id
+    assert record.origin == eye_info.info_type.value
+    assert record.sequence == sequence
+    assert record.flags == (FLAG_SACCADE if eye_info.saccade else 0)
+    for field in ("timestamp", "x", "y", "pupil_dilation", "blink", "avg_velocity", "vergence_depth", "ray_distance"):
+        value = getattr(eye_info, field)
+        if value is None:
+            assert math.isnan(getattr(record, field))
+        else:
+            assert getattr(record, field) == pytest.approx(value)
+
+
+@pytest.fixture()
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+def test_binary_udp_sink_from_config(main_config, receiver):
+    main_config.settings.gui_osc_address = "127.0.0.1"
+    main_config.settings.output_sinks = ["binary_udp"]
+    main_config.settings.output_binary_address, main_config.settings.output_binary_port = receiver.getsockname()
+    mailbox = OSCMailbox()
+    manager = OSCManager(config=main_config, osc_message_in_queue=mailbox)
+    manager.setup_sender()
+    try:
+        mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=(EyeId.LEFT, LEFT)))
+        assert_record(decode_record(receiver.recv(1024)), EyeId.LEFT, LEFT, 1)
+        mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=(EyeId.RIGHT, RIGHT)))
+        assert_record(decode_record(receiver.recv(1024)), EyeId.RIGHT, RIGHT, 2)
+    finally:
+        manager.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no unix sockets")
+def test_binary_unix_sink(tmp_path):
+    path = str(tmp_path / "eye.sock")
+    sink = BinarySocketSink(socket.AF_UNIX, path)
+    # nobody listening yet
+    sink.write(EyeId.LEFT, LEFT)
+    assert sink.dropped == 1
+
+    reader = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    reader.bind(path)
+    try:
+        sink.write(EyeId.RIGHT, RIGHT)
+        data = reader.recv(1024)
+        assert len(data) == RECORD.size
+        assert_record(decode_record(data), EyeId.RIGHT, RIGHT, 2)
+    finally:
+        reader.close()
+        sink.close()
+
+
+def test_shared_memory_sink():
+    name = f"etvr_test_{os.getpid()}"
+    sink = SharedMemorySink(name)
+    reader = SharedMemoryReader(name)
+    try:
+        assert reader.read(EyeId.LEFT) is None
+        sink.write(EyeId.LEFT, RIGHT)
+        sink.write(EyeId.LEFT, LEFT)
+        sink.write(EyeId.RIGHT, RIGHT)
+        assert_record(reader.read(EyeId.LEFT), EyeId.LEFT, LEFT, 2)
+        assert_record(reader.read(EyeId.RIGHT), EyeId.RIGHT, RIGHT, 1)
+        assert reader.read(EyeId.BOTH) is None
+    finally:
+        reader.close()
+        sink.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="only POSIX unlinks shared memory on exit")
+def test_shared_memory_reader_exit_keeps_the_block():
+    name = f"etvr_test_exit_{os.getpid()}"
+    sink = SharedMemorySink(name)
+    try:
+        sink.write(EyeId.LEFT, LEFT)
+        script = f"from osc.BinaryOutput import SharedMemoryReader; SharedMemoryReader({name!r}).close()"
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        # capturing the output also waits for the reader's resource tracker, which shares the pipes
+        subprocess.run([sys.executable, "-c", script], check=True, env=env, capture_output=True)
+        reader = SharedMemoryReader(name)
+        assert_record(reader.read(EyeId.LEFT), EyeId.LEFT, LEFT, 1)
+        reader.close()
+    finally:
+        sink.close()
+
+
+def test_decode_rejects_other_data():
+    with pytest.raises(ValueError):
+        decode_record(bytes(RECORD.size))
+
+
+def test_unknown_sinks_are_skipped(main_config):
+    main_config.settings.output_sinks = ["carrier_pigeon"]
+    assert create_sinks(main_config.settings) == []
+
+
+class BrokenSink(OutputSink):
+    def __init__(self):
+        self.writes = 0
+
+    def write(self, eye_id, eye_info):
+        self.writes += 1
+        raise RuntimeError("disk on fire")
+
+
+def test_failing_sink_does_not_stop_the_others(main_config, receiver, monkeypatch):
+    broken = BrokenSink()
+    monkeypatch.setattr("osc.osc.create_sinks", lambda config: [broken, *create_sinks(config)])
+    main_config.settings.gui_osc_address = "127.0.0.1"
+    main_config.settings.output_sinks = ["binary_udp"]
+    main_config.settings.output_binary_address, main_config.settings.output_binary_port = receiver.getsockname()
+    mailbox = OSCMailbox()
+    manager = OSCManager(config=main_config, osc_message_in_queue=mailbox)
+    manager.setup_sender()
+    try:
+        mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=(EyeId.LEFT, LEFT)))
+        assert_record(decode_record(receiver.recv(1024)), EyeId.LEFT, LEFT, 1)
+        mailbox.put(OSCMessage(type=OSCMessageType.EYE_INFO, data=(EyeId.RIGHT, RIGHT)))
+        assert_record(decode_record(receiver.recv(1024)), EyeId.RIGHT, RIGHT, 2)
+        assert broken.writes == 2
+        assert not manager.osc_sender.task.done()
+    finally:
+        # stopping must not raise what the sink did
+        manager.shutdown()
+
+
+def test_output_sink_needs_write():
+    with pytest.raises(TypeError):
+        OutputSink()
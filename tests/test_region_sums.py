@@ -0,0 +1,19 @@
+import pytest
+
+from utils.region_sums import window_area, window_bounds
+
+
+@pytest.mark.parametrize(
+    "x,y,radius,expected",
+    [
+        (40, 30, 5, (35, 25, 46, 36)),
+        (0, 0, 10, (0, 0, 11, 11)),
+        (79, 59, 3, (76, 56, 80, 60)),
+        # a pupil outside the ROI is clamped to its edge
+        (200, -5, 4, (75, 0, 80, 5)),
+    ],
+)
+def test_windows_are_clipped_to_the_frame(x, y, radius, expected):
+    bounds = window_bounds((60, 80), x, y, radius)
+    assert bounds == expected
+    assert window_area(bounds) == (expected[2] - expected[0]) * (expected[3] - expected[1]) > 0
@@ -0,0 +1,62 @@
+import pytest
+
+from config import EyeTrackConfig, LIVE_SETTINGS, SettingsPublisher, SettingsSnapshot
+
+
+def test_snapshot_converts_and_copies():
+    config = EyeTrackConfig()
+    config.settings.gui_min_cutoff = "0.002"
+    config.settings.output_sinks = ["binary_udp"]
+    snapshot = SettingsSnapshot(config.settings)
+    assert snapshot.gui_min_cutoff == 0.002
+    assert snapshot.gui_speed_coefficient == 0.9
+    assert snapshot.output_sinks == ("binary_udp",)
+    assert snapshot.gui_osc_port == config.settings.gui_osc_port
+
+    # a copy, later changes don't reach it
+    config.settings.gui_osc_port = 1
+    assert snapshot.gui_osc_port != 1
+
+
+def test_snapshot_is_read_only():
+    snapshot = SettingsSnapshot(EyeTrackConfig().settings)
+    with pytest.raises(AttributeError):
+        snapshot.gui_RANSACBLINK = False
+    for name in LIVE_SETTINGS:
+        with pytest.raises(AttributeError):
+            getattr(snapshot, name)
+
+
+def test_text_that_is_no_number_falls_back_to_the_default():
+    config = EyeTrackConfig()
+    config.settings.gui_speed_coefficient = "fast"
+    assert SettingsSnapshot(config.settings).gui_speed_coefficient == 0.9
+
+
+def test_publisher_swaps_the_snapshot_on_settings_updates():
+    config = EyeTrackConfig()
+    publisher = SettingsPublisher(config.settings)
+    first = publisher.snapshot
+
+    # camera config changes keep the snapshot
+    publisher.on_config_update({"rotation_angle": 10})
+    assert publisher.snapshot is first
+
+    config.settings.gui_thresh_add = 33
+    publisher.on_config_update({"gui_thresh_add": 33})
+    assert publisher.snapshot is not first
+    assert publisher.snapshot.gui_thresh_add == 33
+    assert first.gui_thresh_add != 33
+
+
+def test_numbers_saved_as_text_reach_the_snapshot_as_numbers():
+    config = EyeTrackConfig()
+    publisher = SettingsPublisher(config.settings)
+    # what the blink settings page stores after validating its text fields
+    data = {"ibo_fully_close_eye_threshold": "0.25", "ibo_window_radius_scale": "3", "ibo_grid_cell_size": "8"}
+    config.update(data)
+    publisher.on_config_update(data)
+    snapshot = publisher.snapshot
+    assert snapshot.ibo_fully_close_eye_threshold == 0.25 and isinstance(snapshot.ibo_fully_close_eye_threshold, float)
+    assert snapshot.ibo_window_radius_scale == 3.0 and isinstance(snapshot.ibo_window_radius_scale, float)
+    assert snapshot.ibo_grid_cell_size == 8 and isinstance(snapshot.ibo_grid_cell_size, int)
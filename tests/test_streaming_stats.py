@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils.streaming_stats import RingBuffer, RollingMean, RollingQuantile
+
+
+@pytest.fixture()
+def samples():
+    return np.random.default_rng(0).normal(1000, 100, 2000)
+
+
+def test_ring_buffer_keeps_last_values_in_order(samples):
+    buffer = RingBuffer(50)
+    for i, sample in enumerate(samples[:120]):
+        evicted = buffer.append(sample)
+        assert evicted is None if i < 50 else evicted == samples[i - 50]
+    np.testing.assert_array_equal(buffer.values(), samples[70:120])
+
+
+@pytest.mark.parametrize("window", [1, 7, 300])
+def test_rolling_quantile_matches_numpy(samples, window):
+    rolling = RollingQuantile(window)
+    for i, sample in enumerate(samples):
+        rolling.append(sample)
+        expected = samples[max(0, i - window + 1) : i + 1]
+        for q in (1, 25, 50, 99):
+            assert rolling.percentile(q) == pytest.approx(np.percentile(expected, q))
+
+
+def test_rolling_quantile_resize_keeps_newest(samples):
+    rolling = RollingQuantile(300)
+    for sample in samples[:300]:
+        rolling.append(sample)
+    rolling.resize(100)
+    assert rolling.percentile(50) == pytest.approx(np.percentile(samples[200:300], 50))
+
+
+def test_rolling_mean_matches_numpy(samples):
+    mean = RollingMean(30)
+    for i, sample in enumerate(samples):
+        mean.append(sample)
+        assert mean.mean() == pytest.approx(samples[max(0, i - 29) : i + 1].mean())
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from utils.calibration_3d import CalibrationProcessor
+from utils.vergence import closest_points, eye_positions, vergence
+
+IPD = 0.058
+
+
+def directions_to(target):
+    left_eye, right_eye = eye_positions(IPD)
+    return np.asarray(target) - left_eye, np.asarray(target) - right_eye
+
+
+def test_depth_of_intersecting_rays():
+    target = np.array([0.1, 0.05, 0.6])
+    depth, ray_distance = vergence(*directions_to(target), IPD)
+    assert depth == pytest.approx(np.linalg.norm(target))
+    assert ray_distance == pytest.approx(0, abs=1e-12)
+
+
+def test_skew_rays_report_their_gap():
+    left_eye, right_eye = eye_positions(IPD)
+    left_dir, right_dir = directions_to([0.0, 0.0, 1.0])
+    right_dir = right_dir + [0, 0.02, 0]
+    _, _, point_left, point_right = closest_points(left_eye, left_dir, right_eye, right_dir)
+    gap = point_left - point_right
+    # the shortest segment is perpendicular to both rays
+    assert np.dot(gap, left_dir) == pytest.approx(0, abs=1e-12)
+    assert np.dot(gap, right_dir) == pytest.approx(0, abs=1e-12)
+
+    depth, ray_distance = vergence(left_dir, right_dir, IPD)
+    assert ray_distance == pytest.approx(np.linalg.norm(gap)) and ray_distance > 0
+    assert depth == pytest.approx(np.linalg.norm((point_left + point_right) / 2))
+
+
+@pytest.mark.parametrize("right_dir", [[0, 0, 1], [0.1, 0, 1]])
+def test_parallel_and_diverging_rays_look_at_infinity(right_dir):
+    depth, _ = vergence([0, 0, 1], right_dir, IPD)
+    assert depth == np.inf
+
+
+def test_batch_matches_single_samples():
+    rng = np.random.default_rng(0)
+    targets = rng.uniform([-0.5, -0.5, 0.2], [0.5, 0.5, 5.0], (200, 3))
+    left_dirs, right_dirs = directions_to(targets)
+    right_dirs += rng.normal(0, 0.005, right_dirs.shape)
+    depths, ray_distances = vergence(left_dirs, right_dirs, IPD)
+    assert depths.shape == ray_distances.shape == (200,)
+    for i in range(0, 200, 17):
+        assert (depths[i], ray_distances[i]) == pytest.approx(vergence(left_dirs[i], right_dirs[i], IPD))
+
+
+def test_calibrated_eye_points_give_the_target_depth():
+    processor = CalibrationProcessor()
+    left_eye, right_eye = eye_positions(IPD)
+
+    def eye_point(direction, flag):
+        # a linear camera: the eye point moves with the gaze direction on the z = 1 plane
+        x, y = direction[:2] / direction[2]
+        return 100 + 50 * x, 80 - 40 * y, flag
+
+    # the calibration targets are gaze directions of each eye
+    processor.receive_calibration_data(1, [eye_point(p, 1) for p in processor.gt_3d])
+    processor.receive_calibration_data(0, [eye_point(p, 0) for p in processor.gt_3d])
+    assert processor.gaze_map_left is not None
+
+    target = np.array([0.05, -0.1, 0.8])
+    processor.update_point(1, *eye_point(target - left_eye, 1)[:2])
+    depth, ray_distance = processor.update_point(0, *eye_point(target - right_eye, 0)[:2])
+    assert depth == pytest.approx(np.linalg.norm(target), rel=1e-6)
+    assert ray_distance == pytest.approx(0, abs=1e-9)